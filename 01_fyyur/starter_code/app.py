@@ -3,28 +3,71 @@
 #----------------------------------------------------------------------------#
 
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
-from flask_moment import Moment
+import os
+import sys
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, abort, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, exc
 import logging
-from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
-from flask_migrate import Migrate
-from datetime import datetime
+import click
+
+# the instrumentation shared with the other apps lives in shared/flask_perf
+SHARED_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'shared'))
+if SHARED_DIR not in sys.path:
+  sys.path.append(SHARED_DIR)
+
+from flask_perf.instrumentation import init_instrumentation
+from flask_perf.metrics import init_metrics
+from flask_perf.profiling import init_profiling
+from template_cache import init_template_cache
+from static_assets import build_directory, build_static, init_static_assets
+from flask_perf.slow_queries import init_slow_query_log
+from flask_perf.async_logging import setup_async_logging
+from typeahead import Typeahead
+from partitions import archive_partitions, ensure_partitions
+from db_profile import apply_statement_timeout
+import json_api
+import exports
+from datetime import datetime, timedelta
 
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
 app = Flask(__name__)
-moment = Moment(app)
 app.config.from_object('config')
 db = SQLAlchemy(app)
 
-migrate = Migrate(app, db)
+apply_statement_timeout(db.engine, app.config['DB_PROFILE'],
+                        app.config['DB_STATEMENT_TIMEOUT'])
+
+if db.engine.dialect.name == 'sqlite':
+  # sqlite only enforces the foreign keys, and so their ON DELETE CASCADE,
+  # on the connections that ask for it
+  @event.listens_for(db.engine, 'connect')
+  def enable_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+def init_migrate():
+  '''
+    This function is used to set up Flask-Migrate for the flask db commands,
+    it imports alembic, which the serving processes never need.
+  '''
+  from flask_migrate import Migrate
+  return Migrate(app, db)
+
+# the flask command loads the app from inside a click command and gunicorn
+# never does, so only the command line pays for the migration tooling
+if click.get_current_context(silent=True) is not None:
+  init_migrate()
+
+init_instrumentation(app)
+init_metrics(app, db.engine, 'fyyur')
+init_profiling(app)
+init_slow_query_log(app)
+init_template_cache(app)
+init_static_assets(app)
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
@@ -36,6 +79,9 @@ class Venue(db.Model):
   '''
 
   __tablename__ = 'venues'
+  __table_args__ = (
+    db.Index('ix_venues_state_city', 'state', 'city'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   name = db.Column(db.String, nullable=False)
@@ -46,7 +92,13 @@ class Venue(db.Model):
   phone = db.Column(db.String(120), nullable=False)
   image_link = db.Column(db.String(500))
   facebook_link = db.Column(db.String(120))
-  shows = db.relationship('Show', backref=('venues'))
+  # maintained with the shows, see count_show() and roll_show_counters()
+  upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  # the database deletes the shows with their venue (ON DELETE CASCADE),
+  # they are not loaded to be deleted one by one
+  shows = db.relationship('Show', backref=('venues'), cascade='all, delete',
+                          passive_deletes=True)
     
 
 class Artist(db.Model):
@@ -65,7 +117,11 @@ class Artist(db.Model):
   genres = db.Column(db.String(120), nullable=False)
   image_link = db.Column(db.String(500))
   facebook_link = db.Column(db.String(120))
-  shows = db.relationship('Show', backref=('artists'))
+  # maintained with the shows, see count_show() and roll_show_counters()
+  upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  shows = db.relationship('Show', backref=('artists'), cascade='all, delete',
+                          passive_deletes=True)
 
 
 class Show(db.Model):
@@ -74,20 +130,268 @@ class Show(db.Model):
     id of the artist and the start time of the show
   '''     
   __tablename__ = 'shows'
+  # on postgresql the table is partitioned by month on start_time, see
+  # partitions.py; the per venue / artist lookups always bound start_time
+  __table_args__ = (
+    db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   venue_id = db.Column(db.Integer, db.ForeignKey(
-        'venues.id'), nullable=False )
+        'venues.id', ondelete='CASCADE'), nullable=False )
   artist_id = db.Column(db.Integer, db.ForeignKey(
-        'artists.id'), nullable=False)
-  start_time = db.Column(db.DateTime, nullable=False)
+        'artists.id', ondelete='CASCADE'), nullable=False)
+  start_time = db.Column(db.DateTime, nullable=False, index=True)
+  # the venue is booked over [start_time, end_time); on postgresql an
+  # exclusion constraint rejects overlapping shows of a venue
+  end_time = db.Column(db.DateTime, nullable=False)
+
+
+class ShowCounters(db.Model):
+  '''
+    This class stores the single row holding the time the show counters
+    of the venues and artists are correct for: a show starting before
+    rolled_at is counted as past, any other show as upcoming.
+  '''
+  __tablename__ = 'show_counters'
+
+  id = db.Column(db.Integer, primary_key=True)
+  rolled_at = db.Column(db.DateTime, nullable=False)
+
+
+@event.listens_for(ShowCounters.__table__, 'after_create')
+def seed_show_counters(table, connection, **kwargs):
+  '''
+    This function is used to create the ShowCounters row with its table
+    (and the 5c8e2f4a7d19 migration), so the writers only ever read it and
+    two first writers cannot race on inserting it.
+  '''
+  connection.execute(table.insert().values(id=1, rolled_at=datetime.today()))
+
+def show_counters_state(for_update=False):
+  '''
+    This function is used to read the ShowCounters row inside the current
+    transaction. Writers of single shows take a shared lock, the jobs that
+    move rolled_at take an exclusive one, so a show is never classified
+    against a rolled_at that is being moved.
+  '''
+  return ShowCounters.query.filter_by(id=1) \
+    .with_for_update(read=not for_update).one()
+
+def count_show(show, delta, rolled_at):
+  '''
+    This function is used to add delta (1 or -1) to the counters of the
+    venue and the artist of a show, in the current transaction.
+  '''
+  name = 'past_shows_count' if show.start_time < rolled_at else 'upcoming_shows_count'
+  for model, id in ((Venue, show.venue_id), (Artist, show.artist_id)):
+    column = getattr(model, name)
+    model.query.filter_by(id=id).update(
+      {column: column + delta}, synchronize_session=False)
+
+def roll_show_counters(now=None):
+  '''
+    This function is used to move the shows that started since the last
+    run from the upcoming to the past counters, and commits.
+
+    Return:
+            the number of shows moved
+  '''
+  now = now or datetime.today()
+  state = show_counters_state(for_update=True)
+  if now <= state.rolled_at:
+    db.session.rollback()
+    return 0
+  moved = 0
+  for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    rows = db.session.query(key, db.func.count(Show.id)) \
+      .filter(Show.start_time >= state.rolled_at, Show.start_time < now) \
+      .group_by(key).all()
+    if rows:
+      db.session.execute(
+        model.__table__.update()
+          .where(model.id == db.bindparam('_id'))
+          .values(upcoming_shows_count=model.upcoming_shows_count - db.bindparam('_n'),
+                  past_shows_count=model.past_shows_count + db.bindparam('_n')),
+        [{'_id': id, '_n': n} for id, n in rows])
+      moved = sum(n for _, n in rows)
+  state.rolled_at = now
+  db.session.commit()
+  return moved
+
+def recount_show_counters(now=None):
+  '''
+    This function is used to recompute every counter from the shows table,
+    e.g. after a bulk load, and commits.
+  '''
+  now = now or datetime.today()
+  state = show_counters_state(for_update=True)
+  for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    def count(*condition):
+      return db.select([db.func.count(Show.id)]) \
+        .where(key == model.id).where(db.and_(*condition)).as_scalar()
+    db.session.execute(model.__table__.update().values(
+      upcoming_shows_count=count(Show.start_time >= now),
+      past_shows_count=count(Show.start_time < now)))
+  state.rolled_at = now
+  db.session.commit()
+
+def uncount_shows_of(model, id, rolled_at):
+  '''
+    This function is used to take the shows of a venue (or an artist) that
+    is being deleted out of the counters of their artists (or venues), with
+    one grouped query and one batched update in the current transaction.
+  '''
+  if model is Venue:
+    key, other, other_key = Show.venue_id, Artist, Show.artist_id
+  else:
+    key, other, other_key = Show.artist_id, Venue, Show.venue_id
+  past = db.func.sum(db.case([(Show.start_time < rolled_at, 1)], else_=0))
+  rows = db.session.query(other_key, past, db.func.count(Show.id)) \
+    .filter(key == id).group_by(other_key).all()
+  if rows:
+    db.session.execute(
+      other.__table__.update()
+        .where(other.id == db.bindparam('_id'))
+        .values(past_shows_count=other.past_shows_count - db.bindparam('_past'),
+                upcoming_shows_count=other.upcoming_shows_count - db.bindparam('_upcoming')),
+      [{'_id': other_id, '_past': past_count, '_upcoming': count - past_count}
+       for other_id, past_count, count in rows])
+
+def overlapping_shows(start, end):
+  '''
+    This function is used to query the shows overlapping [start, end).
+    A show lasts at most SHOW_MAX_DURATION_MINUTES, so only the shows
+    starting in (start - max duration, end) can overlap: the filter is a
+    bounded range of the start_time indexes (and partitions).
+  '''
+  longest = timedelta(minutes=app.config['SHOW_MAX_DURATION_MINUTES'])
+  return Show.query.filter(Show.start_time < end,
+                           Show.start_time > start - longest,
+                           Show.end_time > start)
+
+def booking_conflict(show):
+  '''
+    This function is used to check that the venue and the artist of a new
+    show are free for its whole duration.
 
+    Return:
+            None, or the reason the show cannot be booked
+  '''
+  shows = overlapping_shows(show.start_time, show.end_time)
+  if shows.filter(Show.venue_id == show.venue_id).first() is not None:
+    return 'the venue is already booked at that time'
+  if shows.filter(Show.artist_id == show.artist_id).first() is not None:
+    return 'the artist already plays another show at that time'
+  return None
+
+def export_query(kind, start=None, end=None):
+  '''
+    This function is used to build the query of an export: the shows with
+    their venue and artist names, by start time (those starting in
+    [start, end) when given), or the venues by id.
+
+    Return:
+            (column names, rows streamed from the database)
+  '''
+  if kind == 'shows':
+    query = db.session.query(
+      Show.id, Show.start_time, Show.end_time,
+      Show.venue_id, Venue.name.label('venue_name'),
+      Show.artist_id, Artist.name.label('artist_name')) \
+      .join(Venue, Venue.id == Show.venue_id) \
+      .join(Artist, Artist.id == Show.artist_id)
+    if start is not None:
+      query = query.filter(Show.start_time >= start)
+    if end is not None:
+      query = query.filter(Show.start_time < end)
+    query = query.order_by(Show.start_time, Show.id)
+  elif kind == 'venues':
+    query = db.session.query(
+      Venue.id, Venue.name, Venue.city, Venue.state, Venue.address,
+      Venue.phone, Venue.genres, Venue.upcoming_shows_count,
+      Venue.past_shows_count).order_by(Venue.id)
+  else:
+    raise ValueError('unknown export {}'.format(kind))
+  return exports.stream(query)
+
+@app.cli.command('roll-show-counters')
+def roll_show_counters_command():
+  '''moves the shows that started since the last run to the past counters'''
+  print('{} shows moved to past'.format(roll_show_counters()))
+
+@app.cli.command('recount-show-counters')
+def recount_show_counters_command():
+  '''recomputes the show counters of every venue and artist'''
+  recount_show_counters()
+
+@app.cli.command('create-show-partitions')
+@click.option('--months', default=app.config['SHOW_PARTITIONS_AHEAD'],
+              help='months ahead to create')
+def create_show_partitions_command(months):
+  '''creates the missing monthly partitions of shows, past months included'''
+  for name in ensure_partitions(db.engine, months):
+    print('created', name)
+
+@app.cli.command('archive-shows')
+@click.option('--before', required=True, help='first month kept, YYYY-MM')
+@click.option('--mode', type=click.Choice(['detach', 'export']),
+              default='detach', help='detach to the archive schema, or '
+              'export to csv.gz and drop')
+@click.option('--dir', 'directory', default='archive',
+              help='where the exports are written')
+def archive_shows_command(before, mode, directory):
+  '''takes the monthly partitions of shows before a month out of the table'''
+  before = datetime.strptime(before, '%Y-%m')
+  for name, rows in archive_partitions(db.engine, before, mode, directory):
+    print('archived {} ({} shows)'.format(name, rows))
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(['shows', 'venues']))
+@click.option('--format', 'format', type=click.Choice(sorted(exports.FORMATS)),
+              default='csv')
+@click.option('--from', 'start', default=None, help='shows starting from this date')
+@click.option('--to', 'end', default=None, help='shows starting before this date')
+@click.option('--output', type=click.File('wb'), default='-',
+              help='file to write, standard output by default')
+def export_command(kind, format, start, end, output):
+  '''streams the shows or the venues as csv or ndjson'''
+  start = parse_datetime(start) if start else None
+  end = parse_datetime(end) if end else None
+  columns, rows = export_query(kind, start, end)
+  for chunk in exports.export_chunks(format, columns, rows):
+    output.write(chunk)
+
+@app.cli.command('build-static')
+def build_static_command():
+  '''writes the fingerprinted and compressed static files, restart to use them'''
+  directory = build_directory(app)
+  if directory is None:
+    raise click.ClickException('STATIC_BUILD_DIR is empty')
+  manifest = build_static(app.static_folder, directory)
+  print('{} files in {}'.format(len(manifest), directory))
+
+
+# names of every venue and artist, for the autocomplete endpoints
+typeahead = Typeahead({
+  'venues': lambda: db.engine.execute(db.select([Venue.id, Venue.name])),
+  'artists': lambda: db.engine.execute(db.select([Artist.id, Artist.name])),
+}, refresh_seconds=app.config['TYPEAHEAD_REFRESH_SECONDS'], logger=app.logger)
 
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
+def parse_datetime(value):
+  '''
+    This function is used to parse the dates sent by the forms and in the
+    query strings, dateutil is imported by the first call only.
+  '''
+  import dateutil.parser
+  return dateutil.parser.parse(value)
+
 def format_datetime(value, format='medium'):
   '''
     This function is used to format the date and the time in a specific format.
@@ -98,7 +402,8 @@ def format_datetime(value, format='medium'):
     Return: 
             the fromated date the time    
   '''        
-  date = dateutil.parser.parse(str(value))
+  import babel.dates
+  date = parse_datetime(str(value))
   if format == 'full':
       format="EEEE MMMM, d, y 'at' h:mma"
   elif format == 'medium':
@@ -119,6 +424,21 @@ def index():
 #  Venues
 #  ----------------------------------------------------------------
 
+def activity_query(model):
+  '''
+    This function is used to build the listing query of venues or artists
+    from the request arguments, using the show counters only:
+      ?sort=activity  the ones with the most upcoming, then past shows first
+      ?active=1       only the ones with upcoming shows
+  '''
+  query = model.query
+  if request.args.get('active') == '1':
+    query = query.filter(model.upcoming_shows_count > 0)
+  if request.args.get('sort') == 'activity':
+    query = query.order_by(model.upcoming_shows_count.desc(),
+                           model.past_shows_count.desc())
+  return query.order_by(model.id)
+
 @app.route('/venues')
 def venues():
   '''
@@ -128,7 +448,7 @@ def venues():
     Return: 
             The venues data to be viewed in venue.html page    
   '''  
-  venues = Venue.query.all() 
+  venues = activity_query(Venue).all()
   data = []
   status = 1
   for venue in venues:
@@ -165,18 +485,12 @@ def search_venues():
   search = "%{}%".format(venue_name)
   venues = Venue.query.filter(Venue.name.ilike(search)).all()
   data = []
-  upcoming_shows_num = 0
 
   for venue in venues:
-    shows = Show.query.filter_by(venue_id=venue.id).all()
-    for show in shows:
-      if show.start_time >= datetime.today():
-        upcoming_shows_num += 1
-
     data.append({
       'id': venue.id,
       'name' : venue.name,
-      'num_upcoming_shows' : upcoming_shows_num
+      'num_upcoming_shows' : venue.upcoming_shows_count
     })    
     
   response={
@@ -185,6 +499,98 @@ def search_venues():
   }
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
+def autocomplete(kind):
+  '''
+    This function is used to answer the autocomplete requests from the
+    in-memory name index, without querying the database.
+
+    Return:
+            json {"data": [{"id": ..., "name": ...}]} with the names starting
+            with the q argument, at most limit of them
+  '''
+  limit = min(request.args.get('limit', 10, type=int),
+              app.config['TYPEAHEAD_MAX_RESULTS'])
+  matches = typeahead.search(kind, request.args.get('q', ''), max(limit, 0))
+  return jsonify({
+    'data': [{'id': id, 'name': name} for id, name in matches]
+  })
+
+@app.route('/venues/autocomplete')
+def autocomplete_venues():
+  return autocomplete('venues')
+
+@app.route('/venues/availability')
+def venue_availability():
+  '''
+    This function is used to find the venues of a city that are free in a
+    time window, e.g. /venues/availability?city=New York&state=NY
+    &start=2026-10-23 18:00&end=2026-10-24 00:00&duration=180
+
+    Arg (query string):
+        city, state : where
+        start, end  : the window
+        duration    : minutes needed, the whole window by default
+        limit       : at most this many venues (50, at most 500)
+    Return:
+            json {"venues": [{"id", "name", "address", "free": [[start, end]]}]}
+            with the free slots of each venue that fit the duration, 400
+            for a missing or invalid argument
+  '''
+  try:
+    city = request.args['city']
+    state = request.args['state']
+    start = parse_datetime(request.args['start'])
+    end = parse_datetime(request.args['end'])
+    window = int((end - start).total_seconds() // 60)
+  except (KeyError, ValueError, OverflowError):
+    return jsonify({'success': False, 'message': 'city, state, start and end are required'}), 400
+  try:
+    duration = request.args.get('duration')
+    duration = window if duration is None else int(duration)
+  except ValueError:
+    return jsonify({'success': False, 'message': 'duration must be a number of minutes'}), 400
+  try:
+    limit = json_api.parse_limit(request.args.get('limit'))
+  except ValueError as error:
+    return jsonify({'success': False, 'message': str(error)}), 400
+  if not 0 < duration <= window:
+    return jsonify({'success': False, 'message': 'duration must fit the window'}), 400
+
+  venues = Venue.query.filter_by(state=state, city=city).order_by(Venue.id) \
+    .with_entities(Venue.id, Venue.name, Venue.address).yield_per(500)
+  busy = {}
+  for venue_id, show_start, show_end in overlapping_shows(start, end) \
+      .join(Venue, Venue.id == Show.venue_id) \
+      .filter(Venue.state == state, Venue.city == city) \
+      .order_by(Show.venue_id, Show.start_time) \
+      .with_entities(Show.venue_id, Show.start_time, Show.end_time):
+    busy.setdefault(venue_id, []).append((show_start, show_end))
+
+  needed = timedelta(minutes=duration)
+  data = []
+  for venue in venues:
+    free = []
+    cursor = start
+    for show_start, show_end in busy.get(venue.id, []) + [(end, end)]:
+      if show_start - cursor >= needed:
+        free.append([cursor.isoformat(), min(show_start, end).isoformat()])
+      cursor = max(cursor, show_end)
+    if free:
+      data.append({
+        'id': venue.id,
+        'name': venue.name,
+        'address': venue.address,
+        'free': free
+      })
+      if len(data) == limit:
+        break
+  return jsonify({
+    'start': start.isoformat(),
+    'end': end.isoformat(),
+    'duration': duration,
+    'venues': data
+  })
+
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
   '''
@@ -196,25 +602,28 @@ def show_venue(venue_id):
             the data of the venue to the show_venue.html page    
   '''      
   venue = Venue.query.get(venue_id) 
-  shows = Show.query.filter_by(venue_id=venue_id).all()
+  # both lookups bound start_time, so the upcoming one only reads the
+  # current and future partitions of shows
+  now = datetime.today()
+  shows = Show.query.filter(Show.venue_id == venue_id)
   past_shows = []
   upcoming_shows = []
 
-  for show in shows:
-    if show.start_time < datetime.today():
-      past_shows.append({
-        "venue_id": show.artist_id,
-        "venue_name": show.artists.name,
-        "venue_image_link": show.artists.image_link,
-        "start_time": show.start_time
-      })
-    else:
-      upcoming_shows.append({
-        "venue_id": show.artist_id,
-        "venue_name": show.artists.name,
-        "venue_image_link": show.artists.image_link,
-        "start_time": show.start_time
-      })
+  for show in shows.filter(Show.start_time < now).order_by(Show.start_time.desc()):
+    past_shows.append({
+      "venue_id": show.artist_id,
+      "venue_name": show.artists.name,
+      "venue_image_link": show.artists.image_link,
+      "start_time": show.start_time
+    })
+  for show in shows.filter(Show.start_time >= now).order_by(Show.start_time):
+    upcoming_shows.append({
+      "venue_id": show.artist_id,
+      "venue_name": show.artists.name,
+      "venue_image_link": show.artists.image_link,
+      "start_time": show.start_time
+    })
+
   data = {
     "id": venue.id,
     "name": venue.name,
@@ -244,6 +653,7 @@ def create_venue_form():
   '''
     This function is used to create a venue form.   
   '''      
+  from forms import VenueForm
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
@@ -269,34 +679,50 @@ def create_venue_submission():
     recored.genres = ','.join(request.form.getlist('genres'))
     db.session.add(recored)
     db.session.commit()
+    typeahead.add('venues', recored.id, recored.name)
   except:
     error = True
     db.session.rollback()
-  finally:
-    db.session.close() 
   if not error:
     flash('Venue ' + request.form['name'] + ' was successfully listed!')
   else:
     flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
   return render_template('pages/home.html')
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_with_shows(model, id, kind):
+  '''
+    This function is used to delete a venue or an artist together with all
+    its shows: the counters of the other side are updated, then a single
+    DELETE of the row lets the database cascade to the shows.
+
+    Return:
+            json {"success": true, "deleted": id}, 404 if there is no such row
+  '''
+  try:
+    # taken like the bookings do, so no show is added while deleting
+    found = db.session.query(model.id).filter(model.id == id) \
+      .with_for_update().first()
+    if found is not None:
+      uncount_shows_of(model, id, show_counters_state().rolled_at)
+      model.query.filter_by(id=id).delete(synchronize_session=False)
+      db.session.commit()
+  except:
+    db.session.rollback()
+    return jsonify({'success': False}), 500
+  if found is None:
+    abort(404)
+  typeahead.remove(kind, id)
+  return jsonify({'success': True, 'deleted': id})
+
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
   '''
-    This function is used to delete a venue from the database.
+    This function is used to delete a venue and all its shows.
 
     Arg: 
         venue_id : the id of the venue to be deleted    
   '''      
-  try:
-    recored = Venue.query.get(venue_id)
-    db.session.delete(recored)
-    db.session.commit()
-  except:
-    db.session.rollback()
-  finally:
-    db.session.close() 
-  return None
+  return delete_with_shows(Venue, venue_id, 'venues')
 
 #  Artists
 #  ----------------------------------------------------------------
@@ -305,7 +731,7 @@ def artists():
   '''
     This function is used to show the data of the all artists in the artists.html page.   
   '''      
-  data = Artist.query.all()  
+  data = activity_query(Artist).all()
   return render_template('pages/artists.html', artists=data)
 
 @app.route('/artists/search', methods=['POST'])
@@ -322,18 +748,12 @@ def search_artists():
   search = "%{}%".format(artist_name)
   artists = Artist.query.filter(Artist.name.ilike(search)).all()
   data = []
-  upcoming_shows_num = 0
 
   for artist in artists:
-    shows = Show.query.filter_by(artist_id=artist.id).all()
-    for show in shows:
-      if show.start_time >= datetime.today():
-        upcoming_shows_num += 1
-
     data.append({
       'id': artist.id,
       'name' : artist.name,
-      'num_upcoming_shows' : upcoming_shows_num
+      'num_upcoming_shows' : artist.upcoming_shows_count
     })
   response={
     "count": len(artists),
@@ -341,6 +761,10 @@ def search_artists():
   }
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
+@app.route('/artists/autocomplete')
+def autocomplete_artists():
+  return autocomplete('artists')
+
 @app.route('/artists/<int:artist_id>')
 def show_artist(artist_id): 
   '''
@@ -352,25 +776,27 @@ def show_artist(artist_id):
             the data of the artist to the show_artist.html page    
   ''' 
   artist = Artist.query.get(artist_id) 
-  shows = Show.query.filter_by(artist_id=artist_id).all()
+  # both lookups bound start_time, so the upcoming one only reads the
+  # current and future partitions of shows
+  now = datetime.today()
+  shows = Show.query.filter(Show.artist_id == artist_id)
   past_shows = []
   upcoming_shows = []
 
-  for show in shows:
-    if show.start_time < datetime.today():
-      past_shows.append({
-        "venue_id": show.venue_id,
-        "venue_name": show.venues.name,
-        "venue_image_link": show.venues.image_link,
-        "start_time": show.start_time
-      })
-    else:
-      upcoming_shows.append({
-        "venue_id": show.venue_id,
-        "venue_name": show.venues.name,
-        "venue_image_link": show.venues.image_link,
-        "start_time": show.start_time 
-      })
+  for show in shows.filter(Show.start_time < now).order_by(Show.start_time.desc()):
+    past_shows.append({
+      "venue_id": show.venue_id,
+      "venue_name": show.venues.name,
+      "venue_image_link": show.venues.image_link,
+      "start_time": show.start_time
+    })
+  for show in shows.filter(Show.start_time >= now).order_by(Show.start_time):
+    upcoming_shows.append({
+      "venue_id": show.venue_id,
+      "venue_name": show.venues.name,
+      "venue_image_link": show.venues.image_link,
+      "start_time": show.start_time
+    })
 
   data = {
     "id": artist.id,
@@ -392,6 +818,16 @@ def show_artist(artist_id):
 
   return render_template('pages/show_artist.html', artist=data)
 
+@app.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  '''
+    This function is used to delete an artist and all their shows.
+
+    Arg:
+        artist_id : the id of the artist to be deleted
+  '''
+  return delete_with_shows(Artist, artist_id, 'artists')
+
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
@@ -404,6 +840,7 @@ def edit_artist(artist_id):
     Return: 
             the new data to the edit_artist.html page   
   '''      
+  from forms import ArtistForm
   form = ArtistForm()
   recored = Artist.query.get(artist_id)
   artist={
@@ -441,11 +878,10 @@ def edit_artist_submission(artist_id):
     artist.genres = ','.join(request.form.getlist('genres'))
     db.session.add(artist)
     db.session.commit()
+    typeahead.add('artists', artist.id, artist.name)
   except:
     error = True
     db.session.rollback()
-  finally:
-    db.session.close() 
   if not error:
       flash('Artist ' + request.form['name'] + ' was successfully listed!')
   else:
@@ -463,6 +899,7 @@ def edit_venue(venue_id):
     Return: 
             the new data to the edit_venue.html page   
   '''      
+  from forms import VenueForm
   form = VenueForm()
   recored = Venue.query.get(venue_id)
   venue={
@@ -502,11 +939,10 @@ def edit_venue_submission(venue_id):
     venue.genres = ','.join(request.form.getlist('genres'))
     db.session.add(venue)
     db.session.commit()
+    typeahead.add('venues', venue.id, venue.name)
   except:
     error = True
     db.session.rollback()
-  finally:
-    db.session.close() 
   if not error:
     flash('Venue ' + request.form['name'] + ' was successfully listed!')
   else:
@@ -521,6 +957,7 @@ def create_artist_form():
   '''
     This function is used to create an artist form   
   '''      
+  from forms import ArtistForm
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
@@ -546,11 +983,10 @@ def create_artist_submission():
     recored.genres = ','.join(request.form.getlist('genres'))
     db.session.add(recored)
     db.session.commit()
+    typeahead.add('artists', recored.id, recored.name)
   except:
     error = True
     db.session.rollback()
-  finally:
-    db.session.close() 
   if not error:
       flash('Artist ' + request.form['name'] + ' was successfully listed!')
   else:
@@ -584,6 +1020,7 @@ def shows():
 @app.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
+  from forms import ShowForm
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
@@ -598,24 +1035,266 @@ def create_show_submission():
             return to the home page
   '''       
   error = False
+  conflict = None
   try:
+    rolled_at = show_counters_state().rolled_at
     recored = Show()
-    recored.venue_id = request.form['venue_id']
-    recored.artist_id = request.form['artist_id']
-    recored.start_time = request.form['start_time']
-    db.session.add(recored)
-    db.session.commit()
+    recored.venue_id = int(request.form['venue_id'])
+    recored.artist_id = int(request.form['artist_id'])
+    recored.start_time = parse_datetime(request.form['start_time'])
+    duration = int(request.form.get('duration') or app.config['SHOW_DEFAULT_DURATION_MINUTES'])
+    if not 0 < duration <= app.config['SHOW_MAX_DURATION_MINUTES']:
+      raise ValueError('invalid duration')
+    recored.end_time = recored.start_time + timedelta(minutes=duration)
+    # bookings of the same venue or artist wait for each other here, always
+    # venue first, so the check below cannot race with another booking
+    Venue.query.filter_by(id=recored.venue_id).with_for_update().one()
+    Artist.query.filter_by(id=recored.artist_id).with_for_update().one()
+    conflict = booking_conflict(recored)
+    if conflict is None:
+      db.session.add(recored)
+      count_show(recored, 1, rolled_at)
+      db.session.commit()
+    else:
+      db.session.rollback()
+  except exc.IntegrityError:
+    # the exclusion constraint caught an overlap
+    conflict = 'the venue is already booked at that time'
+    db.session.rollback()
   except:
     error = True
     db.session.rollback()
-  finally:
-    db.session.close() 
-  if not error:
+  if conflict:
+    flash('Show could not be listed: ' + conflict + '.')
+  elif not error:
       flash('Show was successfully listed!')
   else:
     flash('An error occurred. Show could not be listed.')
   return render_template('pages/home.html')
 
+@app.route('/shows/<int:show_id>', methods=['DELETE'])
+def delete_show(show_id):
+  '''
+    This function is used to delete a show and update the show counters
+    of its venue and artist.
+
+    Arg:
+        show_id : the id of the show to be deleted
+  '''
+  show = Show.query.get_or_404(show_id)
+  try:
+    count_show(show, -1, show_counters_state().rolled_at)
+    db.session.delete(show)
+    db.session.commit()
+  except:
+    db.session.rollback()
+    return jsonify({'success': False}), 500
+  return jsonify({'success': True, 'deleted': show_id})
+
+#  Exports
+#  ----------------------------------------------------------------
+
+@app.route('/export/<kind>.<format>')
+def export(kind, format):
+  '''
+    This function is used to download every show or venue, streamed as the
+    rows come from the database, e.g. /export/shows.csv?from=2026-01-01
+    &to=2027-01-01 or /export/venues.ndjson
+
+    Return:
+            the csv or ndjson file, sent chunk by chunk
+  '''
+  if kind not in ('shows', 'venues') or format not in exports.FORMATS:
+    abort(404)
+  try:
+    start = parse_datetime(request.args['from']) if request.args.get('from') else None
+    end = parse_datetime(request.args['to']) if request.args.get('to') else None
+  except (ValueError, OverflowError):
+    return jsonify({'success': False, 'message': 'from and to must be dates'}), 400
+  columns, rows = export_query(kind, start, end)
+  # the request context, and with it the database session, stays open
+  # until the last chunk is sent
+  return Response(
+    stream_with_context(exports.export_chunks(format, columns, rows)),
+    content_type=exports.FORMATS[format],
+    headers={'Content-Disposition': 'attachment; filename={}.{}'.format(kind, format)})
+
+#  API
+#  ----------------------------------------------------------------
+#  read-only json of venues, artists and shows for machine clients, see
+#  json_api.py. ?fields= picks the columns that are selected, lists are
+#  paged with ?cursor= and every response has an ETag.
+
+API_VENUE_FIELDS = {
+  'id': Venue.id,
+  'name': Venue.name,
+  'city': Venue.city,
+  'state': Venue.state,
+  'address': Venue.address,
+  'phone': Venue.phone,
+  'genres': Venue.genres,
+  'image_link': Venue.image_link,
+  'facebook_link': Venue.facebook_link,
+  'upcoming_shows_count': Venue.upcoming_shows_count,
+  'past_shows_count': Venue.past_shows_count,
+}
+
+API_ARTIST_FIELDS = {
+  'id': Artist.id,
+  'name': Artist.name,
+  'city': Artist.city,
+  'state': Artist.state,
+  'phone': Artist.phone,
+  'genres': Artist.genres,
+  'image_link': Artist.image_link,
+  'facebook_link': Artist.facebook_link,
+  'upcoming_shows_count': Artist.upcoming_shows_count,
+  'past_shows_count': Artist.past_shows_count,
+}
+
+API_SHOW_FIELDS = {
+  'id': Show.id,
+  'venue_id': Show.venue_id,
+  'artist_id': Show.artist_id,
+  'start_time': Show.start_time,
+  'end_time': Show.end_time,
+  'venue_name': Venue.name,
+  'artist_name': Artist.name,
+}
+
+API_DEFAULT_FIELDS = ('id', 'name', 'city', 'state')
+API_SHOW_DEFAULT_FIELDS = ('id', 'venue_id', 'artist_id', 'start_time', 'end_time')
+
+def api_error(message, status=400):
+  return jsonify({'success': False, 'message': message}), status
+
+def api_response(payload):
+  '''
+    This function is used to send an api payload with an ETag computed from
+    the body, a client sending it back in If-None-Match gets an empty 304.
+  '''
+  response = jsonify(payload)
+  response.headers['Cache-Control'] = 'no-cache'
+  response.add_etag()
+  return response.make_conditional(request)
+
+def api_list(query, fields, default, key=('id',), key_types=(int,)):
+  '''
+    This function is used to answer a list request of the api, one page of
+    the query with the ?fields, ?cursor and ?limit arguments.
+
+    Return:
+            json {"data": [...], "next_cursor": ...}, next_cursor is null on
+            the last page
+  '''
+  try:
+    names = json_api.parse_fields(request.args.get('fields'), fields, default)
+    limit = json_api.parse_limit(request.args.get('limit'))
+    data, next_cursor = json_api.page(
+      query, fields, names, key, key_types, request.args.get('cursor'), limit)
+  except ValueError as error:
+    return api_error(str(error))
+  return api_response({'data': data, 'next_cursor': next_cursor})
+
+def api_detail(query, fields, default):
+  try:
+    names = json_api.parse_fields(request.args.get('fields'), fields, default)
+  except ValueError as error:
+    return api_error(str(error))
+  row = query.with_entities(*[fields[name].label(name) for name in names]).first()
+  if row is None:
+    return api_error('not found', 404)
+  return api_response({
+    'data': {name: json_api.serialize(getattr(row, name)) for name in names}
+  })
+
+def api_place_filter(query, model):
+  for name in ('city', 'state'):
+    if request.args.get(name):
+      query = query.filter(getattr(model, name) == request.args[name])
+  return query
+
+@app.route('/api/v1/venues')
+def api_venues():
+  '''
+    This function is used to list the venues, e.g.
+    /api/v1/venues?fields=id,name,upcoming_shows_count&state=CA&limit=100
+
+    Arg (query string):
+        fields      : comma separated, id,name,city,state by default
+        city, state : only the venues of that place
+        cursor      : next_cursor of the previous page
+        limit       : page size (50, at most 500)
+  '''
+  query = api_place_filter(db.session.query(Venue), Venue)
+  return api_list(query, API_VENUE_FIELDS, API_DEFAULT_FIELDS)
+
+@app.route('/api/v1/venues/<int:venue_id>')
+def api_venue(venue_id):
+  query = db.session.query(Venue).filter(Venue.id == venue_id)
+  return api_detail(query, API_VENUE_FIELDS, API_VENUE_FIELDS)
+
+@app.route('/api/v1/artists')
+def api_artists():
+  '''
+    This function is used to list the artists, with the same arguments as
+    /api/v1/venues.
+  '''
+  query = api_place_filter(db.session.query(Artist), Artist)
+  return api_list(query, API_ARTIST_FIELDS, API_DEFAULT_FIELDS)
+
+@app.route('/api/v1/artists/<int:artist_id>')
+def api_artist(artist_id):
+  query = db.session.query(Artist).filter(Artist.id == artist_id)
+  return api_detail(query, API_ARTIST_FIELDS, API_ARTIST_FIELDS)
+
+def api_show_query(fields):
+  '''
+    This function is used to start a show query of the api, joining the
+    venues and artists only when one of their names is requested.
+  '''
+  try:
+    names = json_api.parse_fields(fields, API_SHOW_FIELDS, API_SHOW_DEFAULT_FIELDS)
+  except ValueError:
+    names = ()
+  query = db.session.query(Show)
+  if 'venue_name' in names:
+    query = query.join(Venue, Venue.id == Show.venue_id)
+  if 'artist_name' in names:
+    query = query.join(Artist, Artist.id == Show.artist_id)
+  return query
+
+@app.route('/api/v1/shows')
+def api_shows():
+  '''
+    This function is used to list the shows by start time, e.g.
+    /api/v1/shows?fields=start_time,venue_name,artist_name&from=2026-11-01
+
+    Arg (query string):
+        fields               : comma separated, also venue_name and artist_name
+        venue_id, artist_id  : only the shows of that venue or artist
+        from, to             : only the shows starting in [from, to)
+        cursor, limit        : as for /api/v1/venues
+  '''
+  query = api_show_query(request.args.get('fields'))
+  try:
+    for name in ('venue_id', 'artist_id'):
+      if request.args.get(name):
+        query = query.filter(getattr(Show, name) == int(request.args[name]))
+    if request.args.get('from'):
+      query = query.filter(Show.start_time >= parse_datetime(request.args['from']))
+    if request.args.get('to'):
+      query = query.filter(Show.start_time < parse_datetime(request.args['to']))
+  except (ValueError, OverflowError):
+    return api_error('venue_id and artist_id must be integers, from and to dates')
+  return api_list(query, API_SHOW_FIELDS, API_SHOW_DEFAULT_FIELDS,
+                  key=('start_time', 'id'), key_types=(datetime, int))
+
+@app.route('/api/v1/shows/<int:show_id>')
+def api_show(show_id):
+  query = api_show_query(request.args.get('fields')).filter(Show.id == show_id)
+  return api_detail(query, API_SHOW_FIELDS, API_SHOW_DEFAULT_FIELDS)
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -626,13 +1305,7 @@ def server_error(error):
 
 
 if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
+    setup_async_logging(app.logger, app.config['LOG_FILE'], level=logging.INFO)
     app.logger.info('errors')
 
 #----------------------------------------------------------------------------#
@@ -0,0 +1,107 @@
+'''
+Cold start benchmark
+
+starts fresh python processes and measures the time to import the app and
+the latency of the first and the second request to a few pages, with the
+template cache settings of template_cache.py:
+
+    no cache          TEMPLATE_CACHE_DIR empty, templates compiled on demand
+    bytecode (cold)   an empty bytecode cache, the first process fills it
+    bytecode (warm)   the bytecode cache filled by the previous process
+    warm + preload    as wsgi.py does: every template loaded at startup
+
+the first request of a page is what a new worker pays after a deploy or a
+scale out, the second one is the steady state.
+
+usage (from the starter_code directory):
+    python -m benchmarks.cold_start --runs 5
+'''
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ['/', '/venues/create', '/artists/create', '/shows/create']
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(paths, preload):
+    '''
+        runs in the measured process, prints the timings as json
+    '''
+    started = time.perf_counter()
+    from app import app
+    imported = time.perf_counter() - started
+    if preload:
+        from template_cache import preload_templates
+        preload_templates(app)
+    startup = time.perf_counter() - started
+    client = app.test_client()
+    first, second = {}, {}
+    for path in paths:
+        for timings in (first, second):
+            begin = time.perf_counter()
+            client.get(path)
+            timings[path] = time.perf_counter() - begin
+    print(json.dumps({'import': imported, 'startup': startup,
+                      'first': first, 'second': second}))
+
+
+def measure(paths, cache_dir, preload):
+    env = dict(os.environ, TEMPLATE_CACHE_DIR=cache_dir,
+               TEMPLATE_PRELOAD='1' if preload else '0',
+               PYTHONWARNINGS='ignore')
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--child',
+         '--paths', ','.join(paths)] + (['--preload'] if preload else []),
+        cwd=HERE, env=env, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--paths', default=','.join(PATHS))
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--preload', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    paths = args.paths.split(',')
+    if args.child:
+        child(paths, args.preload)
+        return
+
+    results = {}
+    for _ in range(args.runs):
+        cache_dir = tempfile.mkdtemp(prefix='fyyur-jinja-')
+        try:
+            runs = [
+                ('no cache', measure(paths, '', False)),
+                ('bytecode (cold)', measure(paths, cache_dir, False)),
+                ('bytecode (warm)', measure(paths, cache_dir, False)),
+                ('warm + preload', measure(paths, cache_dir, True)),
+            ]
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        for name, result in runs:
+            results.setdefault(name, []).append(result)
+
+    print('median of {} runs, milliseconds'.format(args.runs))
+    print('{:<18} {:>8} {:>14} {:>15}'.format(
+        'setting', 'startup', 'first requests', 'second requests'))
+    for name, runs in results.items():
+        print('{:<18} {:>8.1f} {:>14.1f} {:>15.1f}'.format(
+            name,
+            statistics.median(r['startup'] for r in runs) * 1000,
+            statistics.median(sum(r['first'].values()) for r in runs) * 1000,
+            statistics.median(sum(r['second'].values()) for r in runs) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+'''
+Synthetic data generator
+
+bulk loads deterministic, production shaped data into the database from
+config.py (DATABASE_URL): venues and artists spread over real cities with a
+few very popular ones, and shows skewed towards the past with a tail of
+upcoming dates, in two evening slots so no venue is double booked. the same
+--seed always produces the same rows, so runs can be compared. the
+upcoming/past show counters of the venues and artists are recomputed at
+the end.
+
+postgresql is loaded with COPY, other databases with batched executemany.
+
+usage (from the starter_code directory):
+    python -m benchmarks.generate_data --venues 100000 --artists 1000000 \
+        --shows 10000000 --create --truncate
+'''
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+import config
+from app import Artist, Show, ShowCounters, Venue, app, db, \
+    recount_show_counters
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('San Francisco', 'CA'),
+    ('Chicago', 'IL'), ('Houston', 'TX'), ('Austin', 'TX'),
+    ('Seattle', 'WA'), ('Portland', 'OR'), ('Denver', 'CO'),
+    ('Nashville', 'TN'), ('Memphis', 'TN'), ('New Orleans', 'LA'),
+    ('Atlanta', 'GA'), ('Miami', 'FL'), ('Boston', 'MA'),
+    ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+    ('Phoenix', 'AZ'), ('Las Vegas', 'NV'), ('Salt Lake City', 'UT'),
+    ('Kansas City', 'MO'), ('St. Louis', 'MO'), ('Columbus', 'OH'),
+    ('Pittsburgh', 'PA'), ('Baltimore', 'MD'), ('Washington', 'DC'),
+    ('Raleigh', 'NC'), ('San Diego', 'CA'), ('Albuquerque', 'NM'),
+]
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+    'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+    'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul',
+    'Other',
+]
+ADJECTIVES = [
+    'Blue', 'Golden', 'Velvet', 'Electric', 'Silver', 'Midnight', 'Crimson',
+    'Wild', 'Rusty', 'Neon', 'Lucky', 'Hidden', 'Broken', 'Royal', 'Dusty',
+    'Cosmic', 'Little', 'Grand', 'Lonely', 'Iron',
+]
+NOUNS = [
+    'Room', 'Hall', 'Lounge', 'Tavern', 'Garden', 'Cellar', 'Barn', 'Theatre',
+    'Club', 'Stage', 'Factory', 'Parlor', 'Attic', 'Dock', 'Saloon',
+]
+BANDS = [
+    'Wolves', 'Kings', 'Echoes', 'Rivers', 'Ghosts', 'Sparrows', 'Machines',
+    'Brothers', 'Sisters', 'Pilots', 'Lanterns', 'Tides', 'Strangers',
+    'Comets', 'Outlaws',
+]
+BATCH_SIZE = 10000
+
+
+def pick_city(rng):
+    # a handful of big cities hold most of the venues and artists
+    return CITIES[min(int(rng.paretovariate(1.2)) - 1, len(CITIES) - 1)]
+
+
+def pick_genres(rng):
+    return ','.join(rng.sample(GENRES, rng.randint(1, 3)))
+
+
+def phone(rng):
+    return '{:03d}-{:03d}-{:04d}'.format(
+        rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999))
+
+
+def venues(rng, count):
+    for i in range(1, count + 1):
+        city, state = pick_city(rng)
+        name = 'The {} {} {}'.format(
+            rng.choice(ADJECTIVES), rng.choice(NOUNS), i)
+        yield {
+            'id': i, 'name': name, 'city': city, 'state': state,
+            'genres': pick_genres(rng),
+            'address': '{} {} St'.format(rng.randint(1, 9999),
+                                         rng.choice(ADJECTIVES)),
+            'phone': phone(rng),
+            'image_link': 'https://images.example.com/venues/{}.jpg'.format(i),
+            'facebook_link': 'https://www.facebook.com/venue{}'.format(i),
+        }
+
+
+def artists(rng, count):
+    for i in range(1, count + 1):
+        city, state = pick_city(rng)
+        name = 'The {} {} {}'.format(
+            rng.choice(ADJECTIVES), rng.choice(BANDS), i)
+        yield {
+            'id': i, 'name': name, 'city': city, 'state': state,
+            'phone': phone(rng), 'genres': pick_genres(rng),
+            'image_link': 'https://images.example.com/artists/{}.jpg'.format(i),
+            'facebook_link': 'https://www.facebook.com/artist{}'.format(i),
+        }
+
+
+def skewed_id(rng, count):
+    # popular venues / artists get far more shows than the long tail
+    return min(int(rng.paretovariate(0.8) * count / 50), count - 1) + 1 \
+        if rng.random() < 0.5 else rng.randint(1, count)
+
+
+class VenueCalendar:
+    '''
+    VenueCalendar
+    one bit per venue, day and evening slot, so the generated shows of a
+    venue never overlap (the database rejects overlapping shows)
+    '''
+    SLOTS = [(19, 0), (21, 30)]
+
+    def __init__(self, venue_count, past_days, future_days):
+        self.past_days = past_days
+        self.days = past_days + future_days + 1
+        size = venue_count * self.days * len(self.SLOTS)
+        self.bits = bytearray(size // 8 + 1)
+
+    def book(self, venue_id, day, slot):
+        index = ((venue_id - 1) * self.days + day + self.past_days) \
+            * len(self.SLOTS) + slot
+        if self.bits[index // 8] & (1 << index % 8):
+            return False
+        self.bits[index // 8] |= 1 << index % 8
+        return True
+
+
+def shows(rng, count, venue_count, artist_count, now, past_days,
+          future_days, upcoming_ratio):
+    calendar = VenueCalendar(venue_count, past_days, future_days)
+    if count > venue_count * calendar.days * len(VenueCalendar.SLOTS) // 2:
+        # past half of the slots, finding free ones takes too many retries
+        raise SystemExit('too many shows for the venues and days, raise '
+                         '--venues or --past-days')
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    i = 0
+    while i < count:
+        if rng.random() < upcoming_ratio:
+            day = rng.randint(0, future_days)
+        else:
+            # more recent dates are more likely than old ones
+            day = -int(past_days * rng.random() ** 2) - 1
+        venue_id = skewed_id(rng, venue_count)
+        slot = rng.randrange(len(VenueCalendar.SLOTS))
+        if not calendar.book(venue_id, day, slot):
+            # the slot is taken, the show goes to a random venue instead
+            venue_id = rng.randint(1, venue_count)
+            if not calendar.book(venue_id, day, slot):
+                continue
+        hour, minute = VenueCalendar.SLOTS[slot]
+        start = today + timedelta(days=day, hours=hour, minutes=minute)
+        i += 1
+        yield {
+            'id': i,
+            'venue_id': venue_id,
+            'artist_id': skewed_id(rng, artist_count),
+            'start_time': start,
+            # at most 150 minutes: the 19:00 show ends before the 21:30 one
+            'end_time': start + timedelta(minutes=rng.choice([90, 120, 150])),
+        }
+
+
+def batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load(engine, table, rows, total):
+    started = time.time()
+    loaded = 0
+    columns = [column.name for column in table.columns]
+    for batch in batches(rows):
+        if engine.dialect.name == 'postgresql':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow([row.get(column) for column in columns])
+            buffer.seek(0)
+            connection = engine.raw_connection()
+            try:
+                connection.cursor().copy_expert(
+                    'COPY {} ({}) FROM STDIN WITH CSV'.format(
+                        table.name, ', '.join(columns)), buffer)
+                connection.commit()
+            finally:
+                connection.close()
+        else:
+            with engine.begin() as connection:
+                connection.execute(table.insert(), batch)
+        loaded += len(batch)
+        print('\r{:<8} {:>10}/{} rows  {:>8.0f} rows/s'.format(
+            table.name, loaded, total, loaded / (time.time() - started)),
+            end='', flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--shows', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--past-days', type=int, default=3 * 365)
+    parser.add_argument('--future-days', type=int, default=180)
+    parser.add_argument('--upcoming-ratio', type=float, default=0.15)
+    parser.add_argument('--now', default=None,
+                        help='reference date (YYYY-MM-DD), today by default')
+    parser.add_argument('--create', action='store_true',
+                        help='create the missing tables first')
+    parser.add_argument('--truncate', action='store_true',
+                        help='delete the existing rows first')
+    args = parser.parse_args()
+
+    engine = create_engine(config.SQLALCHEMY_DATABASE_URI)
+    tables = [Venue.__table__, Artist.__table__, Show.__table__]
+    if args.create:
+        db.metadata.create_all(engine,
+                               tables=tables + [ShowCounters.__table__])
+    if args.truncate:
+        with engine.begin() as connection:
+            for table in reversed(tables):
+                connection.execute(table.delete())
+
+    now = datetime.strptime(args.now, '%Y-%m-%d') if args.now \
+        else datetime.today()
+    # one generator per table, so changing one volume keeps the others stable
+    load(engine, Venue.__table__,
+         venues(random.Random(args.seed), args.venues), args.venues)
+    load(engine, Artist.__table__,
+         artists(random.Random(args.seed + 1), args.artists), args.artists)
+    load(engine, Show.__table__,
+         shows(random.Random(args.seed + 2), args.shows, args.venues,
+               args.artists, now, args.past_days, args.future_days,
+               args.upcoming_ratio), args.shows)
+
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as connection:
+            for table in tables:
+                # the rows were loaded with explicit ids
+                connection.execute(
+                    "SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                    "(SELECT max(id) FROM {0}))".format(table.name))
+                connection.execute('ANALYZE {}'.format(table.name))
+
+    # the rows were loaded around the orm, fill the show counters once
+    with app.app_context():
+        recount_show_counters(now)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+'''
+Fyyur load test
+
+a pure python asyncio client (no extra dependencies) that drives a running
+Fyyur with a weighted mix of listing, search, detail and show pages and
+their /api/v1 json counterparts over keep-alive connections. for every scenario it reports throughput, error
+count, p50/p95/p99 latency and the average number of queries per request,
+read from the Server-Timing header added by instrumentation.py.
+
+usage (from the starter_code directory, with the app running and seeded by
+benchmarks.generate_data):
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 \
+        --concurrency 50 --seconds 60 --json report.json
+'''
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from urllib.parse import urlsplit
+
+from flask_perf.bench import percentile
+from sqlalchemy import create_engine, text
+
+SCENARIOS = [
+    # name, weight
+    ('GET /venues', 10),
+    ('POST /venues/search', 20),
+    ('POST /artists/search', 20),
+    ('GET /venues/<id>', 25),
+    ('GET /artists/<id>', 20),
+    ('GET /shows', 5),
+    # the json api next to the pages it replaces for machine clients
+    ('GET /api/v1/venues/<id>', 10),
+    ('GET /api/v1/artists/<id>', 10),
+    ('GET /api/v1/shows', 5),
+]
+SEARCH_TERMS = ['blue', 'the', 'room', 'wolves', 'neon', 'golden h', 'kings',
+                'hall 1', 'mid', 'x']
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def build_request(scenario, rng, host, max_ids):
+    method, path = scenario.split(' ', 1)
+    body = b''
+    if path.endswith('/venues/<id>'):
+        path = path.replace('<id>', str(rng.randint(1, max_ids['venues'])))
+    elif path.endswith('/artists/<id>'):
+        path = path.replace('<id>', str(rng.randint(1, max_ids['artists'])))
+    elif path.endswith('/search'):
+        body = 'search_term={}'.format(
+            rng.choice(SEARCH_TERMS).replace(' ', '+')).encode()
+    head = '{} {} HTTP/1.1\r\nHost: {}\r\nConnection: keep-alive\r\n'.format(
+        method, path, host)
+    if body:
+        head += 'Content-Type: application/x-www-form-urlencoded\r\n'
+    head += 'Content-Length: {}\r\n\r\n'.format(len(body))
+    return head.encode() + body
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        headers[name] = headers[name] + ', ' + value.strip() \
+            if name in headers else value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers
+
+
+async def worker(url, deadline, rng, max_ids, results):
+    scenarios = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    reader = writer = None
+    while time.time() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    url.hostname, url.port or 80)
+            writer.write(build_request(scenario, rng, url.netloc, max_ids))
+            status, headers = await read_response(reader)
+            if headers.get('connection', '').lower() == 'close':
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, ValueError, IndexError,
+                asyncio.IncompleteReadError):
+            results[scenario]['errors'] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            continue
+        elapsed = time.perf_counter() - started
+        result = results[scenario]
+        if status >= 500:
+            result['errors'] += 1
+            continue
+        result['latencies'].append(elapsed)
+        match = QUERIES.search(headers.get('server-timing', ''))
+        if match:
+            result['queries'].append(int(match.group(1)))
+    if writer is not None:
+        writer.close()
+
+
+def max_ids():
+    # imported here: pytest collects this file (*_test.py), config must not
+    # be loaded before the tests pick their database
+    import config
+    engine = create_engine(config.SQLALCHEMY_DATABASE_URI)
+    with engine.connect() as connection:
+        ids = {table: connection.execute(text(
+            'SELECT coalesce(max(id), 1) FROM {}'.format(table))).scalar()
+            for table in ('venues', 'artists')}
+    engine.dispose()
+    return ids
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    ids = max_ids()
+    results = {name: {'latencies': [], 'queries': [], 'errors': 0}
+               for name, _ in SCENARIOS}
+    deadline = time.time() + args.seconds
+    await asyncio.gather(*[
+        worker(url, deadline, random.Random(args.seed + i), ids, results)
+        for i in range(args.concurrency)])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    report = {}
+    print('{:<22} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9}'.format(
+        'scenario', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms',
+        'queries'))
+    for name, _ in SCENARIOS:
+        result = results[name]
+        latencies = result['latencies']
+        queries = result['queries']
+        row = {
+            'requests': len(latencies),
+            'rps': len(latencies) / args.seconds,
+            'errors': result['errors'],
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries_per_request':
+                sum(queries) / len(queries) if queries else None,
+        }
+        report[name] = row
+        print('{:<22} {:>8.1f} {:>7} {:>9.2f} {:>9.2f} {:>9.2f} {:>9}'.format(
+            name, row['rps'], row['errors'], row['p50_ms'], row['p95_ms'],
+            row['p99_ms'],
+            '-' if row['queries_per_request'] is None
+            else '{:.1f}'.format(row['queries_per_request'])))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'scenarios': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
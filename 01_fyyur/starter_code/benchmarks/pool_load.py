@@ -0,0 +1,104 @@
+'''
+Connection pool load test
+
+runs concurrent clients against the engine configured in config.py and
+reports how many physical connections were opened for the checkouts made,
+the time spent waiting for the pool and the tail latency of each query.
+set DB_PROFILE / DB_POOL_SIZE / ... as you would for the app to compare
+profiles.
+
+usage (from the starter_code directory):
+    python -m benchmarks.pool_load --clients 200 --requests 50
+'''
+import argparse
+import threading
+import time
+
+from flask_perf.bench import percentile
+from sqlalchemy import create_engine, event, text
+
+import config
+from db_profile import apply_statement_timeout
+
+QUERY = 'SELECT id, name FROM venues ORDER BY id LIMIT 20'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50,
+                        help='queries per client')
+    parser.add_argument('--think', type=float, default=0.005,
+                        help='seconds each client sleeps between queries')
+    parser.add_argument('--query', default=QUERY)
+    args = parser.parse_args()
+
+    engine = create_engine(config.SQLALCHEMY_DATABASE_URI,
+                           **config.SQLALCHEMY_ENGINE_OPTIONS)
+    apply_statement_timeout(engine, config.DB_PROFILE,
+                            config.DB_STATEMENT_TIMEOUT)
+
+    counters = {'connects': 0, 'checkouts': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        with lock:
+            counters['connects'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with lock:
+            counters['checkouts'] += 1
+
+    waits = []
+    latencies = []
+    start_barrier = threading.Barrier(args.clients)
+
+    def client():
+        start_barrier.wait()
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            try:
+                connection = engine.connect()
+                checked_out = time.perf_counter()
+                with connection.begin():
+                    connection.execute(text(args.query)).fetchall()
+                connection.close()
+            except Exception:
+                with lock:
+                    counters['errors'] += 1
+                continue
+            finished = time.perf_counter()
+            with lock:
+                waits.append(checked_out - started)
+                latencies.append(finished - started)
+            time.sleep(args.think)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    print('profile           {}'.format(config.DB_PROFILE))
+    print('engine options    {}'.format(config.SQLALCHEMY_ENGINE_OPTIONS))
+    print('clients           {}'.format(args.clients))
+    print('queries           {} in {:.2f}s ({:.0f}/s)'.format(
+        len(latencies), elapsed, len(latencies) / elapsed))
+    print('errors            {}'.format(counters['errors']))
+    print('connections made  {}'.format(counters['connects']))
+    print('checkouts         {} ({:.1f} per connection)'.format(
+        counters['checkouts'],
+        counters['checkouts'] / max(counters['connects'], 1)))
+    for p in (0.50, 0.95, 0.99):
+        print('p{:<3} latency ms  {:8.2f}   pool wait ms {:8.2f}'.format(
+            int(p * 100), percentile(latencies, p) * 1000,
+            percentile(waits, p) * 1000))
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+'''
+gunicorn worker class benchmark
+
+starts the app under gunicorn once per worker class (sync, gthread, gevent)
+with gunicorn.conf.py, drives the hot endpoints with concurrent keep-alive
+clients and prints throughput and latency percentiles for each class. the
+driver is shared with the other apps (flask_perf.bench), only the endpoints
+are listed here.
+
+usage (from the starter_code directory, with the database running):
+    python -m benchmarks.worker_classes --clients 64 --seconds 15
+'''
+import os
+
+from flask_perf.bench import worker_classes_main
+
+FORM = 'application/x-www-form-urlencoded'
+ENDPOINTS = [
+    ('GET', '/venues', None, None),
+    ('GET', '/artists', None, None),
+    ('GET', '/shows', None, None),
+    ('POST', '/venues/search', 'search_term=a', FORM),
+    ('POST', '/artists/search', 'search_term=a', FORM),
+]
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == '__main__':
+    worker_classes_main(ENDPOINTS, HERE, __doc__.split('\n')[1])
@@ -1,13 +1,79 @@
+import multiprocessing
 import os
+from sqlalchemy.pool import NullPool
 SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Debug mode, off unless FLASK_DEBUG=1 (or FLASK_ENV=development) is set.
+# It reloads the templates from disk on every render, bypassing the compiled
+# template cache, and replaces the production error log with stderr.
+DEBUG = os.environ.get(
+    'FLASK_DEBUG',
+    '1' if os.environ.get('FLASK_ENV') == 'development' else '0') != '0'
+TEMPLATES_AUTO_RELOAD = DEBUG
+
+# Errors and warnings, written as json lines when not in debug mode.
+LOG_FILE = os.environ.get('LOG_FILE', os.path.join(basedir, 'error.log'))
 
 # Connect to the database
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'DATABASE_URL', 'postgres://mohamed:mohamed@22@localhost:5432/fyyur_database')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Database engine, every value can be overridden from the environment.
+# DB_PROFILE=pgbouncer is for a PgBouncer in transaction mode: PgBouncer owns
+# the pool, so the app keeps no idle connections, and the statement timeout is
+# set per transaction because session settings would leak to other clients.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+# Every gunicorn worker has its own pool, so workers * (DB_POOL_SIZE +
+# DB_MAX_OVERFLOW) must stay under the server's max_connections. The pool
+# defaults split DB_MAX_CONNECTIONS (the connections this host may open,
+# leave room for the other hosts and for maintenance) between the workers,
+# counted as in shared/flask_perf/gunicorn_settings.py.
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 90))
+WEB_CONCURRENCY = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+_per_worker = max(1, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', min(10, _per_worker)))
+DB_MAX_OVERFLOW = int(os.environ.get(
+    'DB_MAX_OVERFLOW', min(20, max(0, _per_worker - DB_POOL_SIZE))))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') != '0'
+# milliseconds, 0 disables the timeout
+DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 5000))
+
+if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+    # local development database, keep the sqlalchemy defaults
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+elif DB_PROFILE == 'pgbouncer':
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'poolclass': NullPool,
+    }
+else:
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT:
+        SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {
+            'options': '-c statement_timeout={}'.format(DB_STATEMENT_TIMEOUT)
+        }
+
+# Autocomplete (typeahead.py): every worker rebuilds its in-memory index this
+# often to see the changes made by the other workers, 0 never rebuilds.
+TYPEAHEAD_REFRESH_SECONDS = int(os.environ.get('TYPEAHEAD_REFRESH_SECONDS', 300))
+TYPEAHEAD_MAX_RESULTS = int(os.environ.get('TYPEAHEAD_MAX_RESULTS', 20))
 
+# Shows occupy their venue from start_time to end_time. The duration bound
+# keeps the overlap lookups to a bounded range of the start_time indexes.
+SHOW_DEFAULT_DURATION_MINUTES = int(os.environ.get('SHOW_DEFAULT_DURATION_MINUTES', 120))
+SHOW_MAX_DURATION_MINUTES = 24 * 60
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgres://mohamed:mohamed@22@localhost:5432/fyyur_database'
+# Monthly partitions of shows on postgresql (partitions.py): wsgi.py creates
+# the missing ones at startup, up to this many months ahead.
+SHOW_PARTITIONS_AHEAD = int(os.environ.get('SHOW_PARTITIONS_AHEAD', 12))
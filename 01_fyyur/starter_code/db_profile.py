@@ -0,0 +1,25 @@
+from sqlalchemy import event
+
+'''
+Database profile helpers shared by the app and benchmarks/pool_load.py, so
+the benchmark measures the engine the app runs with
+'''
+
+
+def apply_statement_timeout(engine, profile, milliseconds):
+    '''
+        with DB_PROFILE=pgbouncer, sets statement_timeout at the start of
+        every transaction of engine (SET LOCAL). a session level SET would
+        leak to the other clients of the PgBouncer server connection. the
+        default profile passes the timeout when connecting instead (see
+        config.py), and 0 disables it
+    '''
+    if profile != 'pgbouncer' or not milliseconds:
+        return engine
+
+    @event.listens_for(engine, 'begin')
+    def set_statement_timeout(connection):
+        connection.execute(
+            'SET LOCAL statement_timeout = {}'.format(int(milliseconds)))
+
+    return engine
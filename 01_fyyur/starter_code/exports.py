@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from datetime import date
+
+'''
+Streaming exports
+
+the rows of an export query are fetched FETCH_SIZE at a time (yield_per,
+which also asks the driver for a server side cursor on postgresql) and
+written as csv or newline delimited json into chunks of about CHUNK_SIZE
+bytes, each chunk is handed to the caller (a streaming flask Response or a
+file) before the next rows are read. memory stays the same whatever the
+number of rows, a few batches of rows and one chunk.
+'''
+
+FETCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def stream(query):
+    '''
+        returns (column names, row iterator) of a query of columns
+    '''
+    columns = [column['name'] for column in query.column_descriptions]
+    return columns, query.yield_per(FETCH_SIZE)
+
+
+def csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default,
+                                separators=(',', ':')))
+        buffer.write('\n')
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def export_chunks(format, columns, rows):
+    '''
+        returns the iterator of the encoded chunks of the rows in `format`
+        (csv or ndjson)
+    '''
+    if format == 'csv':
+        return csv_chunks(columns, rows)
+    if format == 'ndjson':
+        return ndjson_chunks(columns, rows)
+    raise ValueError('unknown export format {}'.format(format))
@@ -1,7 +1,9 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange
+
+from config import SHOW_DEFAULT_DURATION_MINUTES, SHOW_MAX_DURATION_MINUTES
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -15,6 +17,13 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    # minutes, the show occupies the venue from start_time to start_time + duration
+    duration = IntegerField(
+        'duration',
+        validators=[DataRequired(),
+                    NumberRange(min=1, max=SHOW_MAX_DURATION_MINUTES)],
+        default=SHOW_DEFAULT_DURATION_MINUTES
+    )
 
 class VenueForm(Form):
     name = StringField(
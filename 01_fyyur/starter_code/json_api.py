@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+'''
+Helpers of the read-only JSON API (/api/v1)
+
+a resource is described by a dict of field name -> sql expression, e.g.
+{'id': Venue.id, 'name': Venue.name}. ?fields=id,name selects only those
+expressions, so the SELECT reads the requested columns and nothing else,
+and the joins behind a field (the venue name of a show) are only made when
+that field is asked for.
+
+lists are paged on a key (the id, or start_time then id for the shows):
+the cursor of the next page is the key of the last row, encoded as url
+safe base64 json, and the next page starts strictly after it. unlike an
+offset, deep pages cost the same as the first one and rows inserted in
+between do not shift the pages.
+'''
+
+MAX_LIMIT = 500
+
+
+def parse_fields(value, allowed, default):
+    '''
+        returns the list of requested fields, in the order of `allowed`,
+        raises ValueError on an unknown field
+    '''
+    if not value:
+        return list(default)
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError('unknown fields: {}'.format(
+            ', '.join(sorted(unknown))))
+    return [name for name in allowed if name in requested]
+
+
+def parse_limit(value, default=50):
+    try:
+        limit = default if value is None else int(value)
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= MAX_LIMIT:
+        raise ValueError('limit must be between 1 and {}'.format(MAX_LIMIT))
+    return limit
+
+
+def encode_cursor(values):
+    data = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, types):
+    '''
+        returns the key values of a cursor, converted with `types`
+        (int or datetime), raises ValueError on a malformed cursor
+    '''
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw.decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(data, list) or len(data) != len(types):
+        raise ValueError('invalid cursor')
+    values = []
+    for kind, value in zip(types, data):
+        # null, lists and objects are not keys, the conversion would raise
+        # TypeError
+        if not isinstance(value, (str, int)) or isinstance(value, bool):
+            raise ValueError('invalid cursor')
+        if kind is datetime:
+            if not isinstance(value, str):
+                raise ValueError('invalid cursor')
+            values.append(datetime.fromisoformat(value))
+        else:
+            values.append(kind(value))
+    return values
+
+
+def after_key(columns, values):
+    '''
+        returns the filter of the rows that sort after `values` on
+        `columns`, i.e. (a, b) > (x, y) written as a > x or a = x and b > y
+    '''
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column > value
+    return or_(column > value,
+               and_(column == value, after_key(columns[1:], values[1:])))
+
+
+def serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def page(query, resource, fields, key, key_types, cursor, limit):
+    '''
+        runs one page of a list query, selecting only `fields` of
+        `resource` plus the key columns
+
+        Return:
+                (rows as dicts, cursor of the next page or None)
+    '''
+    key_columns = [resource[name] for name in key]
+    names = list(fields) + [name for name in key if name not in fields]
+    query = query.with_entities(*[resource[name].label(name)
+                                  for name in names])
+    if cursor:
+        query = query.filter(after_key(key_columns,
+                                       decode_cursor(cursor, key_types)))
+    rows = query.order_by(*key_columns).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, name) for name in key])
+    data = [{name: serialize(getattr(row, name)) for name in fields}
+            for row in rows]
+    return data, next_cursor
@@ -0,0 +1,114 @@
+"""partition shows by month on postgresql
+
+Revision ID: 3f7e9b1a6c20
+Revises: 8a41f0c2d9b7
+Create Date: 2026-10-19 14:02:51.907113
+
+shows becomes a table range partitioned by month on start_time, with one
+partition per month from the oldest show to 12 months ahead and a default
+partition for the rest. the primary key becomes (id, start_time), as
+postgresql requires the partition key in it; ids still come from the same
+sequence and stay unique. other databases keep the plain table and only
+get the (venue_id, start_time) and (artist_id, start_time) indexes.
+"""
+from datetime import datetime
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7e9b1a6c20'
+down_revision = '8a41f0c2d9b7'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 12
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.create_index('ix_shows_venue_id_start_time', 'shows',
+                        ['venue_id', 'start_time'])
+        op.create_index('ix_shows_artist_id_start_time', 'shows',
+                        ['artist_id', 'start_time'])
+        return
+
+    op.execute('ALTER TABLE shows RENAME TO shows_unpartitioned')
+    op.execute('ALTER INDEX ix_shows_start_time RENAME TO '
+               'ix_shows_unpartitioned_start_time')
+    op.execute('ALTER TABLE shows_unpartitioned RENAME CONSTRAINT shows_pkey '
+               'TO shows_unpartitioned_pkey')
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY NONE')
+    op.execute("""
+        CREATE TABLE shows (
+            id integer NOT NULL DEFAULT nextval('shows_id_seq'),
+            venue_id integer NOT NULL REFERENCES venues (id),
+            artist_id integer NOT NULL REFERENCES artists (id),
+            start_time timestamp without time zone NOT NULL,
+            PRIMARY KEY (id, start_time)
+        ) PARTITION BY RANGE (start_time)
+    """)
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY shows.id')
+    op.execute('CREATE INDEX ix_shows_start_time ON shows (start_time)')
+    op.execute('CREATE INDEX ix_shows_venue_id_start_time '
+               'ON shows (venue_id, start_time)')
+    op.execute('CREATE INDEX ix_shows_artist_id_start_time '
+               'ON shows (artist_id, start_time)')
+    op.execute('CREATE TABLE shows_default PARTITION OF shows DEFAULT')
+
+    oldest = bind.execute(
+        'SELECT min(start_time) FROM shows_unpartitioned').scalar()
+    today = datetime.today()
+    month = datetime((oldest or today).year, (oldest or today).month, 1)
+    last = add_months(datetime(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        end = add_months(month, 1)
+        op.execute(
+            "CREATE TABLE shows_y{:04d}m{:02d} PARTITION OF shows "
+            "FOR VALUES FROM ('{}') TO ('{}')".format(
+                month.year, month.month, month.isoformat(' '),
+                end.isoformat(' ')))
+        month = end
+
+    op.execute('INSERT INTO shows (id, venue_id, artist_id, start_time) '
+               'SELECT id, venue_id, artist_id, start_time '
+               'FROM shows_unpartitioned')
+    op.execute('DROP TABLE shows_unpartitioned')
+    op.execute('ANALYZE shows')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+        op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+        return
+
+    op.execute('ALTER TABLE shows RENAME TO shows_partitioned')
+    op.execute('ALTER INDEX ix_shows_start_time RENAME TO '
+               'ix_shows_partitioned_start_time')
+    op.execute('ALTER TABLE shows_partitioned RENAME CONSTRAINT shows_pkey '
+               'TO shows_partitioned_pkey')
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY NONE')
+    op.execute("""
+        CREATE TABLE shows (
+            id integer NOT NULL DEFAULT nextval('shows_id_seq'),
+            venue_id integer NOT NULL REFERENCES venues (id),
+            artist_id integer NOT NULL REFERENCES artists (id),
+            start_time timestamp without time zone NOT NULL,
+            CONSTRAINT shows_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE shows_id_seq OWNED BY shows.id')
+    op.execute('INSERT INTO shows (id, venue_id, artist_id, start_time) '
+               'SELECT id, venue_id, artist_id, start_time '
+               'FROM shows_partitioned')
+    op.execute('DROP TABLE shows_partitioned')
+    op.create_index(op.f('ix_shows_start_time'), 'shows', ['start_time'],
+                    unique=False)
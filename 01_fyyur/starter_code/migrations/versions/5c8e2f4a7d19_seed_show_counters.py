@@ -0,0 +1,35 @@
+"""seed the show_counters row
+
+Revision ID: 5c8e2f4a7d19
+Revises: e4a81c6f2d05
+Create Date: 2026-10-19 20:41:27.913562
+
+the row used to be inserted by the first show write when it was missing
+(a database made with create_all), two concurrent first writes both tried
+to insert it and the loser was told the venue was booked. the row now
+exists from the start and is only ever read and updated.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2f4a7d19'
+down_revision = 'e4a81c6f2d05'
+branch_labels = None
+depends_on = None
+
+SEED_SHOW_COUNTERS = (
+    'INSERT INTO show_counters (id, rolled_at) SELECT 1, :now '
+    'WHERE NOT EXISTS (SELECT 1 FROM show_counters WHERE id = 1)')
+
+
+def upgrade():
+    op.execute(sa.text(SEED_SHOW_COUNTERS).bindparams(now=datetime.today()))
+
+
+def downgrade():
+    # the row is harmless for the previous code, which reads it
+    pass
@@ -0,0 +1,54 @@
+"""upcoming and past show counters on venues and artists
+
+Revision ID: 8a41f0c2d9b7
+Revises: c6d3604733d2
+Create Date: 2026-10-19 10:12:44.318205
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41f0c2d9b7'
+down_revision = 'c6d3604733d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venues', 'artists'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       nullable=False, server_default='0'))
+    op.create_index(op.f('ix_shows_start_time'), 'shows', ['start_time'],
+                    unique=False)
+    show_counters = op.create_table(
+        'show_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rolled_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # fill the counters from the existing shows
+    now = datetime.today()
+    op.bulk_insert(show_counters, [{'id': 1, 'rolled_at': now}])
+    for table, key in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.execute(sa.text(
+            'UPDATE {0} SET '
+            'upcoming_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{1} = {0}.id AND shows.start_time >= :now), '
+            'past_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{1} = {0}.id AND shows.start_time < :now)'
+            .format(table, key)).bindparams(now=now))
+
+
+def downgrade():
+    op.drop_table('show_counters')
+    op.drop_index(op.f('ix_shows_start_time'), table_name='shows')
+    for table in ('artists', 'venues'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
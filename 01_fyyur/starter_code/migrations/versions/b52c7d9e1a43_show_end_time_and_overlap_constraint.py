@@ -0,0 +1,78 @@
+"""show end time and venue double-booking constraint
+
+Revision ID: b52c7d9e1a43
+Revises: 3f7e9b1a6c20
+Create Date: 2026-10-19 16:40:07.552918
+
+shows get an end_time, filled with start_time + 120 minutes for the existing
+rows. on postgresql every partition of shows gets an exclusion constraint
+(btree_gist) so two shows of a venue cannot overlap. the migration stops if
+existing shows already overlap: move or delete them first, the failing
+statement names the partition.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52c7d9e1a43'
+down_revision = '3f7e9b1a6c20'
+branch_labels = None
+depends_on = None
+
+DEFAULT_DURATION = 120
+
+
+def partitions(bind):
+    rows = bind.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'shows'").fetchall()
+    return [row[0] for row in rows] or ['shows']
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.create_index('ix_venues_state_city', 'venues', ['state', 'city'],
+                    unique=False)
+
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('shows') as batch_op:
+            batch_op.add_column(sa.Column('end_time', sa.DateTime(),
+                                          nullable=True))
+        op.execute("UPDATE shows SET end_time = datetime(start_time, "
+                   "'+{} minutes')".format(DEFAULT_DURATION))
+        with op.batch_alter_table('shows') as batch_op:
+            batch_op.alter_column('end_time', existing_type=sa.DateTime(),
+                                  nullable=False)
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('shows', sa.Column('end_time', sa.DateTime(),
+                                     nullable=True))
+    op.execute("UPDATE shows SET end_time = start_time + interval "
+               "'{} minutes'".format(DEFAULT_DURATION))
+    op.alter_column('shows', 'end_time', existing_type=sa.DateTime(),
+                    nullable=False)
+    op.create_check_constraint('ck_shows_end_after_start', 'shows',
+                               'end_time > start_time')
+    for table in partitions(bind):
+        op.execute(
+            'ALTER TABLE {0} ADD CONSTRAINT {0}_venue_no_overlap EXCLUDE '
+            'USING gist (venue_id WITH =, tsrange(start_time, end_time) '
+            'WITH &&)'.format(table))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('shows') as batch_op:
+            batch_op.drop_column('end_time')
+    else:
+        for table in partitions(bind):
+            op.execute('ALTER TABLE {0} DROP CONSTRAINT '
+                       '{0}_venue_no_overlap'.format(table))
+        op.drop_constraint('ck_shows_end_after_start', 'shows', type_='check')
+        op.drop_column('shows', 'end_time')
+    op.drop_index('ix_venues_state_city', table_name='venues')
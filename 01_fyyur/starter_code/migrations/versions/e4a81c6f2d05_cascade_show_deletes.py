@@ -0,0 +1,53 @@
+"""delete the shows of a venue or an artist with it
+
+Revision ID: e4a81c6f2d05
+Revises: b52c7d9e1a43
+Create Date: 2026-10-19 18:21:36.204417
+
+the foreign keys of shows to venues and artists get ON DELETE CASCADE, so
+deleting a venue or an artist is one statement whatever its number of
+shows. on postgresql the constraints of the partitioned shows table are
+replaced in place (the new ones are checked against the existing rows),
+sqlite recreates the table.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a81c6f2d05'
+down_revision = 'b52c7d9e1a43'
+branch_labels = None
+depends_on = None
+
+# postgresql names the inline foreign keys <table>_<column>_fkey; on sqlite
+# they have no name and the batch naming convention gives them these
+FOREIGN_KEYS = (
+    ('shows_venue_id_fkey', 'venue_id', 'venues'),
+    ('shows_artist_id_fkey', 'artist_id', 'artists'),
+)
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def replace_foreign_keys(ondelete):
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table(
+                'shows', naming_convention=NAMING_CONVENTION) as batch_op:
+            for name, column, table in FOREIGN_KEYS:
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, table, [column], ['id'],
+                                            ondelete=ondelete)
+        return
+
+    for name, column, table in FOREIGN_KEYS:
+        op.drop_constraint(name, 'shows', type_='foreignkey')
+        op.create_foreign_key(name, 'shows', table, [column], ['id'],
+                              ondelete=ondelete)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
@@ -0,0 +1,237 @@
+import csv
+import gzip
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+
+'''
+Monthly partitions of the shows table
+
+on postgresql the shows table is range partitioned by month on start_time
+(see the 3f7e9b1a6c20 migration): shows_y2026m10 holds the shows starting in
+october 2026 and shows_default catches the dates that have no partition yet.
+queries that filter on start_time (the upcoming shows of a venue or an
+artist) only read the matching partitions.
+
+ensure_partitions() creates the partitions of the coming months and of any
+other month that has rows in shows_default (a show booked in a past month or
+further ahead), moving those rows out of shows_default first. wsgi.py runs
+it at startup, cron can run it too (flask create-show-partitions).
+archive_partitions() takes the
+partitions older than a cutoff out of the table, either by detaching them
+into the archive schema (still queryable, no longer scanned) or by exporting
+them to a gzipped csv file and dropping them. the archived shows are taken
+out of the past / upcoming counters of their venues and artists in the same
+transaction, so the counters keep matching the shows table.
+
+on any other database (sqlite for development) shows is a plain table:
+ensure_partitions() does nothing and archive_partitions() exports the old
+rows and deletes them.
+'''
+
+ARCHIVE_SCHEMA = 'archive'
+
+# the shows of {source} matching {condition} leave the counters of {table}
+UNCOUNT_SHOWS = (
+    'UPDATE {table} SET '
+    'past_shows_count = past_shows_count - ('
+    'SELECT count(*) FROM {source} s WHERE s.{key} = {table}.id '
+    'AND {condition} AND s.start_time < :rolled_at), '
+    'upcoming_shows_count = upcoming_shows_count - ('
+    'SELECT count(*) FROM {source} s WHERE s.{key} = {table}.id '
+    'AND {condition} AND s.start_time >= :rolled_at) '
+    'WHERE id IN (SELECT s.{key} FROM {source} s WHERE {condition})')
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return 'shows_y{:04d}m{:02d}'.format(month.year, month.month)
+
+
+def is_partitioned(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    count = connection.execute(text(
+        "SELECT count(*) FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'shows' AND pg_table_is_visible(c.oid)")).scalar()
+    return count > 0
+
+
+def existing_partitions(connection):
+    '''
+        returns the names of the partitions attached to shows, default excluded
+    '''
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'shows' AND c.relname <> 'shows_default' "
+        "ORDER BY c.relname"))
+    return [row[0] for row in rows]
+
+
+def add_overlap_constraint(connection, table):
+    '''
+        postgresql cannot put an exclusion constraint on a partitioned table,
+        every partition gets its own: two shows of a venue in the same month
+        cannot overlap. overlaps across a month boundary are left to the
+        check in create_show_submission
+    '''
+    connection.execute(text(
+        'ALTER TABLE {0} ADD CONSTRAINT {0}_venue_no_overlap EXCLUDE USING '
+        'gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)'
+        .format(table)))
+
+
+def create_partition(connection, month):
+    '''
+        creates the partition of one month, the rows of that month already
+        in shows_default are moved into it before it is attached
+    '''
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    connection.execute(text(
+        'CREATE TABLE {} (LIKE shows INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        .format(name)))
+    connection.execute(text(
+        'WITH moved AS (DELETE FROM shows_default '
+        'WHERE start_time >= :start AND start_time < :end RETURNING *) '
+        'INSERT INTO {} SELECT * FROM moved'.format(name)),
+        start=start, end=end)
+    add_overlap_constraint(connection, name)
+    connection.execute(text(
+        "ALTER TABLE shows ATTACH PARTITION {} "
+        "FOR VALUES FROM ('{}') TO ('{}')".format(
+            name, start.isoformat(' '), end.isoformat(' '))))
+    return name
+
+
+def missing_months(connection, months_ahead, now=None):
+    '''
+        returns the first days of the months without a partition: from the
+        current month to months_ahead months later, and the months of the
+        rows sitting in shows_default
+    '''
+    month = month_start(now or datetime.today())
+    months = {add_months(month, i) for i in range(months_ahead + 1)}
+    months.update(row[0] for row in connection.execute(text(
+        "SELECT DISTINCT date_trunc('month', start_time) FROM shows_default")))
+    existing = set(existing_partitions(connection))
+    return sorted(m for m in months if partition_name(m) not in existing)
+
+
+def ensure_partitions(engine, months_ahead=12, now=None):
+    '''
+        creates the missing partitions (see missing_months), returns the
+        names of the new ones
+    '''
+    # checked without the lock first, so a startup with nothing to do never
+    # blocks the inserts. the connection is given back before locking: a
+    # creator attaching a partition waits for every other lock on
+    # shows_default, a check still holding one would deadlock with it
+    with engine.connect() as connection:
+        if not is_partitioned(connection) or \
+                not missing_months(connection, months_ahead, now):
+            return []
+    created = []
+    with engine.begin() as connection:
+        # one creator at a time, the others wait and then find the tables
+        connection.execute(text('LOCK TABLE shows_default IN EXCLUSIVE MODE'))
+        for month in missing_months(connection, months_ahead, now):
+            created.append(create_partition(connection, month))
+    return created
+
+
+def counters_rolled_at(connection):
+    '''
+        returns the time the show counters are correct for, the row is
+        locked like roll_show_counters() does so it cannot move meanwhile
+    '''
+    lock = ' FOR UPDATE' if connection.dialect.name == 'postgresql' else ''
+    rolled_at = connection.execute(text(
+        'SELECT rolled_at FROM show_counters WHERE id = 1' + lock)).scalar()
+    return rolled_at or datetime.today()
+
+
+def uncount_shows(connection, source, rolled_at, condition='1 = 1', **params):
+    '''
+        takes the shows of source (a table) matching condition out of the
+        counters of their venues and artists
+    '''
+    for table, key in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        connection.execute(text(UNCOUNT_SHOWS.format(
+            table=table, key=key, source=source, condition=condition)),
+            rolled_at=rolled_at, **params)
+
+
+def export_rows(connection, query, path, **params):
+    result = connection.execute(text(query), **params)
+    count = 0
+    with gzip.open(path, 'wt', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(result.keys())
+        for row in result:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def archive_partitions(engine, before, mode='detach', directory='archive'):
+    '''
+        takes the shows of the months before `before` out of the shows table
+            mode 'detach'  moves the partitions to the archive schema
+            mode 'export'  writes them to directory/<partition>.csv.gz and
+                           drops them
+        returns a list of (name, rows) for what was archived
+    '''
+    cutoff = month_start(before)
+    archived = []
+    if mode == 'export' or engine.dialect.name != 'postgresql':
+        os.makedirs(directory, exist_ok=True)
+    with engine.begin() as connection:
+        rolled_at = counters_rolled_at(connection)
+        if not is_partitioned(connection):
+            # development fallback: export the old rows and delete them
+            path = os.path.join(directory, 'shows_before_{}.csv.gz'.format(
+                cutoff.strftime('%Y%m')))
+            count = export_rows(
+                connection, 'SELECT * FROM shows WHERE start_time < :cutoff '
+                'ORDER BY start_time', path, cutoff=cutoff)
+            uncount_shows(connection, 'shows', rolled_at,
+                          's.start_time < :cutoff', cutoff=cutoff)
+            connection.execute(text(
+                'DELETE FROM shows WHERE start_time < :cutoff'), cutoff=cutoff)
+            return [(path, count)]
+
+        if mode == 'detach':
+            connection.execute(text(
+                'CREATE SCHEMA IF NOT EXISTS {}'.format(ARCHIVE_SCHEMA)))
+        for name in existing_partitions(connection):
+            month = datetime.strptime(name, 'shows_y%Ym%m')
+            if month >= cutoff:
+                continue
+            count = connection.execute(text(
+                'SELECT count(*) FROM {}'.format(name))).scalar()
+            connection.execute(text(
+                'ALTER TABLE shows DETACH PARTITION {}'.format(name)))
+            uncount_shows(connection, name, rolled_at)
+            if mode == 'detach':
+                connection.execute(text('ALTER TABLE {} SET SCHEMA {}'.format(
+                    name, ARCHIVE_SCHEMA)))
+            else:
+                export_rows(connection, 'SELECT * FROM {} ORDER BY start_time'
+                            .format(name),
+                            os.path.join(directory, name + '.csv.gz'))
+                connection.execute(text('DROP TABLE {}'.format(name)))
+            archived.append((name, count))
+    return archived
@@ -2,3 +2,32 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// search box suggestions from /venues/autocomplete and /artists/autocomplete
+document.querySelectorAll('input[data-autocomplete]').forEach(function (input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var controller = null;
+  input.addEventListener('input', function () {
+    var query = input.value.trim();
+    if (controller) {
+      controller.abort();
+    }
+    if (!query) {
+      list.innerHTML = '';
+      return;
+    }
+    controller = new AbortController();
+    fetch(input.dataset.autocomplete + '?q=' + encodeURIComponent(query), {
+      signal: controller.signal
+    }).then(function (response) {
+      return response.json();
+    }).then(function (body) {
+      list.innerHTML = '';
+      body.data.forEach(function (match) {
+        var option = document.createElement('option');
+        option.value = match.name;
+        list.appendChild(option);
+      });
+    }).catch(function () {});
+  });
+});
@@ -0,0 +1,203 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants are written without it
+    brotli = None
+
+from flask import abort, request, send_from_directory, url_for
+
+'''
+Fingerprinted and precompressed static files
+
+build_static() (flask build-static, run at deploy time) copies every file
+of static/ into STATIC_BUILD_DIR under a name carrying a hash of its
+content, css/main.css becomes css/main.3f2a9c41d0be.css, and writes a .gz
+(and with the brotli package a .br) sibling of the text files. the url()
+references of the stylesheets are rewritten to the fingerprinted names, and
+manifest.json maps every original name to its fingerprinted one.
+
+init_static_assets() then
+    - replaces url_for in the templates: url_for('static', filename=...)
+      gives /assets/<fingerprinted name> for the files of the manifest, and
+      the plain /static url for the others (or when nothing was built)
+    - serves /assets/ with the precompressed variant the client accepts and
+      Cache-Control: public, max-age=<a year>, immutable. a changed file gets
+      a new name, so a browser never has to revalidate what it cached
+
+the files of older builds are left in place, pages rendered before a
+deploy keep working. rerun the build after editing a static file.
+
+settings (app.config, falling back to the environment):
+    STATIC_BUILD_DIR    output directory, relative to the app
+                        ('static_build'), empty disables all of this
+    STATIC_MAX_AGE      seconds of the Cache-Control header (31536000)
+'''
+
+DEFAULTS = {
+    'STATIC_BUILD_DIR': 'static_build',
+    'STATIC_MAX_AGE': '31536000',
+}
+
+MANIFEST = 'manifest.json'
+# images and woff fonts are compressed already
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.html', '.txt', '.json',
+                '.eot', '.ttf', '.otf')
+MIN_COMPRESS_SIZE = 256
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'"()]+)\1\s*\)''')
+
+
+def _setting(app, name):
+    return str(app.config.get(name, os.environ.get(name, DEFAULTS[name])))
+
+
+def build_directory(app):
+    directory = _setting(app, 'STATIC_BUILD_DIR')
+    return os.path.join(app.root_path, directory) if directory else None
+
+
+def fingerprint(name, data):
+    root, ext = posixpath.splitext(name)
+    return '{}.{}{}'.format(root, hashlib.sha256(data).hexdigest()[:12], ext)
+
+
+def rewrite_css(name, data, manifest):
+    '''
+        points the relative url() of a stylesheet at the fingerprinted
+        names already in the manifest, keeping any ?query or #fragment
+    '''
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, ref = match.group(1), match.group(2)
+        if ref.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', ref).groups()
+        target = manifest.get(posixpath.normpath(posixpath.join(base, path)))
+        if target is None:
+            return match.group(0)
+        return 'url({0}{1}{2}{0})'.format(
+            quote, posixpath.relpath(target, base or '.'), suffix)
+
+    return CSS_URL.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def build_static(static_dir, build_dir):
+    '''
+        writes the fingerprinted copies of static_dir, their compressed
+        variants and the manifest into build_dir
+
+        Return:
+                the manifest, {original name: fingerprinted name}
+    '''
+    names = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in files:
+            if not filename.startswith('.'):
+                path = os.path.relpath(os.path.join(root, filename), static_dir)
+                names.append(path.replace(os.sep, '/'))
+    # stylesheets last, their url() need the names of the fonts and images
+    names.sort(key=lambda name: (name.endswith('.css'), name))
+
+    manifest = {}
+    for name in names:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            data = f.read()
+        if name.endswith('.css'):
+            data = rewrite_css(name, data, manifest)
+        target = fingerprint(name, data)
+        path = os.path.join(build_dir, target)
+        if not os.path.exists(path):
+            _write(path, data)
+            if name.endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+                # mtime=0 so the same file always gives the same .gz
+                _write(path + '.gz', gzip.compress(data, 9, mtime=0))
+                if brotli is not None:
+                    _write(path + '.br', brotli.compress(data))
+        manifest[name] = target
+    _write(os.path.join(build_dir, MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(build_dir):
+    try:
+        with open(os.path.join(build_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_static_assets(app):
+    '''
+        init_static_assets(app)
+            serves the built assets and makes url_for use them, the pages
+            keep the plain /static urls when nothing was built
+    '''
+    build_dir = build_directory(app)
+    if build_dir is None:
+        return app
+    max_age = int(_setting(app, 'STATIC_MAX_AGE'))
+    manifest = load_manifest(build_dir)
+    # the compressed variants of each file served so far, best first
+    variants = {}
+
+    def available(filename):
+        if filename not in variants:
+            path = os.path.join(build_dir, filename)
+            if not os.path.isfile(path):
+                return None
+            variants[filename] = [
+                (encoding, suffix)
+                for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))
+                if os.path.exists(path + suffix)]
+        return variants[filename]
+
+    @app.route('/assets/<path:filename>')
+    def assets(filename):
+        # the fingerprinted files of this build and the older ones, only
+        if filename == MANIFEST or filename.endswith(('.gz', '.br', '.tmp')):
+            abort(404)
+        encodings = available(filename)
+        if encodings is None:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] \
+            or 'application/octet-stream'
+        for encoding, suffix in encodings:
+            if request.accept_encodings[encoding] > 0:
+                response = send_from_directory(
+                    build_dir, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(build_dir, filename,
+                                           mimetype=mimetype)
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.headers['Cache-Control'] += ', immutable'
+        return response
+
+    def asset_url_for(endpoint, **values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+            return url_for('assets', **values)
+        return url_for(endpoint, **values)
+
+    app.jinja_env.globals['url_for'] = asset_url_for
+    return app
@@ -0,0 +1,71 @@
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+'''
+Compiled template cache
+
+jinja compiles a template to python code the first time it is rendered in a
+process, which makes the first requests of every new worker slow. two
+things avoid that:
+
+    - a bytecode cache on local disk (TEMPLATE_CACHE_DIR): the compiled code
+      is written once and loaded by every later process, so a restart or a
+      new worker only unmarshals it. the files are keyed by template name
+      and checked against the source, an edited template is recompiled.
+    - preload_templates(), called by wsgi.py before gunicorn forks: every
+      template is compiled (or loaded from the bytecode cache) in the master,
+      the workers inherit them already in memory.
+
+settings (app.config, falling back to the environment):
+    TEMPLATE_CACHE_DIR  directory of the bytecode cache, relative to the app
+                        ('jinja_cache'), empty disables it
+    TEMPLATE_PRELOAD    1 (default) to compile every template at startup
+'''
+
+DEFAULTS = {
+    'TEMPLATE_CACHE_DIR': 'jinja_cache',
+    'TEMPLATE_PRELOAD': '1',
+}
+
+
+def _setting(app, name):
+    return str(app.config.get(name, os.environ.get(name, DEFAULTS[name])))
+
+
+def init_template_cache(app):
+    '''
+        init_template_cache(app)
+            puts the jinja bytecode cache in place when TEMPLATE_CACHE_DIR
+            is set, must run before the first template is loaded
+    '''
+    directory = _setting(app, 'TEMPLATE_CACHE_DIR')
+    if not directory:
+        return app
+    directory = os.path.join(app.root_path, directory)
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as error:
+        # a read-only deployment still works, it just compiles every time
+        app.logger.warning('template cache disabled: %s', error)
+        return app
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    return app
+
+
+def preload_templates(app):
+    '''
+        compiles every html template of the app into the jinja cache of
+        this process, does nothing unless TEMPLATE_PRELOAD=1
+
+        Return:
+                (number of templates, seconds spent)
+    '''
+    if _setting(app, 'TEMPLATE_PRELOAD') != '1':
+        return 0, 0.0
+    started = time.perf_counter()
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names), time.perf_counter() - started
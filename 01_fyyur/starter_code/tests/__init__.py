@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# set before any test module imports the app: a throwaway sqlite database
+# unless TEST_DATABASE_URL names another one, never the DATABASE_URL of the
+# environment, the tests drop every table
+os.environ['DATABASE_URL'] = os.environ.get(
+    'TEST_DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur_test.db'))
+os.environ.setdefault('LOG_FILE',
+                      os.path.join(tempfile.gettempdir(), 'fyyur_test.log'))
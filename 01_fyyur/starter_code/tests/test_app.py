@@ -0,0 +1,416 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import exports
+import json_api
+from app import (API_SHOW_FIELDS, Artist, Show, ShowCounters, Venue, app, db,
+                 recount_show_counters, roll_show_counters)
+from partitions import archive_partitions
+from typeahead import Typeahead
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+def venue(name, **values):
+    return Venue(name=name, city='San Francisco', state='CA',
+                 address='1 Main St', phone='123-123-1234', **values)
+
+
+def artist(name):
+    return Artist(name=name, city='San Francisco', state='CA',
+                  phone='123-123-1234', genres='Jazz')
+
+
+def show(venue, artist, start_time):
+    return Show(venues=venue, artists=artist, start_time=start_time,
+                end_time=start_time + timedelta(hours=2))
+
+
+class AppTestCase(unittest.TestCase):
+    """This class sets up an empty database for the app test cases"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+
+class JsonApiTestCase(AppTestCase):
+    """This class represents the json api paging test case"""
+
+    def setUp(self):
+        super().setUp()
+        the_venue, the_artist = venue('Hall'), artist('Band')
+        same = NOW + timedelta(days=1)
+        # three shows start at the same time, the id breaks the tie
+        for start_time in (NOW, same, same, same, NOW + timedelta(days=2)):
+            db.session.add(show(the_venue, the_artist, start_time))
+        db.session.commit()
+
+    def test_cursor_round_trip(self):
+        values = [datetime(2026, 10, 20, 21, 30), 42]
+        token = json_api.encode_cursor(values)
+
+        self.assertEqual(json_api.decode_cursor(token, (datetime, int)), values)
+
+    def test_decode_cursor_rejects_malformed(self):
+        for token in ('not a cursor!', json_api.encode_cursor([1]),
+                      json_api.encode_cursor([1, 2]),
+                      json_api.encode_cursor(['2026-01-01', None]),
+                      json_api.encode_cursor(['2026-01-01', [1]]),
+                      json_api.encode_cursor(['2026-01-01', 'x'])):
+            with self.assertRaises(ValueError):
+                json_api.decode_cursor(token, (datetime, int))
+
+    def test_after_key(self):
+        same = NOW + timedelta(days=1)
+        middle = Show.query.filter(Show.start_time == same) \
+            .order_by(Show.id).all()[1]
+        after = Show.query.filter(json_api.after_key(
+            [Show.start_time, Show.id], [same, middle.id])) \
+            .order_by(Show.start_time, Show.id).all()
+
+        self.assertEqual([(s.start_time, s.id) for s in after],
+                         [(s.start_time, s.id) for s in Show.query.order_by(
+                             Show.start_time, Show.id).all()[3:]])
+
+    def test_page_across_equal_start_times(self):
+        seen, cursor = [], None
+        while True:
+            data, cursor = json_api.page(
+                Show.query, API_SHOW_FIELDS, ['id'], ('start_time', 'id'),
+                (datetime, int), cursor, 2)
+            seen.extend(row['id'] for row in data)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [s.id for s in Show.query.order_by(
+            Show.start_time, Show.id)])
+
+    def test_api_shows_pages(self):
+        res = self.client.get('/api/v1/shows?fields=id&limit=2')
+        first = json.loads(res.data)
+        res = self.client.get('/api/v1/shows?fields=id&limit=2&cursor='
+                              + first['next_cursor'])
+        second = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(first['data']) + len(second['data']), 4)
+        self.assertFalse({row['id'] for row in first['data']}
+                         & {row['id'] for row in second['data']})
+
+    def test_api_rejects_invalid_cursor_and_limit(self):
+        for query in ('cursor=nope', 'limit=0', 'limit=501', 'limit=x',
+                      'cursor=WyIyMDI2LTAxLTAxIiwgbnVsbF0'):
+            res = self.client.get('/api/v1/shows?' + query)
+            self.assertEqual(res.status_code, 400, query)
+
+
+class TypeaheadTestCase(unittest.TestCase):
+    """This class represents the autocomplete index test case"""
+
+    def setUp(self):
+        self.typeahead = Typeahead({
+            'venues': lambda: [(1, 'The Blue Room'), (2, 'Bluebird Café'),
+                               (3, 'Red Hall')],
+            'artists': lambda: [],
+        }, refresh_seconds=0)
+
+    def test_search(self):
+        # "blue room" (indexed without its article) sorts before "bluebird"
+        self.assertEqual(self.typeahead.search('venues', 'blue'),
+                         [(1, 'The Blue Room'), (2, 'Bluebird Café')])
+        self.assertEqual(self.typeahead.search('venues', '  THE blue'),
+                         [(1, 'The Blue Room')])
+        self.assertEqual(self.typeahead.search('venues', 'bluebird cafe'),
+                         [(2, 'Bluebird Café')])
+        self.assertEqual(self.typeahead.search('venues', 'blue', limit=1),
+                         [(1, 'The Blue Room')])
+        self.assertEqual(self.typeahead.search('venues', ''), [])
+        self.assertEqual(self.typeahead.search('artists', 'blue'), [])
+
+    def test_add_and_rename(self):
+        self.typeahead.build()
+        self.typeahead.add('venues', 4, 'Blues Bar')
+        self.assertIn((4, 'Blues Bar'), self.typeahead.search('venues', 'blues'))
+
+        self.typeahead.add('venues', 4, 'Green Bar')
+        self.assertEqual(self.typeahead.search('venues', 'blues'), [])
+        self.assertEqual(self.typeahead.search('venues', 'green'),
+                         [(4, 'Green Bar')])
+
+    def test_remove(self):
+        self.typeahead.build()
+        self.typeahead.remove('venues', 1)
+
+        self.assertEqual(self.typeahead.search('venues', 'blue'),
+                         [(2, 'Bluebird Café')])
+        self.assertEqual(self.typeahead.search('venues', 'the'), [])
+
+
+class CascadeDeleteTestCase(AppTestCase):
+    """This class represents the venue and artist delete test case"""
+
+    def setUp(self):
+        super().setUp()
+        self.hall, self.club = venue('Hall'), venue('Club')
+        self.band, self.duo = artist('Band'), artist('Duo')
+        db.session.add_all([
+            show(self.hall, self.band, NOW - timedelta(days=3)),
+            show(self.hall, self.band, NOW + timedelta(days=3)),
+            show(self.hall, self.duo, NOW + timedelta(days=4)),
+            show(self.club, self.band, NOW - timedelta(days=5)),
+        ])
+        db.session.commit()
+        recount_show_counters(NOW)
+        self.hall, self.club = self.hall.id, self.club.id
+        self.band, self.duo = self.band.id, self.duo.id
+
+    def counters(self, model, id):
+        row = db.session.query(model).get(id)
+        db.session.refresh(row)
+        return row.past_shows_count, row.upcoming_shows_count
+
+    def test_delete_venue_deletes_its_shows(self):
+        res = self.client.delete('/venues/{}'.format(self.hall))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['deleted'], self.hall)
+        self.assertIsNone(Venue.query.get(self.hall))
+        self.assertEqual(Show.query.count(), 1)
+        self.assertEqual(self.counters(Artist, self.band), (1, 0))
+        self.assertEqual(self.counters(Artist, self.duo), (0, 0))
+        self.assertEqual(self.counters(Venue, self.club), (1, 0))
+
+    def test_delete_artist_deletes_its_shows(self):
+        res = self.client.delete('/artists/{}'.format(self.band))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(Show.query.count(), 1)
+        self.assertEqual(self.counters(Venue, self.hall), (0, 1))
+        self.assertEqual(self.counters(Venue, self.club), (0, 0))
+
+    def test_delete_missing_venue(self):
+        res = self.client.delete('/venues/1000')
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(Show.query.count(), 4)
+
+
+class ShowCountersTestCase(AppTestCase):
+    """This class represents the venue and artist show counters test case"""
+
+    def setUp(self):
+        super().setUp()
+        self.hall, self.band = venue('Hall'), artist('Band')
+        db.session.add_all([
+            show(self.hall, self.band, NOW - timedelta(days=40)),
+            show(self.hall, self.band, NOW + timedelta(days=3)),
+        ])
+        db.session.commit()
+        recount_show_counters(NOW)
+        self.hall, self.band = self.hall.id, self.band.id
+
+    def counters(self):
+        rows = [db.session.query(model).get(id)
+                for model, id in ((Venue, self.hall), (Artist, self.band))]
+        for row in rows:
+            db.session.refresh(row)
+        return [(row.past_shows_count, row.upcoming_shows_count)
+                for row in rows]
+
+    def create_show(self, start_time):
+        return self.client.post('/shows/create', data={
+            'venue_id': self.hall, 'artist_id': self.band,
+            'start_time': start_time.isoformat(' '), 'duration': 60})
+
+    def test_row_created_with_the_table(self):
+        self.assertEqual(ShowCounters.query.count(), 1)
+
+    def test_create_show(self):
+        self.create_show(NOW + timedelta(days=10))
+        self.assertEqual(self.counters(), [(1, 2), (1, 2)])
+
+        self.create_show(NOW - timedelta(days=10))
+        self.assertEqual(self.counters(), [(2, 2), (2, 2)])
+        self.assertEqual(Show.query.count(), 4)
+
+    def test_delete_show(self):
+        upcoming = Show.query.filter(Show.start_time > NOW).one().id
+        res = self.client.delete('/shows/{}'.format(upcoming))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.counters(), [(1, 0), (1, 0)])
+
+    def test_roll(self):
+        self.assertEqual(roll_show_counters(NOW + timedelta(days=4)), 1)
+        self.assertEqual(self.counters(), [(2, 0), (2, 0)])
+        # rolled_at never moves back
+        self.assertEqual(roll_show_counters(NOW), 0)
+        self.assertEqual(self.counters(), [(2, 0), (2, 0)])
+
+    def test_archive(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        archived = archive_partitions(db.engine, NOW, directory=directory)
+
+        self.assertEqual([rows for _, rows in archived], [1])
+        self.assertEqual(Show.query.count(), 1)
+        self.assertEqual(self.counters(), [(0, 1), (0, 1)])
+
+
+class BookingTestCase(AppTestCase):
+    """This class represents the show booking and venue availability test case"""
+
+    def setUp(self):
+        super().setUp()
+        self.hall, self.club = venue('Hall'), venue('Club')
+        self.band, self.duo = artist('Band'), artist('Duo')
+        day = datetime(2026, 10, 20)
+        db.session.add_all([
+            self.club, self.duo,
+            Show(venues=self.hall, artists=self.band,
+                 start_time=day.replace(hour=14), end_time=day.replace(hour=16)),
+            Show(venues=self.hall, artists=self.band,
+                 start_time=day.replace(hour=17), end_time=day.replace(hour=21)),
+        ])
+        db.session.commit()
+        recount_show_counters(NOW)
+        self.hall, self.club = self.hall.id, self.club.id
+        self.band, self.duo = self.band.id, self.duo.id
+
+    def book(self, venue_id, artist_id, start_time, duration):
+        return self.client.post('/shows/create', data={
+            'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': start_time, 'duration': duration})
+
+    def availability(self, **args):
+        query = dict({'city': 'San Francisco', 'state': 'CA',
+                      'start': '2026-10-20 12:00', 'end': '2026-10-20 22:00'},
+                     **args)
+        res = self.client.get('/venues/availability', query_string=query)
+        return res, json.loads(res.data)
+
+    def test_venue_already_booked(self):
+        res = self.book(self.hall, self.duo, '2026-10-20 15:30', 60)
+
+        self.assertIn(b'the venue is already booked at that time', res.data)
+        self.assertEqual(Show.query.count(), 2)
+
+    def test_artist_already_playing(self):
+        res = self.book(self.club, self.band, '2026-10-20 20:00', 120)
+
+        self.assertIn(b'the artist already plays another show at that time',
+                      res.data)
+        self.assertEqual(Show.query.count(), 2)
+
+    def test_booking_between_shows(self):
+        # the shows are booked over [start_time, end_time), back to back
+        # shows do not overlap
+        res = self.book(self.hall, self.duo, '2026-10-20 16:00', 60)
+
+        self.assertIn(b'Show was successfully listed!', res.data)
+        self.assertEqual(Show.query.count(), 3)
+
+    def test_invalid_duration_not_booked(self):
+        for duration in (0, 24 * 60 + 1):
+            self.book(self.club, self.duo, '2026-10-22 20:00', duration)
+        self.assertEqual(Show.query.count(), 2)
+
+    def test_free_slots(self):
+        res, data = self.availability(duration=90)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({v['name']: v['free'] for v in data['venues']}, {
+            'Hall': [['2026-10-20T12:00:00', '2026-10-20T14:00:00']],
+            'Club': [['2026-10-20T12:00:00', '2026-10-20T22:00:00']],
+        })
+
+    def test_free_slots_for_the_whole_window(self):
+        res, data = self.availability()
+        self.assertEqual([v['name'] for v in data['venues']], ['Club'])
+
+        res, data = self.availability(duration=180, limit=1)
+        self.assertEqual([v['name'] for v in data['venues']], ['Club'])
+
+    def test_availability_for_errors(self):
+        for args in ({'duration': 'abc'}, {'duration': '0'},
+                     {'duration': '601'}, {'city': None}, {'end': 'x'},
+                     {'limit': '0'}):
+            res, data = self.availability(**args)
+            self.assertEqual(res.status_code, 400, args)
+            self.assertEqual(data['success'], False)
+
+
+class ExportsTestCase(AppTestCase):
+    """This class represents the streaming export test case"""
+
+    columns = ['id', 'name', 'start_time']
+    rows = [(i, 'venue, number {}'.format(i), datetime(2026, 10, 1, i % 24))
+            for i in range(200)]
+
+    def test_csv_chunks(self):
+        with mock.patch.object(exports, 'CHUNK_SIZE', 256):
+            chunks = list(exports.csv_chunks(self.columns, iter(self.rows)))
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), 256)
+        # every chunk ends on a whole row
+        for chunk in chunks:
+            self.assertTrue(chunk.endswith(b'\r\n'))
+        parsed = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(parsed[0], self.columns)
+        self.assertEqual(len(parsed), len(self.rows) + 1)
+        self.assertEqual(parsed[1], ['0', 'venue, number 0',
+                                     '2026-10-01 00:00:00'])
+
+    def test_csv_chunks_without_rows(self):
+        self.assertEqual(list(exports.csv_chunks(self.columns, iter([]))),
+                         [b'id,name,start_time\r\n'])
+
+    def test_ndjson_chunks(self):
+        with mock.patch.object(exports, 'CHUNK_SIZE', 256):
+            chunks = list(exports.ndjson_chunks(self.columns, iter(self.rows)))
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.endswith(b'\n'))
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(len(lines), len(self.rows))
+        self.assertEqual(json.loads(lines[0]), {
+            'id': 0, 'name': 'venue, number 0',
+            'start_time': '2026-10-01T00:00:00'})
+
+    def test_ndjson_chunks_without_rows(self):
+        self.assertEqual(list(exports.ndjson_chunks(self.columns, iter([]))),
+                         [])
+
+    def test_export_shows_csv(self):
+        db.session.add(show(venue('Hall'), artist('Band'), NOW))
+        db.session.commit()
+        res = self.client.get('/export/shows.csv')
+        parsed = list(csv.reader(io.StringIO(res.data.decode())))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(parsed), 2)
+        self.assertEqual(parsed[1][4], 'Hall')
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# milliseconds for `import app` in a fresh interpreter, override it with
+# IMPORT_TIME_BUDGET_MS on slower machines
+BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', 350))
+# loaded on first use only, a serving process must not pay for them
+LAZY_MODULES = ['alembic', 'flask_migrate', 'flask_moment', 'dateutil.parser',
+                'babel.dates', 'forms', 'wtforms']
+# the app directory, tests/ is inside it
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_app():
+    '''
+        imports the app in a new interpreter under -X importtime
+
+        Return:
+                (cumulative import time of app in ms, names of the modules
+                loaded by the import)
+    '''
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    env.setdefault('LOG_FILE',
+                   os.path.join(tempfile.gettempdir(), 'fyyur_test.log'))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import sys, app; print(" ".join(sorted(sys.modules)))'],
+        cwd=HERE, env=env, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    cumulative = None
+    for line in result.stderr.decode().splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == 'app':
+            cumulative = int(parts[1]) / 1000
+    return cumulative, set(result.stdout.decode().split())
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    """This class checks the cold import cost of the app module"""
+
+    def test_cold_import_within_budget(self):
+        # best of three, the first run also warms the file system cache
+        timings = [import_app()[0] for _ in range(3)]
+        self.assertLessEqual(min(timings), BUDGET_MS,
+                             'import app took {:.0f} ms, budget {:.0f} ms'
+                             .format(min(timings), BUDGET_MS))
+
+    def test_lazy_modules_not_imported(self):
+        modules = import_app()[1]
+        self.assertEqual([m for m in LAZY_MODULES if m in modules], [])
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import csv
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from tests.test_app import AppTestCase, NOW, artist, show, venue
+from app import Artist, Show, Venue, db, recount_show_counters
+from partitions import (add_months, archive_partitions, ensure_partitions,
+                        month_start, partition_name)
+
+
+class PartitionNamesTestCase(unittest.TestCase):
+    """This class represents the partition month helpers test case"""
+
+    def test_month_start(self):
+        self.assertEqual(month_start(datetime(2026, 10, 19, 21, 30)),
+                         datetime(2026, 10, 1))
+
+    def test_add_months(self):
+        self.assertEqual(add_months(datetime(2026, 10, 1), 1),
+                         datetime(2026, 11, 1))
+        self.assertEqual(add_months(datetime(2026, 10, 1), 3),
+                         datetime(2027, 1, 1))
+        self.assertEqual(add_months(datetime(2026, 10, 1), 15),
+                         datetime(2028, 1, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partition_name(datetime(2026, 3, 1)), 'shows_y2026m03')
+
+
+class SqliteFallbackTestCase(AppTestCase):
+    """This class represents the plain shows table (sqlite) test case"""
+
+    def setUp(self):
+        super().setUp()
+        self.hall, self.band = venue('Hall'), artist('Band')
+        db.session.add_all([
+            show(self.hall, self.band, datetime(2026, 8, 15, 20)),
+            show(self.hall, self.band, datetime(2026, 9, 30, 23)),
+            show(self.hall, self.band, NOW - timedelta(days=1)),
+            show(self.hall, self.band, NOW + timedelta(days=1)),
+        ])
+        db.session.commit()
+        recount_show_counters(NOW)
+        self.hall, self.band = self.hall.id, self.band.id
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def counters(self):
+        rows = [db.session.query(model).get(id)
+                for model, id in ((Venue, self.hall), (Artist, self.band))]
+        for row in rows:
+            db.session.refresh(row)
+        return [(row.past_shows_count, row.upcoming_shows_count)
+                for row in rows]
+
+    def test_ensure_partitions_does_nothing(self):
+        self.assertEqual(ensure_partitions(db.engine, 12, NOW), [])
+
+    def test_archive_exports_and_deletes_old_shows(self):
+        archived = archive_partitions(db.engine, NOW, directory=self.directory)
+
+        path = os.path.join(self.directory, 'shows_before_202610.csv.gz')
+        self.assertEqual(archived, [(path, 2)])
+        with gzip.open(path, 'rt', newline='') as f:
+            rows = list(csv.DictReader(f))
+        # sqlite hands the stored text over as is, microseconds included
+        self.assertEqual([row['start_time'][:19] for row in rows],
+                         ['2026-08-15 20:00:00', '2026-09-30 23:00:00'])
+        self.assertEqual(
+            [s.start_time for s in Show.query.order_by(Show.start_time)],
+            [NOW - timedelta(days=1), NOW + timedelta(days=1)])
+
+    def test_archive_keeps_counters_in_step(self):
+        archive_partitions(db.engine, NOW, directory=self.directory)
+        archived = self.counters()
+        recount_show_counters(NOW)
+
+        self.assertEqual(archived, [(1, 1), (1, 1)])
+        self.assertEqual(self.counters(), archived)
+
+    def test_archive_with_nothing_to_archive(self):
+        archived = archive_partitions(db.engine, datetime(2026, 8, 1),
+                                      directory=self.directory)
+
+        self.assertEqual([count for _, count in archived], [0])
+        self.assertEqual(Show.query.count(), 4)
+        self.assertEqual(self.counters(), [(3, 1), (3, 1)])
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
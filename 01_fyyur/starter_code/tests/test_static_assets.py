@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, render_template_string
+
+from static_assets import brotli, build_static, init_static_assets
+
+CSS = ('body { background: url("../img/logo.png?v=1") no-repeat; }\n'
+       + '.row { margin: 0 auto; }\n' * 20)
+
+
+class StaticAssetsTestCase(unittest.TestCase):
+    """This class represents the fingerprinted static files test case"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        static = os.path.join(self.root, 'static')
+        for name, data in (('css/main.css', CSS.encode()),
+                           ('img/logo.png', b'\x89PNG' + b'\0' * 512),
+                           ('js/tiny.js', b'var a;')):
+            os.makedirs(os.path.dirname(os.path.join(static, name)),
+                        exist_ok=True)
+            with open(os.path.join(static, name), 'wb') as f:
+                f.write(data)
+        # next to the build directory, never served
+        with open(os.path.join(self.root, 'secret.txt'), 'w') as f:
+            f.write('secret')
+        self.build = os.path.join(self.root, 'static_build')
+        self.manifest = build_static(static, self.build)
+
+        app = Flask('assets', root_path=self.root)
+        app.config['STATIC_BUILD_DIR'] = 'static_build'
+        self.app = init_static_assets(app)
+        self.client = app.test_client()
+
+    def get(self, name, encoding=None):
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+        return self.client.get('/assets/' + self.manifest[name],
+                               headers=headers)
+
+    def test_build(self):
+        css = self.manifest['css/main.css']
+
+        self.assertRegex(css, r'^css/main\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.build, 'manifest.json')) as f:
+            self.assertEqual(json.load(f), self.manifest)
+        with open(os.path.join(self.build, css)) as f:
+            self.assertIn('url("../{}?v=1")'.format(
+                self.manifest['img/logo.png']), f.read())
+        self.assertTrue(os.path.exists(os.path.join(self.build, css + '.gz')))
+        # too small, and images are compressed already
+        for name in ('js/tiny.js', 'img/logo.png'):
+            self.assertFalse(os.path.exists(
+                os.path.join(self.build, self.manifest[name] + '.gz')))
+
+    def test_url_for(self):
+        with self.app.test_request_context():
+            self.assertEqual(render_template_string(
+                "{{ url_for('static', filename='css/main.css') }}"),
+                '/assets/' + self.manifest['css/main.css'])
+            self.assertEqual(render_template_string(
+                "{{ url_for('static', filename='css/other.css') }}"),
+                '/static/css/other.css')
+
+    def test_gzip(self):
+        res = self.get('css/main.css', 'gzip')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(res.mimetype, 'text/css')
+        self.assertIn('url("../', gzip.decompress(res.data).decode())
+        self.assertIn('Accept-Encoding', res.headers['Vary'])
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        res = self.get('css/main.css', 'gzip, br')
+
+        self.assertEqual(res.headers['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.data).decode(),
+                         self.client.get('/assets/' + self.manifest[
+                             'css/main.css']).data.decode())
+
+    def test_identity(self):
+        res = self.get('css/main.css')
+
+        self.assertNotIn('Content-Encoding', res.headers)
+        self.assertIn('Accept-Encoding', res.headers['Vary'])
+        self.assertIn(b'.row { margin: 0 auto; }', res.data)
+
+    def test_cache_control(self):
+        for name in ('css/main.css', 'img/logo.png'):
+            cache_control = self.get(name, 'gzip').headers['Cache-Control']
+            self.assertEqual(
+                sorted(part.strip() for part in cache_control.split(',')),
+                ['immutable', 'max-age=31536000', 'public'])
+        # nothing to negotiate for an image
+        self.assertNotIn('Vary', self.get('img/logo.png', 'gzip').headers)
+
+    def test_not_found(self):
+        css = self.manifest['css/main.css']
+        for path in ('manifest.json', css + '.gz', css + '.br',
+                     'css/main.css', '../secret.txt', '..%2Fsecret.txt',
+                     'css/../../secret.txt'):
+            res = self.client.get('/assets/' + path)
+            self.assertEqual(res.status_code, 404, path)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask, render_template
+from jinja2 import FileSystemBytecodeCache
+
+from app import app as fyyur
+from template_cache import init_template_cache, preload_templates
+
+
+class TemplateCacheTestCase(unittest.TestCase):
+    """This class represents the compiled template cache test case"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'templates', 'pages'))
+        for name, source in (('pages/home.html', '<h1>{{ title }}</h1>'),
+                             ('pages/about.html', 'about'),
+                             ('notes.txt', 'not a page')):
+            with open(os.path.join(self.root, 'templates', name), 'w') as f:
+                f.write(source)
+
+    def make_app(self, **config):
+        app = Flask('cached', root_path=self.root)
+        app.config.update(config)
+        return init_template_cache(app)
+
+    def cache_files(self):
+        return os.listdir(os.path.join(self.root, 'jinja_cache'))
+
+    def test_app_uses_the_cache(self):
+        cache = fyyur.jinja_env.bytecode_cache
+
+        self.assertIsInstance(cache, FileSystemBytecodeCache)
+        self.assertEqual(cache.directory,
+                         os.path.join(fyyur.root_path, 'jinja_cache'))
+        # templates are not checked on disk at every render
+        self.assertFalse(fyyur.jinja_env.auto_reload)
+
+    def test_compiled_once(self):
+        app = self.make_app()
+        with app.app_context():
+            self.assertEqual(render_template('pages/home.html', title='Hi'),
+                             '<h1>Hi</h1>')
+        self.assertEqual(len(self.cache_files()), 1)
+
+        # a new process loads the bytecode instead of compiling the source
+        app = self.make_app()
+        with app.app_context(), mock.patch.object(
+                app.jinja_env, 'compile', side_effect=AssertionError):
+            self.assertEqual(render_template('pages/home.html', title='Hi'),
+                             '<h1>Hi</h1>')
+
+    def test_cache_disabled(self):
+        app = self.make_app(TEMPLATE_CACHE_DIR='')
+
+        self.assertIsNone(app.jinja_env.bytecode_cache)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'jinja_cache')))
+
+    def test_preload_templates(self):
+        app = self.make_app()
+        count, seconds = preload_templates(app)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(len(self.cache_files()), 2)
+        self.assertEqual(preload_templates(self.make_app(TEMPLATE_PRELOAD='0')),
+                         (0, 0.0))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
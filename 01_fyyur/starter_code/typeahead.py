@@ -0,0 +1,199 @@
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+'''
+In memory prefix index for the autocomplete endpoints
+
+the names are normalized (accents stripped, case folded, whitespace
+collapsed) and kept in a sorted list searched with bisect, next to a
+parallel list of ids. a lookup is one bisect plus a scan of the matches,
+so it costs microseconds and never touches the database. names starting
+with an article are also indexed without it, "the blue room" is found
+with "blue".
+
+each process holds its own copy: the handlers update it after their
+commits, and it is rebuilt in a background thread every refresh_seconds
+to pick up the changes made by the other workers.
+'''
+
+ARTICLES = ('the ', 'a ', 'an ')
+
+
+def normalize(name):
+    '''
+        returns the lookup form of a name: no accents, case folded and
+        single spaced
+    '''
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def index_keys(name):
+    key = normalize(name)
+    if not key:
+        return ()
+    for article in ARTICLES:
+        if key.startswith(article) and len(key) > len(article):
+            return (key, key[len(article):])
+    return (key,)
+
+
+class PrefixIndex:
+    '''
+    PrefixIndex
+    a sorted array of normalized names with their ids
+    '''
+
+    def __init__(self, rows=()):
+        rows = list(rows)
+        entries = sorted(
+            (key, id) for id, name in rows for key in index_keys(name))
+        self._keys = [key for key, _ in entries]
+        self._ids = [id for _, id in entries]
+        self._names = dict(rows)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, id, name):
+        '''
+            adds a name, or replaces the name already indexed for this id
+        '''
+        self.remove(id)
+        for key in index_keys(name):
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, id)
+        self._names[id] = name
+
+    def remove(self, id):
+        name = self._names.pop(id, None)
+        if name is None:
+            return
+        for key in index_keys(name):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == id:
+                    del self._keys[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    def search(self, prefix, limit=10):
+        '''
+            returns up to limit (id, name) tuples whose name starts with
+            prefix, in alphabetical order
+        '''
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and len(results) < limit:
+            if not self._keys[position].startswith(prefix):
+                break
+            id = self._ids[position]
+            if id not in seen:
+                seen.add(id)
+                results.append((id, self._names[id]))
+            position += 1
+        return results
+
+
+class Typeahead:
+    '''
+    Typeahead
+    one PrefixIndex per kind ('venues', 'artists'), loaded from the
+    given loaders (callables returning (id, name) rows)
+    '''
+
+    def __init__(self, loaders, refresh_seconds=300, logger=None):
+        self.loaders = loaders
+        self.refresh_seconds = refresh_seconds
+        self.logger = logger
+        self._indexes = {}
+        self._built_at = None
+        # changes made while a build is loading, replayed on the new indexes
+        self._journal = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def build(self):
+        '''
+            loads every index from the database, the new indexes replace the
+            old ones at once. returns False when the database is not reachable
+        '''
+        started = time.time()
+        with self._lock:
+            self._journal = []
+        try:
+            indexes = {kind: PrefixIndex(tuple(row) for row in loader())
+                                  for kind, loader in self.loaders.items()}
+        except Exception:
+            # e.g. the tables are not migrated yet, the next lookup retries
+            with self._lock:
+                self._journal = None
+            if self.logger:
+                self.logger.exception('could not build the typeahead index')
+            return False
+        with self._lock:
+            for kind, id, name in self._journal:
+                self._apply(indexes, kind, id, name)
+            self._journal = None
+            self._indexes = indexes
+            self._built_at = started
+        return True
+
+    def _refresh(self):
+        try:
+            self.build()
+        finally:
+            self._refreshing.release()
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.build()
+        elif self.refresh_seconds and \
+                time.time() - self._built_at > self.refresh_seconds and \
+                self._refreshing.acquire(blocking=False):
+            # lookups keep using the current index while the new one loads
+            threading.Thread(target=self._refresh, daemon=True).start()
+
+    @staticmethod
+    def _apply(indexes, kind, id, name):
+        index = indexes.get(kind)
+        if index is None:
+            return
+        if name is None:
+            index.remove(id)
+        else:
+            index.add(id, name)
+
+    def search(self, kind, prefix, limit=10):
+        '''
+            returns up to limit (id, name) tuples of the kind starting
+            with prefix
+        '''
+        self._ensure_fresh()
+        with self._lock:
+            index = self._indexes.get(kind)
+            return index.search(prefix, limit) if index is not None else []
+
+    def add(self, kind, id, name):
+        '''
+            indexes a created or renamed row, call it after the commit
+        '''
+        with self._lock:
+            self._apply(self._indexes, kind, id, name)
+            if self._journal is not None:
+                self._journal.append((kind, id, name))
+
+    def remove(self, kind, id):
+        with self._lock:
+            self._apply(self._indexes, kind, id, None)
+            if self._journal is not None:
+                self._journal.append((kind, id, None))
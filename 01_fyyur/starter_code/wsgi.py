@@ -0,0 +1,34 @@
+'''
+Production entry point
+
+    gunicorn wsgi:app
+
+the server settings live in gunicorn.conf.py next to this file.
+'''
+from sqlalchemy import exc
+
+from app import app, db, typeahead
+from partitions import ensure_partitions
+from template_cache import preload_templates
+
+# create the show partitions that are missing (the new months, and the
+# months of shows that landed in the default partition), load the
+# autocomplete index and compile the templates once, before gunicorn forks
+# the workers
+try:
+    for name in ensure_partitions(db.engine, app.config['SHOW_PARTITIONS_AHEAD']):
+        app.logger.info('created show partition %s', name)
+except exc.SQLAlchemyError:
+    # e.g. a database role without the DDL privileges, the cron job
+    # (flask create-show-partitions) can still create them
+    app.logger.exception('could not create the show partitions')
+typeahead.build()
+preload_templates(app)
+
+
+def dispose_engine():
+    '''
+        drops the connections inherited from the gunicorn master,
+        each worker then opens its own on first use
+    '''
+    db.engine.dispose()
@@ -0,0 +1,243 @@
+'''
+Trivia API benchmark suite
+
+seeds question banks of growing size and measures the hot endpoints in
+process through the flask test client:
+    GET  /questions?page=...           first, middle and last page
+    GET  /categories/<id>/questions
+    POST /questions                    searchTerm
+    POST /quizzes                      growing previous_questions
+for each size and endpoint it records latency percentiles, the number of
+queries (Server-Timing header) and the memory allocated while serving one
+request (tracemalloc), and writes everything to a json report. two reports
+can be compared to catch scaling regressions between commits.
+
+the bank is topped up from one size to the next, so a single run seeds at
+most the largest size. point --database at a scratch database, it is
+filled with generated rows (COPY on postgresql, batched executemany
+otherwise).
+
+usage (from the backend directory):
+    python -m benchmarks.endpoints --database postgresql://localhost/trivia_bench \
+        --sizes 10000 1000000 10000000 --output before.json
+    python -m benchmarks.endpoints --compare before.json after.json
+'''
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from flask_perf.bench import percentile
+from flaskr import create_app
+from models import Category, Question, db
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment',
+              'Sports']
+WORDS = ['title', 'river', 'world', 'who', 'what', 'largest', 'first',
+         'painting', 'element', 'team', 'country', 'film', 'year', 'king',
+         'planet', 'song', 'city', 'war', 'ocean', 'author']
+PREVIOUS_SIZES = [0, 100, 1000, 10000]
+BATCH_SIZE = 10000
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def questions(rng, start, count):
+    for i in range(start, start + count):
+        yield {
+            'question': '{} {} {}? #{}'.format(*rng.sample(WORDS, 3), i),
+            'answer': rng.choice(WORDS),
+            'category': str(rng.randint(1, len(CATEGORIES))),
+            'difficulty': rng.randint(1, 5),
+        }
+
+
+def insert(table, rows):
+    engine = db.session.get_bind()
+    if engine.dialect.name != 'postgresql':
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+        return
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        connection.cursor().copy_expert(
+            'COPY {} ({}) FROM STDIN WITH CSV'.format(
+                table.name, ', '.join(columns)), buffer)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def seed(app, size, rng):
+    with app.app_context():
+        if Category.query.count() == 0:
+            db.session.add_all([Category(type) for type in CATEGORIES])
+            db.session.commit()
+        count = Question.query.count()
+        while count < size:
+            batch = min(BATCH_SIZE, size - count)
+            insert(Question.__table__, list(questions(rng, count, batch)))
+            count += batch
+            print('\rseeded {}/{} questions'.format(count, size),
+                  end='', flush=True)
+        if count and db.session.get_bind().dialect.name == 'postgresql':
+            db.session.execute('ANALYZE questions')
+            db.session.commit()
+        print()
+        return count
+
+
+def cases(size, rng):
+    last_page = max(1, (size + 9) // 10)
+    yield 'GET /questions?page=1', ('get', '/questions?page=1', None)
+    yield 'GET /questions?page=middle', (
+        'get', '/questions?page={}'.format(last_page // 2 or 1), None)
+    yield 'GET /questions?page=last', (
+        'get', '/questions?page={}'.format(last_page), None)
+    yield 'GET /categories/<id>/questions', (
+        'get', '/categories/1/questions', None)
+    yield 'POST /questions searchTerm', (
+        'post', '/questions', {'searchTerm': 'title'})
+    for previous in PREVIOUS_SIZES:
+        if previous > size:
+            continue
+        yield 'POST /quizzes previous={}'.format(previous), (
+            'post', '/quizzes', {
+                'quiz_category': {'id': 0},
+                'previous_questions': rng.sample(range(1, size + 1), previous),
+            })
+
+
+def call(client, method, path, body):
+    if method == 'get':
+        return client.get(path)
+    return client.post(path, json=body)
+
+
+def measure(client, request, iterations, budget):
+    response = call(client, *request)
+    match = QUERIES.search(response.headers.get('Server-Timing', ''))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    call(client, *request)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    deadline = time.time() + budget
+    while len(latencies) < iterations and time.time() < deadline:
+        started = time.perf_counter()
+        call(client, *request)
+        latencies.append(time.perf_counter() - started)
+    return {
+        'status': response.status_code,
+        'iterations': len(latencies),
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'queries': int(match.group(1)) if match else None,
+        'peak_alloc_kb': (peak - before) / 1024,
+        'retained_kb': (current - before) / 1024,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database})
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'dialect': db.get_engine(app).dialect.name,
+        'sizes': {},
+    }
+    for size in sorted(args.sizes):
+        seed(app, size, rng)
+        results = {}
+        for name, request in cases(size, random.Random(args.seed)):
+            results[name] = result = measure(
+                client, request, args.iterations, args.budget)
+            print('{:>9} {:<34} p50 {:>9.2f}ms  p95 {:>9.2f}ms  '
+                  'queries {:>4}  alloc {:>10.1f}kB'.format(
+                      size, name, result['p50_ms'], result['p95_ms'],
+                      result['queries'] if result['queries'] is not None
+                      else '-', result['peak_alloc_kb']))
+        report['sizes'][str(size)] = results
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print('report written to {}'.format(args.output))
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print('{} -> {}'.format(old.get('commit'), new.get('commit')))
+    regressions = 0
+    for size, results in sorted(new['sizes'].items(), key=lambda i: int(i[0])):
+        for name, result in sorted(results.items()):
+            before = old['sizes'].get(size, {}).get(name)
+            if before is None:
+                continue
+            flags = []
+            for key in ('p50_ms', 'p95_ms', 'peak_alloc_kb'):
+                if before[key] > 0 and result[key] / before[key] > threshold:
+                    flags.append('{} x{:.2f}'.format(
+                        key, result[key] / before[key]))
+            if (result['queries'] or 0) > (before['queries'] or 0):
+                flags.append('queries {} -> {}'.format(
+                    before['queries'], result['queries']))
+            regressions += bool(flags)
+            print('{:>9} {:<34} p50 {:>9.2f} -> {:>9.2f}ms  {}'.format(
+                size, name, before['p50_ms'], result['p50_ms'],
+                'REGRESSION ' + ', '.join(flags) if flags else 'ok'))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--database', default=os.environ.get(
+        'BENCH_DATABASE_URL', 'sqlite:///trivia_bench.db'))
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 1000000, 10000000])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--budget', type=float, default=30,
+                        help='max seconds spent timing one endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='ratio flagged as a regression when comparing')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''
+JSON encoding and compression benchmark
+
+measures GET /questions in process with every json backend (stdlib json,
+orjson when installed) and every content encoding (identity, gzip, brotli
+when installed), and prints the CPU time per request and the bytes sent on
+the wire. the identity + json row is the behaviour before fast_json.py and
+compression.py.
+
+usage (from the backend directory, with a seeded database, e.g. the one
+left by benchmarks.endpoints):
+    python -m benchmarks.json_compression --database sqlite:///trivia_bench.db \
+        --requests 200 --page-size 100
+'''
+import argparse
+import os
+import time
+
+import flaskr
+from flask_perf.compression import brotli
+from flask_perf.fast_json import StdlibJSON, get_backend, orjson
+from flaskr import create_app
+
+ENCODINGS = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+
+def backends():
+    yield StdlibJSON()
+    if orjson is not None:
+        yield get_backend('orjson')
+
+
+def measure(client, path, encoding, requests):
+    headers = {'Accept-Encoding': encoding}
+    response = client.get(path, headers=headers)
+    size = len(response.data)
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(path, headers=headers).data
+    return (time.process_time() - started) / requests * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--database', default=os.environ.get(
+        'BENCH_DATABASE_URL', 'sqlite:///trivia_bench.db'))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--page-size', type=int,
+                        default=flaskr.QUESTIONS_PER_PAGE,
+                        help='questions per page (the app uses {})'.format(
+                            flaskr.QUESTIONS_PER_PAGE))
+    parser.add_argument('--path', default='/questions?page=1')
+    args = parser.parse_args()
+
+    flaskr.QUESTIONS_PER_PAGE = args.page_size
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database})
+    client = app.test_client()
+
+    print('{:<8} {:<10} {:>12} {:>12}'.format(
+        'json', 'encoding', 'cpu ms/req', 'bytes'))
+    for backend in backends():
+        app.extensions['fast_json'] = backend
+        for encoding in ENCODINGS:
+            cpu, size = measure(client, args.path, encoding, args.requests)
+            print('{:<8} {:<10} {:>12.3f} {:>12}'.format(
+                backend.name, encoding, cpu, size))
+
+
+if __name__ == '__main__':
+    main()
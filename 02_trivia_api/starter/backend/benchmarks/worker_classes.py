@@ -0,0 +1,30 @@
+'''
+gunicorn worker class benchmark
+
+starts the app under gunicorn once per worker class (sync, gthread, gevent)
+with gunicorn.conf.py, drives the hot endpoints with concurrent keep-alive
+clients and prints throughput and latency percentiles for each class. the
+driver is shared with the other apps (flask_perf.bench), only the endpoints
+are listed here.
+
+usage (from the backend directory, with the database running):
+    python -m benchmarks.worker_classes --clients 64 --seconds 15
+'''
+import os
+
+from flask_perf.bench import worker_classes_main
+
+JSON = 'application/json'
+ENDPOINTS = [
+    ('GET', '/categories', None, None),
+    ('GET', '/questions?page=1', None, None),
+    ('GET', '/categories/1/questions', None, None),
+    ('POST', '/questions', '{"searchTerm": "title"}', JSON),
+    ('POST', '/quizzes',
+     '{"quiz_category": {"id": 0}, "previous_questions": []}', JSON),
+]
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == '__main__':
+    worker_classes_main(ENDPOINTS, HERE, __doc__.split('\n')[1])
@@ -1,10 +1,25 @@
 import os
-from flask import Flask, request, abort, jsonify
+import sys
+from flask import Flask, request, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
+# the instrumentation shared with the other apps lives in shared/flask_perf
+SHARED_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir, os.pardir, os.pardir, os.pardir, 'shared'))
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+
 from models import setup_db, Question, Category, db
+from flask_perf.instrumentation import init_instrumentation
+from flask_perf.metrics import init_metrics
+from flask_perf.profiling import init_profiling
+from flask_perf.slow_queries import init_slow_query_log
+from flask_perf.async_logging import setup_async_logging
+from flask_perf.fast_json import init_json, jsonify
+from flask_perf.compression import init_compression
 
 QUESTIONS_PER_PAGE = 10
 
@@ -20,8 +35,19 @@ def paginate_items(request, selection):
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
-    setup_db(app)
+    if test_config and test_config.get('SQLALCHEMY_DATABASE_URI'):
+        setup_db(app, test_config['SQLALCHEMY_DATABASE_URI'])
+    else:
+        setup_db(app)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
+    init_instrumentation(app)
+    init_metrics(app, db.get_engine(app), 'trivia')
+    init_profiling(app)
+    init_slow_query_log(app)
+    init_json(app)
+    init_compression(app)
+    if os.environ.get('LOG_FILE'):
+        setup_async_logging(app.logger, os.environ['LOG_FILE'])
 
     @app.after_request
     def after_request(response):
@@ -1,8 +1,13 @@
 import os
+import gzip
 import unittest
 import json
 from flask_sqlalchemy import SQLAlchemy
 
+# a low threshold, so a page of questions is always compressed and the
+# categories never are
+os.environ.setdefault('COMPRESSION_MIN_SIZE', '256')
+
 from flaskr import create_app
 from models import setup_db, Question, Category
 
@@ -134,6 +139,38 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 200) 
         self.assertEqual(data['success'], True) 
     
+    def test_get_questions_gzip(self):
+        res = self.client().get('/questions?page=1', headers={'Accept-Encoding': 'gzip'})
+        data = json.loads(gzip.decompress(res.data))
+        self.assertEqual(res.status_code, 200) 
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip') 
+        self.assertIn('Accept-Encoding', res.headers['Vary']) 
+        self.assertEqual(data['success'], True) 
+        self.assertTrue(len(data['questions'])) 
+
+    def test_get_questions_brotli(self):
+        try:
+            import brotli
+        except ImportError:
+            self.skipTest('brotli is not installed')
+        res = self.client().get('/questions?page=1', headers={'Accept-Encoding': 'br, gzip'})
+        data = json.loads(brotli.decompress(res.data))
+        self.assertEqual(res.status_code, 200) 
+        self.assertEqual(res.headers['Content-Encoding'], 'br') 
+        self.assertEqual(data['success'], True) 
+
+    def test_get_questions_without_accept_encoding(self):
+        res = self.client().get('/questions?page=1', headers={'Accept-Encoding': 'identity'})
+        data = json.loads(res.data)
+        self.assertNotIn('Content-Encoding', res.headers) 
+        self.assertEqual(data['success'], True) 
+
+    def test_small_response_not_compressed(self):
+        res = self.client().get('/categories', headers={'Accept-Encoding': 'gzip'})
+        data = json.loads(res.data)
+        self.assertNotIn('Content-Encoding', res.headers) 
+        self.assertEqual(data['success'], True) 
+
 # Make the tests conveniently executable
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,19 @@
+'''
+Production entry point
+
+    gunicorn wsgi:app
+
+the server settings live in gunicorn.conf.py next to this file.
+'''
+from flaskr import create_app
+from models import db
+
+app = create_app()
+
+
+def dispose_engine():
+    '''
+        drops the connections inherited from the gunicorn master,
+        each worker then opens its own on first use
+    '''
+    db.get_engine(app).dispose()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# the benchmark helpers shared with the other apps live in shared/flask_perf
+SHARED_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir, os.pardir, os.pardir, os.pardir, 'shared'))
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
@@ -0,0 +1,93 @@
+'''
+JSON encoding and compression benchmark
+
+measures GET /drinks-detail in process with every json backend (stdlib
+json, orjson when installed) and every content encoding (identity, gzip,
+brotli when installed), and prints the CPU time per request and the bytes
+sent on the wire. 'cold' requests drop the menu cache first, so the drinks
+are loaded and encoded every time; 'warm' requests are served from the
+cache. the identity + json rows are the behaviour before fast_json.py and
+compression.py.
+
+the requests skip the Auth0 check (it needs a live token and network) and
+run everything else: the before/after request hooks and the view itself.
+the drinks are seeded into a scratch sqlite database, never database.db.
+
+usage (from the backend directory):
+    python -m benchmarks.json_compression --drinks 500 --requests 200
+'''
+import argparse
+import json
+import os
+import tempfile
+import time
+
+RECIPE = [{'color': 'brown', 'name': 'coffee', 'parts': 1},
+          {'color': 'white', 'name': 'milk', 'parts': 2},
+          {'color': 'grey', 'name': 'foam', 'parts': 1}]
+
+
+def seed(db, Drink, count):
+    db.session.query(Drink).delete()
+    db.session.execute(Drink.__table__.insert(), [
+        {'title': 'drink {}'.format(i), 'recipe': json.dumps(RECIPE)}
+        for i in range(count)])
+    db.session.commit()
+
+
+def request_once(app, view, encoding):
+    with app.test_request_context(
+            '/drinks-detail', headers={'Accept-Encoding': encoding}):
+        response = app.preprocess_request()
+        if response is None:
+            # the view without its requires_auth wrapper
+            response = app.make_response(view.__wrapped__({}))
+        response = app.process_response(response)
+        return len(response.get_data())
+
+
+def measure(app, view, cache, encoding, requests, cold):
+    size = request_once(app, view, encoding)
+    started = time.process_time()
+    for _ in range(requests):
+        if cold:
+            cache.invalidate()
+        request_once(app, view, encoding)
+    return (time.process_time() - started) / requests * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--drinks', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///{}'.format(path)
+    from src.api import Get_Drink_Details, app
+    from src.cache import drinks_cache
+    from src.database.models import Drink, db, db_create_all
+    from flask_perf.compression import brotli
+    from flask_perf.fast_json import StdlibJSON, get_backend, orjson
+
+    db_create_all()
+    seed(db, Drink, args.drinks)
+    backends = [StdlibJSON()] + ([get_backend('orjson')] if orjson else [])
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+    print('{:<8} {:<10} {:<6} {:>12} {:>12}'.format(
+        'json', 'encoding', 'cache', 'cpu ms/req', 'bytes'))
+    for backend in backends:
+        app.extensions['fast_json'] = backend
+        for encoding in encodings:
+            for cold in (True, False):
+                drinks_cache.invalidate()
+                cpu, size = measure(app, Get_Drink_Details, drinks_cache,
+                                    encoding, args.requests, cold)
+                print('{:<8} {:<10} {:<6} {:>12.3f} {:>12}'.format(
+                    backend.name, encoding, 'cold' if cold else 'warm',
+                    cpu, size))
+
+
+if __name__ == '__main__':
+    main()
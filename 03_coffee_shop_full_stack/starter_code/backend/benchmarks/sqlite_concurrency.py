@@ -0,0 +1,139 @@
+'''
+SQLite concurrency benchmark
+
+measures read throughput of the drinks table while writers are committing,
+once with the plain pysqlite defaults and once with the profile from
+src/database/tuning.py. every reader and writer is a separate process,
+like gunicorn workers sharing the database file.
+
+usage (from the backend directory):
+    python -m benchmarks.sqlite_concurrency --readers 4 --writers 2 --seconds 10
+'''
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from flask_perf.bench import percentile
+from sqlalchemy import create_engine, exc, text
+
+from src.database.tuning import (SQLITE_PRAGMAS, apply_sqlite_pragmas,
+                                 sqlite_engine_options)
+
+RECIPE = json.dumps([{'color': 'brown', 'name': 'coffee', 'parts': 1}])
+
+
+def make_engine(path, tuned):
+    url = 'sqlite:///{}'.format(path)
+    if not tuned:
+        return create_engine(url)
+    return apply_sqlite_pragmas(create_engine(url, **sqlite_engine_options()))
+
+
+def seed(path, rows):
+    engine = create_engine('sqlite:///{}'.format(path))
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE drink (id INTEGER PRIMARY KEY, '
+            'title VARCHAR(80) UNIQUE, recipe VARCHAR(180) NOT NULL)'))
+        connection.execute(
+            text('INSERT INTO drink (title, recipe) VALUES (:title, :recipe)'),
+            [{'title': 'drink {}'.format(i), 'recipe': RECIPE}
+             for i in range(rows)])
+    engine.dispose()
+
+
+def reader(path, tuned, deadline, results):
+    engine = make_engine(path, tuned)
+    reads = errors = 0
+    latencies = []
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT * FROM drink')).fetchall()
+            reads += 1
+            latencies.append(time.perf_counter() - start)
+        except exc.OperationalError:
+            errors += 1
+    results.put(('read', reads, errors, latencies))
+
+
+def writer(path, tuned, deadline, results):
+    engine = make_engine(path, tuned)
+    writes = errors = 0
+    latencies = []
+    i = 0
+    while time.time() < deadline:
+        i += 1
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    text('UPDATE drink SET recipe = :recipe WHERE id = :id'),
+                    {'recipe': RECIPE, 'id': i % 100 + 1})
+            writes += 1
+            latencies.append(time.perf_counter() - start)
+        except exc.OperationalError:
+            errors += 1
+    results.put(('write', writes, errors, latencies))
+
+
+def run(tuned, args):
+    directory = tempfile.mkdtemp(prefix='coffee-bench-')
+    path = os.path.join(directory, 'bench.db')
+    seed(path, args.rows)
+    # journal_mode=WAL is persistent, switch it once before the workers start
+    make_engine(path, tuned).connect().close()
+
+    results = multiprocessing.Queue()
+    deadline = time.time() + args.seconds
+    processes = [multiprocessing.Process(
+        target=reader, args=(path, tuned, deadline, results))
+        for _ in range(args.readers)]
+    processes += [multiprocessing.Process(
+        target=writer, args=(path, tuned, deadline, results))
+        for _ in range(args.writers)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for kind in ('read', 'write'):
+        rows = [r for r in collected if r[0] == kind]
+        latencies = [l for r in rows for l in r[3]]
+        summary[kind] = {
+            'ops_per_sec': sum(r[1] for r in rows) / args.seconds,
+            'errors': sum(r[2] for r in rows),
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    print('tuned pragmas: {}'.format(SQLITE_PRAGMAS))
+    print('{:<8} {:<6} {:>12} {:>8} {:>10} {:>10}'.format(
+        'profile', 'op', 'ops/sec', 'errors', 'p50 ms', 'p99 ms'))
+    for name, tuned in (('default', False), ('tuned', True)):
+        summary = run(tuned, args)
+        for kind in ('read', 'write'):
+            row = summary[kind]
+            print('{:<8} {:<6} {:>12.1f} {:>8} {:>10.2f} {:>10.2f}'.format(
+                name, kind, row['ops_per_sec'], row['errors'],
+                row['p50_ms'], row['p99_ms']))
+
+
+if __name__ == '__main__':
+    main()
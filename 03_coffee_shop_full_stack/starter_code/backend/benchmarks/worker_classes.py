@@ -0,0 +1,24 @@
+'''
+gunicorn worker class benchmark
+
+starts the app under gunicorn once per worker class (sync, gthread, gevent)
+with gunicorn.conf.py, drives the hot endpoints with concurrent keep-alive
+clients and prints throughput and latency percentiles for each class. the
+driver is shared with the other apps (flask_perf.bench), only the endpoints
+are listed here.
+
+usage (from the backend directory, with the database migrated, flask db upgrade):
+    python -m benchmarks.worker_classes --clients 64 --seconds 15
+'''
+import os
+
+from flask_perf.bench import worker_classes_main
+
+ENDPOINTS = [
+    ('GET', '/drinks', None, None),
+]
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == '__main__':
+    worker_classes_main(ENDPOINTS, HERE, __doc__.split('\n')[1])
@@ -0,0 +1,16 @@
+import os
+import sys
+
+'''
+gunicorn settings, shared with the other apps: see
+shared/flask_perf/gunicorn_settings.py for the values and the environment
+variables that override them.
+'''
+
+SHARED_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir, os.pardir, os.pardir, 'shared'))
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+
+from flask_perf.gunicorn_settings import *
@@ -0,0 +1,41 @@
+"""create drinks and menu_version
+
+Revision ID: 5b2d8c1e4f37
+Revises: 
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2d8c1e4f37'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # databases created by the old db_drop_and_create_all() at import time
+    # already have the drinks table, only create what is missing
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'drink' not in existing:
+        op.create_table('drink',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=80), nullable=True),
+            sa.Column('recipe', sa.String(length=180), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('title')
+        )
+    if 'menu_version' not in existing:
+        op.create_table('menu_version',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('menu_version')
+    op.drop_table('drink')
@@ -0,0 +1,31 @@
+"""seed the menu_version row
+
+Revision ID: 9d4e2b7a1c58
+Revises: 5b2d8c1e4f37
+Create Date: 2026-10-19 19:08:12.604913
+
+MenuVersion.bump() used to insert the row on the first write to the menu,
+two concurrent first writes both tried to insert it. the row now exists
+from the start and bump() is always a single UPDATE.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4e2b7a1c58'
+down_revision = '5b2d8c1e4f37'
+branch_labels = None
+depends_on = None
+
+SEED_MENU_VERSION = (
+    'INSERT INTO menu_version (id, version) SELECT 1, 0 '
+    'WHERE NOT EXISTS (SELECT 1 FROM menu_version WHERE id = 1)')
+
+
+def upgrade():
+    op.execute(SEED_MENU_VERSION)
+
+
+def downgrade():
+    # the row is harmless for the previous bump(), which updates it
+    pass
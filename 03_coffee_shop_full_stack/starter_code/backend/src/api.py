@@ -1,17 +1,33 @@
 import os
-from flask import Flask, request, jsonify, abort
+from flask import Flask, request, abort
 from sqlalchemy import exc
 import json
 from flask_cors import CORS
 
-from .database.models import db_drop_and_create_all, setup_db, Drink
+from .database.models import db, setup_db, Drink, recipe_errors
 from .auth.auth import AuthError, requires_auth
+from .cache import drinks_cache
+from flask_perf.instrumentation import init_instrumentation
+from flask_perf.metrics import init_metrics
+from flask_perf.profiling import init_profiling
+from flask_perf.slow_queries import init_slow_query_log
+from flask_perf.async_logging import setup_async_logging
+from flask_perf.fast_json import init_json, jsonify
+from flask_perf.compression import init_compression
 
 app = Flask(__name__)
 setup_db(app)
 CORS(app)
+init_instrumentation(app)
+init_metrics(app, db.get_engine(app), 'coffee_shop')
+init_profiling(app)
+init_slow_query_log(app)
+init_json(app)
+init_compression(app)
+if os.environ.get('LOG_FILE'):
+    setup_async_logging(app.logger, os.environ['LOG_FILE'])
 
-db_drop_and_create_all()
+MAX_BATCH_SIZE = 1000
 
 # ROUTES
 
@@ -26,17 +42,13 @@ def Get_Drinks():
             where drinks is the list of drinks
             or not found error message
             if there is no drinks
+            the body is served from the menu cache and carries an ETag,
+            a matching If-None-Match gets an empty 304
     '''
     try:
-        drinks = Drink.query.all()
-        drinks = [drink.short() for drink in drinks]
-    except:
-        abort(422)    
-
-    return jsonify({
-        "success": True,
-        "drinks": drinks
-    })
+        return drinks_cache.response('short')
+    except BaseException:
+        abort(422)
 
 
 @app.route('/drinks-detail')
@@ -50,17 +62,13 @@ def Get_Drink_Details(payload):
             json {"success": True, "drinks": drinks}
             where drinks is the list of drinks
             or appropriate status code indicating reason for failure
+            the body is served from the menu cache and carries an ETag,
+            a matching If-None-Match gets an empty 304
     '''
     try:
-        drinks = Drink.query.all()
-        drinks = [drink.long() for drink in drinks]
-    except:
-        abort(422)    
-
-    return jsonify({
-        "success": True,
-        "drinks": drinks
-    })
+        return drinks_cache.response('long')
+    except BaseException:
+        abort(422)
 
 
 @app.route('/drinks', methods=['POST'])
@@ -91,6 +99,73 @@ def Add_Drink(payload):
     })
 
 
+@app.route('/drinks/batch', methods=['POST'])
+@requires_auth("post:drinks")
+def Add_Drinks_Batch(payload):
+    '''
+        POST /drinks/batch
+            it should create many rows in the drinks table in one transaction
+            it should require the 'post:drinks' permission
+            the body is {"drinks": [{"title", "recipe"}, ...], "on_conflict": mode}
+            where mode is "skip" (default) or "update" for titles that
+            already exist
+            every recipe is validated against the
+            [{'color': string, 'name':string, 'parts':number}] schema,
+            invalid items are reported and the valid ones are still inserted
+            returns status code 200 and
+            json {"success": True, "results": results, "created": n,
+            "updated": n, "skipped": n, "invalid": n}
+            where results has one {"index", "title", "status"} entry per item
+            with the drink "id" or the validation "errors"
+            or appropriate status code indicating reason for failure
+    '''
+    body = request.get_json()
+    if not isinstance(body, dict) or not isinstance(body.get('drinks'), list):
+        abort(400)
+    items = body['drinks']
+    on_conflict = body.get('on_conflict', 'skip')
+    if on_conflict not in ('skip', 'update') or not items \
+            or len(items) > MAX_BATCH_SIZE:
+        abort(400)
+
+    results = []
+    valid = {}
+    for index, item in enumerate(items):
+        title = item.get('title') if isinstance(item, dict) else None
+        result = {'index': index, 'title': title}
+        results.append(result)
+        if not isinstance(title, str) or not title:
+            errors = ['title must be a non empty string']
+        elif len(title) > Drink.title.type.length:
+            errors = ['title is too long']
+        elif title in valid:
+            errors = ['title is repeated in the batch']
+        else:
+            errors = recipe_errors(item.get('recipe'))
+        if errors:
+            result.update(status='invalid', errors=errors)
+        else:
+            valid[title] = {
+                'title': title,
+                'recipe': json.dumps(item['recipe'])
+            }
+
+    outcomes = {}
+    if valid:
+        try:
+            outcomes = Drink.insert_many(list(valid.values()), on_conflict)
+        except BaseException:
+            abort(422)
+
+    counts = {'created': 0, 'updated': 0, 'skipped': 0, 'invalid': 0}
+    for result in results:
+        if 'status' not in result:
+            result['status'], result['id'] = outcomes[result['title']]
+        counts[result['status']] += 1
+
+    return jsonify(dict(counts, success=True, results=results))
+
+
 @app.route('/drinks/<id>', methods=['PATCH'])
 @requires_auth("patch:drinks")
 def Edit_Drink(payload, id):
@@ -99,34 +174,33 @@ def Edit_Drink(payload, id):
             where <id> is the existing model id
             it should respond with a 404 error if <id> is not found
             it should update the corresponding row for <id>
+            only the fields present in the body are written
             it should require the 'patch:drinks' permission
             it should contain the drink.long() data representation
             returns status code 200 and json {"success": True, "drinks": drink}
             where drink an array containing only the updated drink
             or appropriate status code indicating reason for failure
     '''
-    drink = Drink.query.filter(Drink.id == id).one_or_none()
-
-    if drink is None:
-        return json.dumps({
-            'success': False,
-            'error': 'Drink #' + id + ' not found to be edited'
-        }), 404    
-
-
     body = request.get_json()
     if 'title' not in body and 'recipe' not in body:
         abort(400)
+
+    values = {}
+    if 'title' in body:
+        values['title'] = body['title']
+    if 'recipe' in body:
+        values['recipe'] = json.dumps(body['recipe'])
     try:
-        title = body.get("title")
-        recipe = body.get("recipe")
-        drink.title = title
-        drink.recipe = json.dumps(recipe)
-        drink.update()
-        drink = Drink.query.filter(Drink.id == id).one_or_none()
+        drink = Drink.update_by_id(id, values)
     except BaseException:
         abort(400)
 
+    if drink is None:
+        return json.dumps({
+            'success': False,
+            'error': 'Drink #' + id + ' not found to be edited'
+        }), 404
+
     return jsonify({
         'success': True,
         'drinks': [drink.long()]
@@ -146,15 +220,14 @@ def Delete_Drink(payload, id):
             where id is the id of the deleted record
             or appropriate status code indicating reason for failure
     '''
-    drink = Drink.query.filter(Drink.id == id).one_or_none()
-    if drink is None:
-        abort(404)
-
     try:
-        drink.delete()
+        deleted = Drink.delete_by_id(id)
     except BaseException:
         abort(400)
 
+    if not deleted:
+        abort(404)
+
     return jsonify({
         'success': True,
         "delete": id
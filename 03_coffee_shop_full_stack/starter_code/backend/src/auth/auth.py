@@ -1,9 +1,12 @@
 import json
+import time
 from flask import request, _request_ctx_stack, abort
 from functools import wraps
 from jose import jwt
 from urllib.request import urlopen
 
+from flask_perf.metrics import observe_auth
+
 
 AUTH0_DOMAIN = 'dev-mohamed.us.auth0.com'
 ALGORITHMS = ['RS256']
@@ -164,10 +167,13 @@ def requires_auth(permission=''):
         @wraps(f)
         def wrapper(*args, **kwargs):
             token = get_token_auth_header()
+            started = time.perf_counter()
             try:
                 payload = verify_decode_jwt(token)
             except BaseException:
+                observe_auth(time.perf_counter() - started, ok=False)
                 abort(401)
+            observe_auth(time.perf_counter() - started)
             check_permissions(permission, payload)
             return f(payload, *args, **kwargs)
         return wrapper
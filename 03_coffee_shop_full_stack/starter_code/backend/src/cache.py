@@ -0,0 +1,77 @@
+import hashlib
+import threading
+from flask import Response, request
+
+from .database.models import Drink, MenuVersion
+from flask_perf.fast_json import dumps
+from flask_perf.metrics import record_cache
+
+
+class DrinksCache:
+    '''
+    DrinksCache
+    keeps the pre-encoded json body of the drinks menu for every
+    representation ('short' and 'long'), tagged with the MenuVersion
+    it was built from.
+    a cached body is served as long as the committed menu version
+    has not moved, so every worker notices writes made by the others.
+    the etag is derived from the body itself, so it stays valid
+    even if the version counter is reset with the database
+    '''
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, representation):
+        '''
+            get(representation) method
+                @INPUTS
+                    representation: 'short' or 'long'
+
+                returns a (body, etag) tuple for the current menu,
+                rebuilding the body only when the menu version changed
+        '''
+        version = MenuVersion.current()
+        entry = self._entries.get(representation)
+        if entry is not None and entry[0] == version:
+            record_cache('drinks', True)
+            return entry[1], entry[2]
+        record_cache('drinks', False)
+
+        with self._lock:
+            entry = self._entries.get(representation)
+            if entry is None or entry[0] != version:
+                drinks = [getattr(drink, representation)()
+                          for drink in Drink.query.order_by(Drink.id)]
+                body = dumps({
+                    "success": True,
+                    "drinks": drinks
+                })
+                etag = hashlib.sha1(body).hexdigest()
+                entry = (version, body, etag)
+                self._entries[representation] = entry
+        return entry[1], entry[2]
+
+    def response(self, representation):
+        '''
+            response(representation) method
+                returns the cached menu as a conditional response,
+                a 304 is sent when the client already has this version
+        '''
+        body, etag = self.get(representation)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def invalidate(self):
+        '''
+            invalidate() method
+                drops every cached body of this process
+        '''
+        with self._lock:
+            self._entries.clear()
+
+
+drinks_cache = DrinksCache()
@@ -1,23 +1,35 @@
 import os
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import (DDL, Boolean, Column, String, Integer, bindparam, event, exc,
+                        exists, inspect, literal_column, select, true)
+from sqlalchemy.dialects import postgresql
 from flask_sqlalchemy import SQLAlchemy
 import json
 
+from .tuning import SQLITE_TUNING, apply_sqlite_pragmas, sqlite_engine_options
+
 database_filename = "database.db"
 project_dir = os.path.dirname(os.path.abspath(__file__))
-database_path = "sqlite:///{}".format(os.path.join(project_dir, database_filename))
+database_path = os.environ.get(
+    "DATABASE_URL",
+    "sqlite:///{}".format(os.path.join(project_dir, database_filename)))
 
 db = SQLAlchemy()
 
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
+    sqlite connections get the performance profile from ./tuning.py
 '''
 def setup_db(app):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    tuned = SQLITE_TUNING and database_path.startswith('sqlite')
+    if tuned:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqlite_engine_options()
     db.app = app
     db.init_app(app)
+    if tuned:
+        apply_sqlite_pragmas(db.get_engine(app))
 
 '''
 db_drop_and_create_all()
@@ -29,6 +41,46 @@ def db_drop_and_create_all():
     db.drop_all()
     db.create_all()
 
+'''
+db_create_all()
+    creates the tables that are missing and leaves existing tables and rows alone
+    the tables are not stamped with a migration, use `flask init-db`
+    (src/manage.py) which stamps them, the app itself never creates tables
+'''
+def db_create_all():
+    missing = set(db.metadata.tables) - set(inspect(db.engine).get_table_names())
+    if not missing:
+        return
+    try:
+        db.create_all()
+    except exc.OperationalError:
+        # another worker created the tables between the check and the create
+        if set(db.metadata.tables) - set(inspect(db.engine).get_table_names()):
+            raise
+
+'''
+recipe_errors(recipe)
+    checks a recipe against the [{'color': string, 'name':string, 'parts':number}] schema
+    returns a list of error messages, empty when the recipe is valid
+'''
+def recipe_errors(recipe):
+    if not isinstance(recipe, list) or not recipe:
+        return ['recipe must be a non empty list']
+    errors = []
+    for i, part in enumerate(recipe):
+        if not isinstance(part, dict):
+            errors.append('recipe[{}] must be an object'.format(i))
+            continue
+        for key in ('color', 'name'):
+            if not isinstance(part.get(key), str) or not part.get(key):
+                errors.append('recipe[{}].{} must be a non empty string'.format(i, key))
+        parts = part.get('parts')
+        if isinstance(parts, bool) or not isinstance(parts, (int, float)) or parts <= 0:
+            errors.append('recipe[{}].parts must be a positive number'.format(i))
+    if not errors and len(json.dumps(recipe)) > Drink.recipe.type.length:
+        errors.append('recipe is too long')
+    return errors
+
 '''
 Drink
 a persistent drink entity, extends the base SQLAlchemy Model
@@ -47,7 +99,6 @@ class Drink(db.Model):
         short form representation of the Drink model
     '''
     def short(self):
-        print(json.loads(self.recipe))
         short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
         return {
             'id': self.id,
@@ -69,6 +120,7 @@ class Drink(db.Model):
     '''
     insert()
         inserts a new model into a database
+        and bumps the menu version in the same transaction
         the model must have a unique name
         the model must have a unique id or null id
         EXAMPLE
@@ -77,11 +129,13 @@ class Drink(db.Model):
     '''
     def insert(self):
         db.session.add(self)
+        MenuVersion.bump()
         db.session.commit()
 
     '''
     delete()
         deletes a new model into a database
+        and bumps the menu version in the same transaction
         the model must exist in the database
         EXAMPLE
             drink = Drink(title=req_title, recipe=req_recipe)
@@ -89,11 +143,13 @@ class Drink(db.Model):
     '''
     def delete(self):
         db.session.delete(self)
+        MenuVersion.bump()
         db.session.commit()
 
     '''
     update()
         updates a new model into a database
+        and bumps the menu version in the same transaction
         the model must exist in the database
         EXAMPLE
             drink = Drink.query.filter(Drink.id == id).one_or_none()
@@ -101,7 +157,228 @@ class Drink(db.Model):
             drink.update()
     '''
     def update(self):
+        MenuVersion.bump()
         db.session.commit()
 
+    '''
+    update_by_id(id, values)
+        updates only the given columns of the drink <id> without loading it first
+        and bumps the menu version in the same transaction
+        on postgresql the update, the bump and the returned row are a single
+        statement (MenuVersion.bump_with), other databases pay one UPDATE for
+        the drink and one for the version, plus a SELECT of the row when the
+        update was partial
+        returns a detached Drink holding the new row, or None if <id> does not exist
+        EXAMPLE
+            drink = Drink.update_by_id(id, {'title': 'Black Coffee'})
+    '''
+    @classmethod
+    def update_by_id(cls, id, values):
+        table = cls.__table__
+        stmt = table.update().where(table.c.id == id).values(**values)
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                row = db.session.execute(
+                    MenuVersion.bump_with(stmt.returning(*table.c))).first()
+            elif db.session.execute(stmt).rowcount == 0:
+                row = None
+            else:
+                MenuVersion.bump()
+                if set(values) >= {'title', 'recipe'}:
+                    row = dict(values, id=int(id))
+                else:
+                    row = db.session.execute(
+                        table.select().where(table.c.id == id)).first()
+            if row is None:
+                db.session.rollback()
+                return None
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        return cls(id=row['id'], title=row['title'], recipe=row['recipe'])
+
+    '''
+    delete_by_id(id)
+        deletes the drink <id> without loading it and bumps the menu version
+        in the same transaction
+        a single statement on postgresql (MenuVersion.bump_with), a DELETE
+        and an UPDATE of the version on other databases
+        returns False if <id> does not exist
+        EXAMPLE
+            deleted = Drink.delete_by_id(id)
+    '''
+    @classmethod
+    def delete_by_id(cls, id):
+        table = cls.__table__
+        stmt = table.delete().where(table.c.id == id)
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                deleted = db.session.execute(MenuVersion.bump_with(
+                    stmt.returning(table.c.id))).first() is not None
+            else:
+                deleted = db.session.execute(stmt).rowcount
+                if deleted:
+                    MenuVersion.bump()
+            if not deleted:
+                db.session.rollback()
+                return False
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        return True
+
+    '''
+    insert_many(items, on_conflict)
+        inserts a batch of {'title', 'recipe'} items in a single transaction
+        the recipes must already be validated and json encoded, the titles
+        must be unique within the batch
+        on_conflict decides what happens to titles that already exist:
+            'skip'   leaves the existing drink untouched
+            'update' replaces the existing recipe
+        on postgresql the batch is one INSERT ... ON CONFLICT that also bumps
+        the menu version, so the outcome of each title comes from the insert
+        itself; other databases look the titles up first, in the same
+        transaction as the writes
+        returns a dict {title: (outcome, id)} where outcome is
+        'created', 'updated' or 'skipped'
+        EXAMPLE
+            outcomes = Drink.insert_many([{'title': 'Latte', 'recipe': '[...]'}])
+    '''
+    @classmethod
+    def insert_many(cls, items, on_conflict='skip'):
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                outcomes = cls._upsert_many(items, on_conflict)
+            else:
+                outcomes = cls._insert_missing(items, on_conflict)
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        return outcomes
+
+    @classmethod
+    def _upsert_many(cls, items, on_conflict):
+        table = cls.__table__
+        stmt = postgresql.insert(table).values(items)
+        if on_conflict == 'update':
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.title],
+                set_={'recipe': stmt.excluded.recipe})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.title])
+        # xmax is 0 for a row version this statement inserted
+        created = literal_column('xmax = 0', Boolean).label('created')
+        rows = db.session.execute(MenuVersion.bump_with(
+            stmt.returning(table.c.title, table.c.id, created)))
+        outcomes = {row.title: ('created' if row.created else 'updated', row.id)
+                    for row in rows}
+
+        # the rest already existed and were left alone (on_conflict='skip')
+        skipped = [item['title'] for item in items if item['title'] not in outcomes]
+        if skipped:
+            existing = {row.title: row.id for row in db.session.execute(
+                select([table.c.title, table.c.id]).where(table.c.title.in_(skipped)))}
+            for title in skipped:
+                outcomes[title] = ('skipped', existing.get(title))
+        return outcomes
+
+    @classmethod
+    def _insert_missing(cls, items, on_conflict):
+        table = cls.__table__
+        titles = [item['title'] for item in items]
+        outcomes = {}
+        existing = {row.title: row.id for row in db.session.execute(
+            table.select().where(table.c.title.in_(titles)))}
+        new_items = [item for item in items if item['title'] not in existing]
+        old_items = [item for item in items if item['title'] in existing]
+
+        if new_items:
+            # sqlite lets a single writer in, a batch racing this one fails
+            # on the write lock instead of inserting the same title
+            if db.engine.dialect.name == 'sqlite':
+                stmt = table.insert().prefix_with('OR IGNORE')
+            else:
+                stmt = table.insert()
+            db.session.execute(stmt, new_items)
+        if old_items and on_conflict == 'update':
+            db.session.execute(
+                table.update()
+                .where(table.c.title == bindparam('b_title'))
+                .values(recipe=bindparam('b_recipe')),
+                [{'b_title': item['title'], 'b_recipe': item['recipe']}
+                 for item in old_items])
+
+        created = {row.title: row.id for row in db.session.execute(
+            table.select().where(table.c.title.in_(
+                [item['title'] for item in new_items])))} if new_items else {}
+        for item in new_items:
+            outcomes[item['title']] = ('created', created[item['title']])
+        for item in old_items:
+            outcomes[item['title']] = (
+                'updated' if on_conflict == 'update' else 'skipped',
+                existing[item['title']])
+
+        if any(outcome != 'skipped' for outcome, _ in outcomes.values()):
+            MenuVersion.bump()
+        return outcomes
+
     def __repr__(self):
-        return json.dumps(self.short())
\ No newline at end of file
+        return json.dumps(self.short())
+
+'''
+MenuVersion
+a single row counter that is bumped in the same transaction as
+every write to the drinks table, used to validate cached menus
+the row is created with the table (and by the 9d4e2b7a1c58 migration)
+'''
+class MenuVersion(db.Model):
+    __tablename__ = 'menu_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    '''
+    current()
+        returns the committed menu version (0 if the menu was never written)
+    '''
+    @classmethod
+    def current(cls):
+        version = db.session.query(cls.version).filter(cls.id == 1).scalar()
+        return version or 0
+
+    '''
+    bump()
+        increments the menu version inside the current session
+        the caller is responsible for committing
+    '''
+    @classmethod
+    def bump(cls):
+        cls.query.filter(cls.id == 1).update(
+            {cls.version: cls.version + 1}, synchronize_session=False)
+
+    '''
+    bump_with(stmt)
+        folds the bump into a write on postgresql: stmt (an UPDATE or DELETE
+        ... RETURNING) and the bump become data modifying CTEs of one SELECT
+        of the returned rows, and the version is only bumped when stmt
+        changed a row
+    '''
+    @classmethod
+    def bump_with(cls, stmt):
+        table = cls.__table__
+        changed = stmt.cte('changed')
+        bumped = table.update().where(table.c.id == 1) \
+            .where(exists().select_from(changed)) \
+            .values(version=table.c.version + 1) \
+            .returning(table.c.version).cte('bumped')
+        return select([changed]).select_from(changed.join(bumped, true()))
+
+
+# seeded with the table, so bump() never has to insert it and two
+# concurrent first writes cannot race on the insert
+event.listen(MenuVersion.__table__, 'after_create', DDL(
+    'INSERT INTO menu_version (id, version) SELECT 1, 0 '
+    'WHERE NOT EXISTS (SELECT 1 FROM menu_version WHERE id = 1)'))
@@ -0,0 +1,56 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+'''
+SQLite performance profile
+
+every value can be overridden from the environment, set SQLITE_TUNING=0
+to fall back to the plain pysqlite defaults (rollback journal, no pooling)
+
+    journal_mode  WAL lets readers run while a write is in flight
+    synchronous   NORMAL only fsyncs at checkpoints, safe with WAL
+    mmap_size     bytes of the database file read through mmap
+    cache_size    page cache per connection, negative values are KiB
+    busy_timeout  milliseconds a writer waits for the lock before failing
+'''
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') != '0'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+}
+
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+
+'''
+sqlite_engine_options(pragmas)
+    engine options for a file based sqlite database
+    connections are pooled so the pragmas run once per connection
+    instead of once per request (sqlalchemy uses a NullPool by default)
+'''
+def sqlite_engine_options(pragmas=SQLITE_PRAGMAS):
+    return {
+        'poolclass': QueuePool,
+        'pool_size': SQLITE_POOL_SIZE,
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': pragmas['busy_timeout'] / 1000.0
+        }
+    }
+
+'''
+apply_sqlite_pragmas(engine, pragmas)
+    runs the pragmas on every new dbapi connection of the engine
+'''
+def apply_sqlite_pragmas(engine, pragmas=SQLITE_PRAGMAS):
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {}={}'.format(name, value))
+        cursor.close()
+    return engine
@@ -0,0 +1,48 @@
+import os
+import click
+from flask_migrate import Migrate, stamp, upgrade
+from sqlalchemy import inspect
+
+from .api import app
+from .database.models import db, db_create_all, db_drop_and_create_all
+
+'''
+management entry point
+    kept out of api.py so serving workers never import the migration tooling
+    usage (from the backend directory):
+        export FLASK_APP=src/manage.py
+        flask db upgrade     apply the alembic migrations
+        flask init-db        create the tables of a new database
+        flask reset-db       drop every table and start fresh (destructive)
+'''
+
+migrations_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+migrate = Migrate(app, db, directory=migrations_dir, render_as_batch=True)
+
+
+@app.cli.command('init-db')
+def init_db():
+    '''
+        creates the missing tables and stamps them with the latest migration,
+        a database already under migrations is upgraded instead
+        existing data is kept
+    '''
+    if 'alembic_version' in inspect(db.engine).get_table_names():
+        upgrade(directory=migrations_dir)
+    else:
+        db_create_all()
+        stamp(directory=migrations_dir)
+    click.echo('database is ready')
+
+
+@app.cli.command('reset-db')
+@click.confirmation_option(
+    prompt='This drops every table and all the drinks, continue?')
+def reset_db():
+    '''
+        drops the database tables and starts fresh
+    '''
+    db_drop_and_create_all()
+    stamp(directory=migrations_dir)
+    click.echo('database was reset')
@@ -0,0 +1,293 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy.dialects import postgresql
+
+# a throwaway sqlite database unless TEST_DATABASE_URL names another one
+# (a postgresql one runs the single statement writes of MenuVersion.bump_with),
+# never database.db: setUp drops every table
+os.environ['DATABASE_URL'] = os.environ.get(
+    'TEST_DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'coffee_shop_test.db'))
+
+from src.api import MAX_BATCH_SIZE, app
+from src.cache import drinks_cache
+from src.database.models import (Drink, MenuVersion, db,
+                                 db_drop_and_create_all, recipe_errors)
+
+PERMISSIONS = ['get:drinks-detail', 'post:drinks', 'patch:drinks',
+               'delete:drinks']
+AUTH = {'Authorization': 'Bearer test'}
+RECIPE = [{'color': 'brown', 'name': 'coffee', 'parts': 1},
+          {'color': 'white', 'name': 'milk', 'parts': 2}]
+
+
+class ApiTestCase(unittest.TestCase):
+    """This class sets up an empty menu with one drink for the api test cases"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        db_drop_and_create_all()
+        # the version restarts at 0 with the tables, the bodies cached by
+        # the previous test would look current
+        drinks_cache.invalidate()
+        drink = Drink(title='Latte', recipe=json.dumps(RECIPE))
+        drink.insert()
+        self.latte = drink.id
+        # the Auth0 token check needs the network, the permissions are
+        # still checked
+        self.auth = mock.patch('src.auth.auth.verify_decode_jwt',
+                               return_value={'permissions': PERMISSIONS})
+        self.auth.start()
+
+    def tearDown(self):
+        self.auth.stop()
+        db.session.remove()
+        self.context.pop()
+
+    def drinks(self):
+        res = self.client.get('/drinks-detail', headers=AUTH)
+        return {drink['title']: drink for drink in json.loads(res.data)['drinks']}
+
+
+class DrinksTestCase(ApiTestCase):
+    """This class represents the drinks api test case"""
+
+    def test_get_drinks(self):
+        res = self.client.get('/drinks')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['drinks'], [{
+            'id': self.latte, 'title': 'Latte',
+            'recipe': [{'color': 'brown', 'parts': 1},
+                       {'color': 'white', 'parts': 2}]}])
+        self.assertTrue(res.headers['ETag'])
+        self.assertEqual(res.headers['Cache-Control'], 'no-cache')
+
+    def test_get_drinks_not_modified(self):
+        res = self.client.get('/drinks')
+        res = self.client.get('/drinks',
+                              headers={'If-None-Match': res.headers['ETag']})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_get_drinks_detail_requires_auth(self):
+        res = self.client.get('/drinks-detail')
+
+        self.assertEqual(res.status_code, 401)
+
+    def test_post_drink_invalidates_cache(self):
+        etag = self.client.get('/drinks').headers['ETag']
+        version = MenuVersion.current()
+        res = self.client.post('/drinks', headers=AUTH,
+                               json={'title': 'Mocha', 'recipe': RECIPE})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['drinks'][0]['title'], 'Mocha')
+        self.assertEqual(MenuVersion.current(), version + 1)
+        res = self.client.get('/drinks', headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(json.loads(res.data)['drinks']), 2)
+
+    def test_post_drink_for_errors(self):
+        res = self.client.post('/drinks', headers=AUTH, json={'title': 'Mocha'})
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(json.loads(res.data)['message'], 'Bad Request')
+
+    def test_patch_drink_keeps_missing_fields(self):
+        etag = self.client.get('/drinks').headers['ETag']
+        version = MenuVersion.current()
+        res = self.client.patch('/drinks/{}'.format(self.latte), headers=AUTH,
+                                json={'title': 'Flat White'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['drinks'], [{
+            'id': self.latte, 'title': 'Flat White', 'recipe': RECIPE}])
+        self.assertEqual(MenuVersion.current(), version + 1)
+        self.assertEqual(self.drinks()['Flat White']['recipe'], RECIPE)
+        res = self.client.get('/drinks', headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+
+    def test_patch_drink_recipe_only(self):
+        recipe = [{'color': 'black', 'name': 'espresso', 'parts': 1}]
+        res = self.client.patch('/drinks/{}'.format(self.latte), headers=AUTH,
+                                json={'recipe': recipe})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.drinks()['Latte']['recipe'], recipe)
+
+    def test_patch_drink_for_errors(self):
+        version = MenuVersion.current()
+        res = self.client.patch('/drinks/1000', headers=AUTH,
+                                json={'title': 'Flat White'})
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(json.loads(res.data)['success'], False)
+        self.assertEqual(MenuVersion.current(), version)
+        res = self.client.patch('/drinks/{}'.format(self.latte), headers=AUTH,
+                                json={})
+        self.assertEqual(res.status_code, 400)
+
+    def test_delete_drink_invalidates_cache(self):
+        etag = self.client.get('/drinks').headers['ETag']
+        res = self.client.delete('/drinks/{}'.format(self.latte), headers=AUTH)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['delete'], str(self.latte))
+        res = self.client.get('/drinks', headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.data)['drinks'], [])
+
+    def test_delete_drink_for_errors(self):
+        version = MenuVersion.current()
+        res = self.client.delete('/drinks/1000', headers=AUTH)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['message'], 'Resource Not Found')
+        self.assertEqual(MenuVersion.current(), version)
+
+    def test_write_by_another_worker(self):
+        self.client.get('/drinks')
+        # another process writes and bumps the version, this one only sees
+        # the database
+        with db.engine.begin() as connection:
+            connection.execute(Drink.__table__.insert(),
+                               title='Mocha', recipe=json.dumps(RECIPE))
+            connection.execute(MenuVersion.__table__.update().values(
+                version=MenuVersion.__table__.c.version + 1))
+        res = self.client.get('/drinks')
+
+        self.assertEqual([drink['title'] for drink in json.loads(res.data)[
+            'drinks']], ['Latte', 'Mocha'])
+
+
+class DrinksBatchTestCase(ApiTestCase):
+    """This class represents the drinks batch insert test case"""
+
+    def post_batch(self, drinks, **body):
+        res = self.client.post('/drinks/batch', headers=AUTH,
+                               json=dict(body, drinks=drinks))
+        return res, json.loads(res.data)
+
+    def test_batch_outcomes(self):
+        version = MenuVersion.current()
+        res, data = self.post_batch([
+            {'title': 'Mocha', 'recipe': RECIPE},
+            {'title': 'Latte', 'recipe': RECIPE},
+            {'title': 'Cortado', 'recipe': []},
+            {'title': 'Mocha', 'recipe': RECIPE},
+        ])
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((data['created'], data['updated'], data['skipped'],
+                          data['invalid']), (1, 0, 1, 2))
+        self.assertEqual([r['status'] for r in data['results']],
+                         ['created', 'skipped', 'invalid', 'invalid'])
+        self.assertEqual(data['results'][1]['id'], self.latte)
+        self.assertEqual(data['results'][3]['errors'],
+                         ['title is repeated in the batch'])
+        self.assertEqual(MenuVersion.current(), version + 1)
+        self.assertEqual(set(self.drinks()), {'Latte', 'Mocha'})
+
+    def test_batch_update(self):
+        recipe = [{'color': 'black', 'name': 'espresso', 'parts': 1}]
+        res, data = self.post_batch([{'title': 'Latte', 'recipe': recipe}],
+                                    on_conflict='update')
+
+        self.assertEqual(data['results'], [{
+            'index': 0, 'title': 'Latte', 'status': 'updated',
+            'id': self.latte}])
+        self.assertEqual(self.drinks()['Latte']['recipe'], recipe)
+
+    def test_batch_only_skipped_keeps_version(self):
+        etag = self.client.get('/drinks').headers['ETag']
+        version = MenuVersion.current()
+        res, data = self.post_batch([{'title': 'Latte', 'recipe': RECIPE}])
+
+        self.assertEqual(data['skipped'], 1)
+        self.assertEqual(MenuVersion.current(), version)
+        res = self.client.get('/drinks', headers={'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+
+    def test_batch_for_errors(self):
+        for body in ([1, 2], {}, {'drinks': []}, {'drinks': {}},
+                     {'drinks': [{'title': 'Mocha', 'recipe': RECIPE}],
+                      'on_conflict': 'replace'},
+                     {'drinks': [{}] * (MAX_BATCH_SIZE + 1)}):
+            res = self.client.post('/drinks/batch', headers=AUTH, json=body)
+            self.assertEqual(res.status_code, 400, body)
+
+
+class RecipeErrorsTestCase(unittest.TestCase):
+    """This class represents the recipe validation test case"""
+
+    def test_valid_recipe(self):
+        self.assertEqual(recipe_errors(RECIPE), [])
+        self.assertEqual(recipe_errors(
+            [{'color': 'white', 'name': 'milk', 'parts': 0.5}]), [])
+
+    def test_invalid_recipes(self):
+        self.assertEqual(recipe_errors(None), ['recipe must be a non empty list'])
+        self.assertEqual(recipe_errors([]), ['recipe must be a non empty list'])
+        self.assertEqual(recipe_errors(['milk']), ['recipe[0] must be an object'])
+        self.assertEqual(recipe_errors([
+            {'color': '', 'name': 'milk', 'parts': 1},
+            {'color': 'white', 'parts': True},
+        ]), [
+            'recipe[0].color must be a non empty string',
+            'recipe[1].name must be a non empty string',
+            'recipe[1].parts must be a positive number',
+        ])
+        self.assertEqual(recipe_errors(
+            [{'color': 'white', 'name': 'milk', 'parts': -1}]),
+            ['recipe[0].parts must be a positive number'])
+        self.assertEqual(recipe_errors(
+            [{'color': 'white', 'name': 'milk' * 50, 'parts': 1}]),
+            ['recipe is too long'])
+
+
+class BumpWithTestCase(unittest.TestCase):
+    """This class represents the single statement write test case"""
+
+    def compile(self, stmt):
+        return str(MenuVersion.bump_with(stmt).compile(
+            dialect=postgresql.dialect()))
+
+    def test_update_and_bump_in_one_statement(self):
+        table = Drink.__table__
+        sql = self.compile(table.update().where(table.c.id == 1)
+                           .values(title='Mocha').returning(*table.c))
+
+        self.assertTrue(sql.startswith('WITH changed AS \n(UPDATE drink SET'))
+        self.assertIn('bumped AS \n(UPDATE menu_version SET version='
+                      '(menu_version.version + %(version_1)s)', sql)
+        # the version only moves when the write changed a row
+        self.assertIn('EXISTS (SELECT * \nFROM changed)', sql)
+        self.assertIn('RETURNING menu_version.version', sql)
+        self.assertIn('FROM changed JOIN bumped ON true', sql)
+
+    def test_delete_and_bump_in_one_statement(self):
+        table = Drink.__table__
+        sql = self.compile(table.delete().where(table.c.id == 1)
+                           .returning(table.c.id))
+
+        self.assertTrue(sql.startswith('WITH changed AS \n(DELETE FROM drink'))
+        self.assertIn('RETURNING drink.id', sql)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
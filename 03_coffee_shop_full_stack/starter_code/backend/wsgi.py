@@ -0,0 +1,17 @@
+'''
+Production entry point
+
+    gunicorn wsgi:app
+
+the server settings live in gunicorn.conf.py next to this file.
+'''
+from src.api import app
+from src.database.models import db
+
+
+def dispose_engine():
+    '''
+        drops the connections inherited from the gunicorn master,
+        each worker then opens its own on first use
+    '''
+    db.get_engine(app).dispose()
@@ -0,0 +1,17 @@
+'''
+Instrumentation shared by the three apps
+
+    instrumentation     request timing and database statement counts
+    metrics             prometheus metrics and the /metrics endpoint
+    profiling           sampled and signed on demand cProfile of requests
+    slow_queries        slow statement log with captured plans
+    async_logging       json logs written by a background thread
+    fast_json           orjson backed json encoding of the responses
+    compression         brotli / gzip compression of the responses
+    gunicorn_settings   the gunicorn settings, imported by each gunicorn.conf.py
+    bench               benchmark helpers and the gunicorn worker class benchmark
+
+each app puts the shared/ directory on sys.path at its entry points (the
+app, gunicorn.conf.py and benchmarks/), or runs with PYTHONPATH=shared, and
+only calls the init_* functions.
+'''
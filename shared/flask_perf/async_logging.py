@@ -0,0 +1,138 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+'''
+Non blocking file logging
+
+setup_async_logging(logger, path) puts a bounded queue in front of a
+file handler: the request thread only formats the message and does a
+put_nowait, a listener thread does the writes. when the queue is full the
+record is dropped and counted, and the next record that gets through is
+preceded by a warning with the number of dropped records.
+
+every worker process appends whole lines to the same file, and rotation
+is left to logrotate (or any tool that moves the file away): the handler
+reopens the path when the file it writes to was moved or removed. workers
+rotating the file themselves would rename it from under each other.
+
+records are written as json lines:
+    {"time": ..., "level": ..., "logger": ..., "message": ...,
+     "path": ..., "line": ..., "process": ..., "exception": ...}
+'''
+
+
+class JsonFormatter(logging.Formatter):
+    '''
+    JsonFormatter
+    formats a record as a single json line
+    '''
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'path': record.pathname,
+            'line': record.lineno,
+            'process': record.process,
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        elif record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    '''
+    DroppingQueueHandler
+    a QueueHandler that never blocks, records that do not fit are counted
+    '''
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # merge the arguments and render the traceback here, the record
+        # may hold objects that are not safe to read from another thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self._unreported:
+                with self._lock:
+                    # the count is cleared only once the warning is queued,
+                    # a full queue keeps it for the next record
+                    if self._unreported:
+                        self.queue.put_nowait(logging.makeLogRecord({
+                            'name': record.name,
+                            'levelno': logging.WARNING,
+                            'levelname': 'WARNING',
+                            'msg': 'dropped {} log records, the log queue '
+                                   'was full'.format(self._unreported),
+                        }))
+                        self._unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+
+
+def setup_async_logging(logger, path, level=logging.INFO, queue_size=10000):
+    '''
+        setup_async_logging(logger, path, ...)
+            attaches a non blocking, json file handler to the logger
+            and returns the queue handler (its dropped attribute counts
+            the records lost to a full queue)
+            calling it again for the same logger returns the existing handler
+    '''
+    for existing in logger.handlers:
+        if isinstance(existing, DroppingQueueHandler):
+            return existing
+
+    file_handler = WatchedFileHandler(path)
+    file_handler.setFormatter(JsonFormatter())
+    file_handler.setLevel(level)
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.setLevel(level)
+    listener = QueueListener(handler.queue, file_handler,
+                             respect_handler_level=True)
+    listener.start()
+    state = {'listener': listener}
+
+    def restart_listener():
+        # the listener thread does not survive fork(), start a fresh one
+        handler.queue = queue.Queue(maxsize=queue_size)
+        state['listener'] = QueueListener(handler.queue, file_handler,
+                                          respect_handler_level=True)
+        state['listener'].start()
+
+    def stop_listener():
+        try:
+            state['listener'].stop()
+        except AttributeError:
+            pass
+
+    os.register_at_fork(after_in_child=restart_listener)
+    atexit.register(stop_listener)
+
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    return handler
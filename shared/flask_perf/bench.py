@@ -0,0 +1,126 @@
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+'''
+Benchmark helpers shared by the apps' benchmarks/ scripts
+
+percentile() summarises the latencies, and worker_classes_main() is the
+gunicorn worker class benchmark: it starts the app under gunicorn once per
+worker class (sync, gthread, gevent) with the app's gunicorn.conf.py, drives
+its hot endpoints with concurrent keep-alive clients and prints throughput
+and latency percentiles for each class. each app only lists its endpoints,
+as (method, path, body, content type) tuples.
+'''
+
+WORKER_CLASSES = ['sync', 'gthread', 'gevent']
+
+
+def percentile(values, p):
+    '''
+        returns the `p` (0 to 1) percentile of `values`, 0.0 when empty
+    '''
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def drive(port, method, path, body, content_type, clients, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+    headers = {'Content-Type': content_type} if content_type else {}
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        own = []
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 500:
+                    raise OSError(response.status)
+                own.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection(
+                    '127.0.0.1', port, timeout=30)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def worker_classes_main(endpoints, app_dir, description):
+    '''
+        runs the worker class benchmark from the command line
+
+        @args : endpoints, the (method, path, body, content type) to drive
+                app_dir, the directory of the app's wsgi.py and
+                gunicorn.conf.py
+                description, the --help text
+    '''
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--classes', nargs='+', default=WORKER_CLASSES)
+    args = parser.parse_args()
+
+    print('{:<8} {:<22} {:>9} {:>7} {:>9} {:>9} {:>9}'.format(
+        'class', 'endpoint', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for worker_class in args.classes:
+        env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class,
+                   GUNICORN_BIND='127.0.0.1:{}'.format(args.port),
+                   WEB_CONCURRENCY=str(args.workers))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+             'wsgi:app'], cwd=app_dir, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_for(args.port):
+                print('{:<8} gunicorn did not start'.format(worker_class))
+                continue
+            for method, path, body, content_type in endpoints:
+                latencies, errors = drive(args.port, method, path, body,
+                                          content_type, args.clients,
+                                          args.seconds)
+                print('{:<8} {:<22} {:>9.1f} {:>7} {:>9.2f} {:>9.2f} {:>9.2f}'
+                      .format(worker_class, method + ' ' + path,
+                              len(latencies) / args.seconds, errors,
+                              percentile(latencies, 0.50) * 1000,
+                              percentile(latencies, 0.95) * 1000,
+                              percentile(latencies, 0.99) * 1000))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
@@ -0,0 +1,143 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+'''
+Response compression
+
+compresses response bodies above a size threshold with brotli (when the
+brotli package is installed) or gzip, following the client's
+Accept-Encoding. streamed, already encoded and non compressible responses
+are left alone, and every eligible response gets Vary: Accept-Encoding.
+
+a compressed response keeps its ETag as a weak validator, so conditional
+requests still get their 304. when the response has an ETag, the compressed
+body is kept in a small LRU keyed by (etag, encoding): cached json bodies
+(e.g. the drinks menu) are compressed once, not on every request.
+
+settings (app.config, falling back to the environment):
+    COMPRESSION              '0' disables it
+    COMPRESSION_MIN_SIZE     smallest body compressed, in bytes (1024)
+    COMPRESSION_GZIP_LEVEL   gzip level (6)
+    COMPRESSION_BR_QUALITY   brotli quality (4)
+    COMPRESSION_MIMETYPES    comma separated ('application/json,text/html,
+                             text/css,text/plain,application/javascript')
+    COMPRESSION_CACHE_SIZE   compressed bodies kept per process (64)
+'''
+
+DEFAULTS = {
+    'COMPRESSION': '1',
+    'COMPRESSION_MIN_SIZE': '1024',
+    'COMPRESSION_GZIP_LEVEL': '6',
+    'COMPRESSION_BR_QUALITY': '4',
+    'COMPRESSION_MIMETYPES': 'application/json,text/html,text/css,'
+                             'text/plain,application/javascript',
+    'COMPRESSION_CACHE_SIZE': '64',
+}
+
+
+class CompressedCache:
+    '''
+    CompressedCache
+    a thread safe LRU of compressed bodies
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+def choose_encoding(accept_encoding):
+    '''
+        returns 'br', 'gzip' or None for a parsed Accept-Encoding header
+    '''
+    if brotli is not None and accept_encoding['br'] > 0:
+        return 'br'
+    if accept_encoding['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding, gzip_level=6, br_quality=4):
+    if encoding == 'br':
+        return brotli.compress(body, quality=br_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def _setting(app, name):
+    return str(app.config.get(name, os.environ.get(name, DEFAULTS[name])))
+
+
+def init_compression(app):
+    '''
+        init_compression(app)
+            registers the after_request hook that compresses the responses
+    '''
+    if _setting(app, 'COMPRESSION') == '0':
+        return app
+    min_size = int(_setting(app, 'COMPRESSION_MIN_SIZE'))
+    gzip_level = int(_setting(app, 'COMPRESSION_GZIP_LEVEL'))
+    br_quality = int(_setting(app, 'COMPRESSION_BR_QUALITY'))
+    mimetypes = set(filter(None, (
+        mimetype.strip()
+        for mimetype in _setting(app, 'COMPRESSION_MIMETYPES').split(','))))
+    cache = CompressedCache(int(_setting(app, 'COMPRESSION_CACHE_SIZE')))
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in mimetypes \
+                or response.direct_passthrough or response.is_streamed \
+                or not 200 <= response.status_code < 300 \
+                or response.status_code == 204 \
+                or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None \
+                and response.content_length < min_size:
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        compressed = cache.get((etag, encoding)) if etag else None
+        if compressed is None:
+            compressed = compress(body, encoding, gzip_level, br_quality)
+            if etag:
+                cache.put((etag, encoding), compressed)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag and not weak:
+            # the bytes differ from the identity body, only the meaning
+            # is the same
+            response.set_etag(etag, weak=True)
+        return response
+
+    return app
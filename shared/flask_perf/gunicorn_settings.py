@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+
+'''
+gunicorn settings of the three apps, every value can be overridden from the
+environment. each app's gunicorn.conf.py imports them (and may override
+some after the import), the app is served from its wsgi.py: wsgi:app.
+
+    GUNICORN_WORKER_CLASS   sync, gthread (default) or gevent
+                            (gevent needs: pip install gevent psycogreen)
+    WEB_CONCURRENCY         worker processes (2 * cores + 1)
+    GUNICORN_THREADS        threads per gthread worker (4)
+    GUNICORN_CONNECTIONS    concurrent requests per gevent worker (200)
+    GUNICORN_MAX_REQUESTS   requests before a worker is recycled (2000)
+    GUNICORN_TIMEOUT        seconds before a silent worker is killed (30)
+
+the app is preloaded in the master so workers fork with the code already
+imported, post_fork then drops the database connections they inherited.
+'''
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # patch before the app is preloaded, so its sockets are cooperative too
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) \
+    if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_CONNECTIONS', 200))
+
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.dispose_engine()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR') or \
+            os.environ.get('prometheus_multiproc_dir'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,133 @@
+import os
+import time
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+'''
+Per request SQL instrumentation
+
+counts the queries issued while serving a request, sums their time and keeps
+the slowest statement. the totals are sent back in a Server-Timing header
+and requests over the thresholds are logged with their slowest statement.
+
+it costs two perf_counter() calls per query and a few attribute lookups per
+request, so it is meant to stay enabled in production.
+
+settings (app.config, falling back to the environment):
+    SQL_INSTRUMENTATION          '0' disables it
+    SQL_SERVER_TIMING            '0' stops adding the Server-Timing header
+    SQL_QUERY_COUNT_THRESHOLD    queries per request before logging (20)
+    SQL_DB_TIME_THRESHOLD_MS     database time per request before logging (200)
+    SQL_REQUEST_TIME_THRESHOLD_MS  wall time per request before logging (500)
+'''
+
+DEFAULTS = {
+    'SQL_INSTRUMENTATION': '1',
+    'SQL_SERVER_TIMING': '1',
+    'SQL_QUERY_COUNT_THRESHOLD': '20',
+    'SQL_DB_TIME_THRESHOLD_MS': '200',
+    'SQL_REQUEST_TIME_THRESHOLD_MS': '500',
+}
+
+_listening = False
+
+
+class RequestStats:
+    '''
+    RequestStats
+    the counters of a single request, stored on flask.g
+    '''
+    __slots__ = ('started', 'count', 'db_time', 'slowest_time', 'slowest')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest = None
+
+
+def current_stats():
+    '''
+        returns the RequestStats of the running request or None
+    '''
+    if not has_app_context():
+        return None
+    return g.get('_request_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = getattr(context, '_instrumentation_start', None)
+    if started is None:
+        return
+    stats = current_stats()
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.count += 1
+    stats.db_time += elapsed
+    if elapsed > stats.slowest_time:
+        stats.slowest_time = elapsed
+        stats.slowest = statement
+
+
+def _setting(app, name):
+    value = app.config.get(name, os.environ.get(name, DEFAULTS[name]))
+    return str(value)
+
+
+def init_instrumentation(app):
+    '''
+        init_instrumentation(app)
+            listens to every sqlalchemy engine of the process and registers
+            the request hooks on the app
+    '''
+    global _listening
+    if _setting(app, 'SQL_INSTRUMENTATION') == '0':
+        return
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+
+    server_timing = _setting(app, 'SQL_SERVER_TIMING') != '0'
+    count_threshold = int(_setting(app, 'SQL_QUERY_COUNT_THRESHOLD'))
+    db_threshold = float(_setting(app, 'SQL_DB_TIME_THRESHOLD_MS')) / 1000
+    request_threshold = float(
+        _setting(app, 'SQL_REQUEST_TIME_THRESHOLD_MS')) / 1000
+
+    @app.before_request
+    def start_request_stats():
+        g._request_stats = RequestStats()
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                'db;dur={:.2f};desc="{} queries", app;dur={:.2f}'.format(
+                    stats.db_time * 1000, stats.count, total * 1000))
+        if stats.count > count_threshold or stats.db_time > db_threshold \
+                or total > request_threshold:
+            app.logger.warning(
+                'slow request %s %s -> %s: %.1fms total, %d queries, '
+                '%.1fms in db, slowest %.1fms: %s',
+                request.method, request.full_path.rstrip('?'),
+                response.status_code, total * 1000,
+                stats.count, stats.db_time * 1000, stats.slowest_time * 1000,
+                (stats.slowest or '')[:500])
+        return response
+
+    return app
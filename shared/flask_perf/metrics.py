@@ -0,0 +1,179 @@
+import os
+import time
+import weakref
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                               Counter, Gauge, Histogram, generate_latest,
+                               multiprocess)
+from sqlalchemy import event, exc
+
+'''
+Prometheus metrics
+
+register with init_metrics(app, engine) and scrape GET /metrics.
+
+the counters come from prometheus_client, so they are safe to update from
+any thread. when gunicorn runs several workers, export
+PROMETHEUS_MULTIPROC_DIR (an empty directory, wiped on deploy) before the
+workers start: every worker then writes its samples there and /metrics
+serves the sum over all of them. prometheus_client before 0.10 reads the
+lower case prometheus_multiproc_dir instead.
+
+    http_requests_total              requests per endpoint, method and status
+    http_request_duration_seconds    latency histogram, same labels
+    db_pool_checkouts_total          connections handed out by the pool
+    db_pool_connects_total           new physical connections opened
+    db_pool_checked_out              connections currently in use
+    db_pool_wait_seconds             time a checkout waited for a connection
+                                     (including opening a new one)
+    db_pool_timeouts_total           checkouts that gave up after pool_timeout
+    cache_requests_total             cache lookups per cache and result
+    auth_verify_duration_seconds     time spent verifying a token
+'''
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5,
+                   5.0, 10.0)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests served',
+    ['app', 'endpoint', 'method', 'status'])
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['app', 'endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+DB_CHECKOUTS = Counter(
+    'db_pool_checkouts_total', 'Connections checked out of the pool', ['app'])
+DB_CONNECTS = Counter(
+    'db_pool_connects_total', 'Physical database connections opened', ['app'])
+DB_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Connections currently checked out of the pool',
+    ['app'], multiprocess_mode='livesum')
+DB_POOL_WAIT = Histogram(
+    'db_pool_wait_seconds', 'Time spent waiting for a pool connection',
+    ['app'], buckets=LATENCY_BUCKETS)
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts_total', 'Pool checkouts that timed out', ['app'])
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups', ['app', 'cache', 'result'])
+AUTH_VERIFY_LATENCY = Histogram(
+    'auth_verify_duration_seconds', 'Time spent verifying auth tokens',
+    ['app', 'result'], buckets=LATENCY_BUCKETS)
+
+_app_name = 'flask'
+_watched_engines = weakref.WeakSet()
+
+
+def record_cache(cache, hit):
+    '''
+        counts a lookup of <cache> as a hit or a miss
+    '''
+    CACHE_REQUESTS.labels(_app_name, cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_auth(seconds, ok=True):
+    '''
+        records the time a token verification took
+    '''
+    AUTH_VERIFY_LATENCY.labels(
+        _app_name, 'ok' if ok else 'error').observe(seconds)
+
+
+def time_checkouts(pool, waits, timeouts):
+    '''
+        wraps the pool's _do_get, where a checkout waits for a free
+        connection (or opens one), to time it and count its timeouts
+    '''
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        except exc.TimeoutError:
+            timeouts.inc()
+            raise
+        finally:
+            waits.observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+
+
+def watch_pool(engine, app_name):
+    '''
+        counts the checkouts and connects of an engine's pool and times
+        the waits for a connection
+    '''
+    if engine in _watched_engines:
+        return
+    _watched_engines.add(engine)
+    connects = DB_CONNECTS.labels(app_name)
+    checkouts = DB_CHECKOUTS.labels(app_name)
+    checked_out = DB_CHECKED_OUT.labels(app_name)
+    waits = DB_POOL_WAIT.labels(app_name)
+    timeouts = DB_POOL_TIMEOUTS.labels(app_name)
+    time_checkouts(engine.pool, waits, timeouts)
+
+    @event.listens_for(engine, 'engine_disposed')
+    def on_disposed(disposed_engine):
+        # dispose() replaces the pool with a new one
+        time_checkouts(engine.pool, waits, timeouts)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        connects.inc()
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.inc()
+        checked_out.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+
+def metrics_body():
+    '''
+        returns the exposition text, aggregated over every worker
+        when PROMETHEUS_MULTIPROC_DIR is set
+    '''
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR') or \
+            os.environ.get('prometheus_multiproc_dir'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def init_metrics(app, engine=None, app_name=None):
+    '''
+        init_metrics(app, engine, app_name)
+            times every request of the app, watches the engine's pool
+            and adds the GET /metrics endpoint
+    '''
+    global _app_name
+    _app_name = app_name or app.import_name
+    name = _app_name
+    if engine is not None:
+        watch_pool(engine, name)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return response
+        # the url rule keeps the label set bounded, unlike the raw path
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (name, endpoint, request.method, str(response.status_code))
+        REQUESTS.labels(*labels).inc()
+        REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(metrics_body(), mimetype=CONTENT_TYPE_LATEST)
+
+    return app
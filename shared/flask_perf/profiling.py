@@ -0,0 +1,193 @@
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from flask import g, request
+
+'''
+On demand request profiler
+
+nothing is registered unless PROFILING=1, so a disabled profiler costs
+nothing. when enabled, a request is profiled if
+    - it carries X-Profile: <expires>:<signature>, made by
+      profile_header(PROFILING_SECRET, path): the hex
+      hmac_sha256(PROFILING_SECRET, "<path>:<expires>") of the request path
+      and a unix time a few minutes ahead. the expiry is signed too, a
+      captured header stops working once it passes
+    - the file <PROFILING_DIR>/enabled exists (touch it to profile everything,
+      remove it to stop, it is seen by every worker)
+    - it is picked by the 1-in-PROFILING_SAMPLE_RATE sampling
+
+PROFILING_MODE=sample (default) runs a statistical sampler thread that reads
+the stack of the request thread every PROFILING_INTERVAL_MS and writes the
+stacks in the collapsed format (flamegraph.pl, speedscope, inferno).
+PROFILING_MODE=cprofile wraps the request in cProfile and writes a pstats
+dump instead (snakeviz, gprof2dot).
+only the newest PROFILING_KEEP files of PROFILING_DIR are kept.
+
+settings (app.config, falling back to the environment):
+    PROFILING, PROFILING_MODE, PROFILING_DIR, PROFILING_SAMPLE_RATE,
+    PROFILING_SECRET, PROFILING_INTERVAL_MS, PROFILING_KEEP
+'''
+
+DEFAULTS = {
+    'PROFILING': '0',
+    'PROFILING_MODE': 'sample',
+    'PROFILING_DIR': 'profiles',
+    'PROFILING_SAMPLE_RATE': '0',
+    'PROFILING_SECRET': '',
+    'PROFILING_INTERVAL_MS': '1',
+    'PROFILING_KEEP': '200',
+}
+
+
+class StackSampler:
+    '''
+    StackSampler
+    samples the stack of one thread from a background thread and counts
+    the collapsed stacks ("outer;inner;leaf")
+    '''
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(
+                    code.co_name, os.path.basename(code.co_filename),
+                    code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write('{} {}\n'.format(stack, count))
+
+
+def _setting(app, name):
+    return str(app.config.get(name, os.environ.get(name, DEFAULTS[name])))
+
+
+def profile_signature(secret, path, expires):
+    message = '{}:{}'.format(path, expires).encode('utf-8')
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def profile_header(secret, path, ttl=300, now=None):
+    '''
+        returns the X-Profile value that profiles a request of path for
+        the next ttl seconds
+    '''
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    expires = int((now or time.time()) + ttl)
+    return '{}:{}'.format(expires, profile_signature(secret, path, expires))
+
+
+def valid_signature(secret, path, header, now=None):
+    expires, _, signature = header.partition(':')
+    try:
+        expires = int(expires)
+    except ValueError:
+        return False
+    if expires < (now or time.time()):
+        return False
+    return hmac.compare_digest(
+        signature, profile_signature(secret, path, expires))
+
+
+def _rotate(directory, keep):
+    files = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory)
+         if name.endswith(('.collapsed', '.prof'))),
+        key=os.path.getmtime)
+    for path in files[:-keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def init_profiling(app):
+    '''
+        init_profiling(app)
+            registers the profiling hooks on the app when PROFILING=1
+    '''
+    if _setting(app, 'PROFILING') != '1':
+        return app
+
+    mode = _setting(app, 'PROFILING_MODE')
+    directory = os.path.abspath(_setting(app, 'PROFILING_DIR'))
+    sample_rate = int(_setting(app, 'PROFILING_SAMPLE_RATE'))
+    secret = _setting(app, 'PROFILING_SECRET').encode('utf-8')
+    interval = float(_setting(app, 'PROFILING_INTERVAL_MS')) / 1000
+    keep = int(_setting(app, 'PROFILING_KEEP'))
+    toggle = os.path.join(directory, 'enabled')
+    os.makedirs(directory, exist_ok=True)
+
+    def wanted():
+        header = request.headers.get('X-Profile')
+        if header and secret and \
+                valid_signature(secret, request.path, header):
+            return True
+        if sample_rate and random.randrange(sample_rate) == 0:
+            return True
+        return os.path.exists(toggle)
+
+    @app.before_request
+    def start_profiler():
+        if not wanted():
+            return
+        g._profile_started = time.time()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), interval).start()
+        g._profiler = profiler
+
+    @app.teardown_request
+    def stop_profiler(exception=None):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        name = '{:.6f}-{}-{}-{}'.format(
+            g.pop('_profile_started'), os.getpid(), request.method,
+            (request.endpoint or 'unmatched').replace('.', '_'))
+        try:
+            if mode == 'cprofile':
+                profiler.dump_stats(os.path.join(directory, name + '.prof'))
+            else:
+                profiler.dump(os.path.join(directory, name + '.collapsed'))
+            _rotate(directory, keep)
+        except OSError:
+            app.logger.exception('could not write profile %s', name)
+
+    return app
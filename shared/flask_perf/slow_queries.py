@@ -0,0 +1,279 @@
+import argparse
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+'''
+Slow query log
+
+with SLOW_QUERY_LOG=1 every statement slower than SLOW_QUERY_THRESHOLD_MS is
+handed to a background thread, which groups it by a normalized fingerprint
+(literals and bind parameters replaced by ?) and keeps the call count, total
+and max time in a small sqlite file shared by every worker (SLOW_QUERY_DB).
+
+for each fingerprint the thread also explains the statement with its
+original parameters and stores the plan: EXPLAIN (ANALYZE, BUFFERS) for the
+plain SELECTs on postgresql, which runs them, and a plain EXPLAIN for the
+writes and the locking reads, which are never re-run. sqlite gets EXPLAIN
+QUERY PLAN. the explain runs inside a transaction that is always rolled
+back, at most once per fingerprint every
+SLOW_QUERY_EXPLAIN_INTERVAL seconds and at most
+SLOW_QUERY_EXPLAINS_PER_MINUTE times a minute per process.
+
+the request thread only pays for two perf_counter() calls per statement and
+a queue put per slow statement; when the queue is full the sample is dropped.
+
+report the top offenders by cumulative time (with shared/ on PYTHONPATH):
+    python -m flask_perf.slow_queries report --limit 20
+'''
+
+DEFAULTS = {
+    'SLOW_QUERY_LOG': '0',
+    'SLOW_QUERY_THRESHOLD_MS': '100',
+    'SLOW_QUERY_DB': 'slow_queries.db',
+    'SLOW_QUERY_EXPLAIN_INTERVAL': '300',
+    'SLOW_QUERY_EXPLAINS_PER_MINUTE': '10',
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS slow_queries (
+    fingerprint TEXT PRIMARY KEY,
+    statement TEXT NOT NULL,
+    dialect TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    total_ms REAL NOT NULL DEFAULT 0,
+    max_ms REAL NOT NULL DEFAULT 0,
+    last_seen REAL,
+    plan TEXT,
+    plan_captured_at REAL
+)
+'''
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+_READ = re.compile(r'\s*(?:select|with)\b', re.IGNORECASE)
+# data modifying CTEs, SELECT INTO and SELECT ... FOR UPDATE / SHARE
+_WRITE = re.compile(r'\b(?:insert|update|delete|merge|into|share)\b',
+                    re.IGNORECASE)
+
+
+def normalize(statement):
+    '''
+        replaces literals and bind parameters of a statement with ?
+        and collapses IN lists and whitespace
+    '''
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _PARAM.sub('?', statement)
+    statement = _IN_LIST.sub('(...)', statement)
+    return _SPACE.sub(' ', statement).strip()
+
+
+def fingerprint(statement):
+    return hashlib.sha1(normalize(statement).encode('utf-8')).hexdigest()[:16]
+
+
+def is_read_only(statement):
+    '''
+        tells if running the statement again has no side effect, string
+        literals are left out of the check
+    '''
+    statement = _STRING.sub('?', statement)
+    return bool(_READ.match(statement)) and not _WRITE.search(statement)
+
+
+def connect_store(path):
+    connection = sqlite3.connect(path, timeout=5)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(SCHEMA)
+    return connection
+
+
+class SlowQueryLog:
+    '''
+    SlowQueryLog
+    collects slow statements from the engine events and processes them
+    in a daemon thread
+    '''
+
+    def __init__(self, threshold, store_path, explain_interval,
+                 explains_per_minute, maxsize=1000):
+        self.threshold = threshold
+        self.store_path = store_path
+        self.explain_interval = explain_interval
+        self.explains_per_minute = explains_per_minute
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._explained = {}
+        self._explain_times = []
+        self._thread = None
+
+    def start(self):
+        event.listen(Engine, 'before_cursor_execute', self.before_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_execute)
+        # threads do not survive fork(), restart it in preloaded workers
+        os.register_at_fork(after_in_child=self._start_thread)
+        self._start_thread()
+        return self
+
+    def _start_thread(self):
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def before_execute(self, conn, cursor, statement, parameters, context,
+                       executemany):
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    def after_execute(self, conn, cursor, statement, parameters, context,
+                      executemany):
+        started = getattr(context, '_slow_query_start', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+        try:
+            self.queue.put_nowait((conn.engine, statement,
+                                   None if executemany else parameters,
+                                   elapsed))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        store = connect_store(self.store_path)
+        while True:
+            engine, statement, parameters, elapsed = self.queue.get()
+            try:
+                self._record(store, engine, statement, parameters, elapsed)
+            except Exception:
+                pass
+
+    def _record(self, store, engine, statement, parameters, elapsed):
+        key = fingerprint(statement)
+        elapsed_ms = elapsed * 1000
+        now = time.time()
+        with store:
+            store.execute(
+                'INSERT INTO slow_queries (fingerprint, statement, dialect, '
+                'calls, total_ms, max_ms, last_seen) '
+                'VALUES (?, ?, ?, 1, ?, ?, ?) '
+                'ON CONFLICT(fingerprint) DO UPDATE SET '
+                'calls = calls + 1, total_ms = total_ms + excluded.total_ms, '
+                'max_ms = max(max_ms, excluded.max_ms), '
+                'last_seen = excluded.last_seen',
+                (key, normalize(statement), engine.dialect.name, elapsed_ms,
+                 elapsed_ms, now))
+        if parameters is None or not self._may_explain(key, now):
+            return
+        plan = explain(engine, statement, parameters)
+        if plan is not None:
+            with store:
+                store.execute(
+                    'UPDATE slow_queries SET plan = ?, plan_captured_at = ? '
+                    'WHERE fingerprint = ?', (plan, now, key))
+
+    def _may_explain(self, key, now):
+        if now - self._explained.get(key, 0) < self.explain_interval:
+            return False
+        self._explain_times = [t for t in self._explain_times if now - t < 60]
+        if len(self._explain_times) >= self.explains_per_minute:
+            return False
+        self._explained[key] = now
+        self._explain_times.append(now)
+        return True
+
+
+def explain(engine, statement, parameters):
+    '''
+        returns the plan of a statement as text, or None if the dialect
+        is not supported or the explain failed
+    '''
+    if engine.dialect.name == 'postgresql':
+        # ANALYZE executes the statement, a write would be done twice (and
+        # hold its locks) even if it is rolled back afterwards
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if is_read_only(statement) \
+            else 'EXPLAIN '
+    elif engine.dialect.name == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return None
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            connection.rollback()
+    except Exception:
+        return None
+    finally:
+        connection.close()
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def _setting(app, name):
+    return str(app.config.get(name, os.environ.get(name, DEFAULTS[name])))
+
+
+_log = None
+
+
+def init_slow_query_log(app):
+    '''
+        init_slow_query_log(app)
+            starts the slow query log of the process when SLOW_QUERY_LOG=1
+    '''
+    global _log
+    if _setting(app, 'SLOW_QUERY_LOG') != '1' or _log is not None:
+        return _log
+    _log = SlowQueryLog(
+        threshold=float(_setting(app, 'SLOW_QUERY_THRESHOLD_MS')) / 1000,
+        store_path=_setting(app, 'SLOW_QUERY_DB'),
+        explain_interval=float(_setting(app, 'SLOW_QUERY_EXPLAIN_INTERVAL')),
+        explains_per_minute=int(
+            _setting(app, 'SLOW_QUERY_EXPLAINS_PER_MINUTE'))).start()
+    return _log
+
+
+def report(path, limit, show_plans):
+    store = connect_store(path)
+    rows = store.execute(
+        'SELECT fingerprint, calls, total_ms, max_ms, statement, plan '
+        'FROM slow_queries ORDER BY total_ms DESC LIMIT ?', (limit,)).fetchall()
+    print('{:<16} {:>8} {:>12} {:>10} {:>10}  statement'.format(
+        'fingerprint', 'calls', 'total ms', 'avg ms', 'max ms'))
+    for key, calls, total_ms, max_ms, statement, plan in rows:
+        print('{:<16} {:>8} {:>12.1f} {:>10.1f} {:>10.1f}  {}'.format(
+            key, calls, total_ms, total_ms / calls, max_ms, statement[:120]))
+        if show_plans and plan:
+            for line in plan.splitlines():
+                print('    ' + line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='slow query log report')
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('--db', default=os.environ.get(
+        'SLOW_QUERY_DB', DEFAULTS['SLOW_QUERY_DB']))
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--plans', action='store_true',
+                        help='print the captured plan under each statement')
+    args = parser.parse_args()
+    report(args.db, args.limit, args.plans)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import gzip
+import json
+import logging
+import queue
+import unittest
+
+from flask import Flask, request
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from flask_perf.async_logging import DroppingQueueHandler
+from flask_perf.compression import init_compression
+from flask_perf.metrics import watch_pool
+from flask_perf.profiling import profile_header, valid_signature
+from flask_perf.slow_queries import is_read_only
+
+
+def record(message):
+    return logging.makeLogRecord({'name': 'test', 'levelno': logging.INFO,
+                                  'levelname': 'INFO', 'msg': message})
+
+
+def drain(log_queue):
+    messages = []
+    while True:
+        try:
+            messages.append(log_queue.get_nowait().getMessage())
+        except queue.Empty:
+            return messages
+
+
+class DroppingQueueHandlerTestCase(unittest.TestCase):
+    """This class represents the non blocking log handler test case"""
+
+    def setUp(self):
+        self.handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+
+    def test_records_dropped_when_full(self):
+        for i in range(5):
+            self.handler.handle(record('message {}'.format(i)))
+
+        self.assertEqual(self.handler.dropped, 3)
+        self.assertEqual(drain(self.handler.queue),
+                         ['message 0', 'message 1'])
+
+    def test_warning_reports_dropped_count(self):
+        for i in range(5):
+            self.handler.handle(record('message {}'.format(i)))
+        drain(self.handler.queue)
+        self.handler.handle(record('message 5'))
+
+        self.assertEqual(drain(self.handler.queue), [
+            'dropped 3 log records, the log queue was full', 'message 5'])
+
+    def test_count_kept_when_warning_does_not_fit(self):
+        for i in range(5):
+            self.handler.handle(record('message {}'.format(i)))
+        # still full: neither the warning nor the record get through
+        self.handler.handle(record('message 5'))
+        self.assertEqual(self.handler.dropped, 4)
+        drain(self.handler.queue)
+        self.handler.handle(record('message 6'))
+
+        self.assertEqual(drain(self.handler.queue), [
+            'dropped 4 log records, the log queue was full', 'message 6'])
+
+
+class PoolMetricsTestCase(unittest.TestCase):
+    """This class represents the connection pool metrics test case"""
+
+    def sample(self, name, app):
+        return REGISTRY.get_sample_value(name, {'app': app}) or 0
+
+    def test_checkout_waits_and_timeouts(self):
+        engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=1,
+                               max_overflow=0, pool_timeout=0.05)
+        watch_pool(engine, 'pool_test')
+        connection = engine.connect()
+        with self.assertRaises(exc.TimeoutError):
+            engine.connect()
+        connection.close()
+
+        self.assertEqual(self.sample('db_pool_timeouts_total', 'pool_test'), 1)
+        self.assertEqual(
+            self.sample('db_pool_wait_seconds_count', 'pool_test'), 2)
+        self.assertGreaterEqual(
+            self.sample('db_pool_wait_seconds_sum', 'pool_test'), 0.05)
+
+    def test_new_pool_timed_after_dispose(self):
+        engine = create_engine('sqlite://', poolclass=QueuePool)
+        watch_pool(engine, 'dispose_test')
+        engine.dispose()
+        engine.connect().close()
+
+        self.assertEqual(
+            self.sample('db_pool_wait_seconds_count', 'dispose_test'), 1)
+
+
+class SlowQueryExplainTestCase(unittest.TestCase):
+    """This class represents the slow query explain test case"""
+
+    def test_selects_are_read_only(self):
+        self.assertTrue(is_read_only('SELECT id FROM venues WHERE id = %s'))
+        self.assertTrue(is_read_only(
+            '  with recent AS (SELECT * FROM shows) SELECT * FROM recent'))
+        self.assertTrue(is_read_only(
+            "SELECT id FROM venues WHERE name = 'update into'"))
+
+    def test_writes_are_not_read_only(self):
+        for statement in [
+                'INSERT INTO venues (name) VALUES (%s)',
+                'UPDATE venues SET name = %s WHERE id = %s',
+                'DELETE FROM venues WHERE id = %s',
+                'WITH gone AS (DELETE FROM shows RETURNING id) SELECT * FROM gone',
+                'SELECT * INTO venues_copy FROM venues',
+                'SELECT id FROM venues WHERE id = %s FOR UPDATE',
+                'SELECT id FROM venues WHERE id = %s FOR KEY SHARE']:
+            self.assertFalse(is_read_only(statement), statement)
+
+
+class ProfileSignatureTestCase(unittest.TestCase):
+    """This class represents the signed profiling header test case"""
+
+    secret = b'secret'
+
+    def test_signature_valid_until_expiry(self):
+        header = profile_header(self.secret, '/venues', ttl=60, now=1000)
+
+        self.assertTrue(valid_signature(self.secret, '/venues', header, 1059))
+        self.assertFalse(valid_signature(self.secret, '/venues', header, 1061))
+
+    def test_signature_bound_to_path_and_expiry(self):
+        header = profile_header(self.secret, '/venues', ttl=60, now=1000)
+        expires, signature = header.split(':')
+
+        self.assertFalse(valid_signature(self.secret, '/artists', header, 1000))
+        self.assertFalse(valid_signature(
+            self.secret, '/venues', '9999:' + signature, 1000))
+        self.assertFalse(valid_signature(b'other', '/venues', header, 1000))
+        self.assertFalse(valid_signature(self.secret, '/venues', signature, 0))
+
+
+class CompressionTestCase(unittest.TestCase):
+    """This class represents the response compression test case"""
+
+    body = {'questions': ['question {}'.format(i) for i in range(200)]}
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.config['COMPRESSION_MIN_SIZE'] = 1024
+
+        @app.route('/questions')
+        def questions():
+            response = app.response_class(json.dumps(self.body),
+                                          mimetype='application/json')
+            response.add_etag()
+            return response.make_conditional(request)
+
+        init_compression(app)
+        self.client = app.test_client()
+
+    def test_compressed_response_keeps_weak_etag(self):
+        identity = self.client.get('/questions')
+        res = self.client.get('/questions', headers={'Accept-Encoding': 'gzip'})
+        etag, weak = res.get_etag()
+
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(res.data)), self.body)
+        self.assertTrue(weak)
+        self.assertEqual(etag, identity.get_etag()[0])
+
+    def test_if_none_match_gets_304(self):
+        res = self.client.get('/questions', headers={'Accept-Encoding': 'gzip'})
+        again = self.client.get('/questions', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': res.headers['ETag']})
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b'')
+        self.assertNotIn('Content-Encoding', again.headers)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()